@@ -0,0 +1,267 @@
+import platform
+import random
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import django
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from restaurant_app import instrumentation
+from restaurant_app.models import (
+    Restaurant, Menu, MenuVersion, MenuSection, MenuItem,
+    DietaryRestriction, MenuItemDietaryRestriction
+)
+from restaurant_project import menu_queries
+
+
+class BenchmarkCase:
+    """
+    One timed call. `cold` cases clear the cache before every run so they
+    measure the database path; warm cases measure repeated reads.
+    """
+
+    def __init__(self, name, kind, call, cold=False):
+        self.name = name
+        self.kind = kind
+        self.call = call
+        self.cold = cold
+
+
+def _percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def pick_targets(seed):
+    """
+    Picks the restaurant, menu and versions the cases run against, reproducibly for a seed.
+    """
+    active = list(
+        MenuVersion.objects.filter(is_active=True)
+        .order_by('id')
+        .values_list('menu_id', 'menu__restaurant_id', 'version_number')[:1000]
+    )
+    if not active:
+        return None
+    menu_id, restaurant_id, version_number = random.Random(seed).choice(active)
+    versions = list(
+        MenuVersion.objects.filter(menu_id=menu_id).order_by('version_number')
+        .values_list('version_number', flat=True)
+    )
+    restrictions = list(DietaryRestriction.objects.order_by('id').values_list('name', flat=True)[:2])
+    return {
+        'restaurant_id': restaurant_id,
+        'menu_id': menu_id,
+        'active_version': version_number,
+        'first_version': versions[0],
+        'section_id': MenuSection.objects.filter(menu_version__menu_id=menu_id).values_list('id', flat=True).first(),
+        'item_id': MenuItem.objects.filter(section__menu_version__menu_id=menu_id).values_list('id', flat=True).first(),
+        'restrictions': restrictions,
+    }
+
+
+def build_cases(targets, client):
+    """
+    Lists every function in restaurant_project.menu_queries and every read endpoint.
+    """
+    restaurant_id = targets['restaurant_id']
+    menu_id = targets['menu_id']
+    restrictions = targets['restrictions']
+
+    def view(name, kwargs=None, query=None):
+        url = reverse(name, kwargs=kwargs)
+        return lambda: client.get(url, query or {})
+
+    cases = [
+        BenchmarkCase('get_restaurant_sections', 'function',
+                      lambda: menu_queries.get_restaurant_sections(restaurant_id)),
+        BenchmarkCase('get_active_menu_sections', 'function',
+                      lambda: menu_queries.get_active_menu_sections(restaurant_id)),
+        BenchmarkCase('get_menu_versions', 'function',
+                      lambda: menu_queries.get_menu_versions(restaurant_id, menu_id)),
+        BenchmarkCase('get_menu_items_by_version[cold]', 'function',
+                      lambda: menu_queries.get_menu_items_by_version(restaurant_id, menu_id), cold=True),
+        BenchmarkCase('get_menu_items_by_version[warm]', 'function',
+                      lambda: menu_queries.get_menu_items_by_version(restaurant_id, menu_id)),
+        BenchmarkCase('get_menu_items_by_version[version][cold]', 'function',
+                      lambda: menu_queries.get_menu_items_by_version(
+                          restaurant_id, menu_id, targets['first_version']), cold=True),
+    ]
+    for match in ('any', 'all', 'none'):
+        cases.append(BenchmarkCase(
+            f'get_menu_items_by_dietary_restrictions[{match}][cold]', 'function',
+            lambda match=match: menu_queries.get_menu_items_by_dietary_restrictions(
+                restaurant_id, menu_id, dietary_restrictions=restrictions, match=match),
+            cold=True
+        ))
+    cases += [
+        BenchmarkCase('get_menu_items_by_dietary_restrictions[any][warm]', 'function',
+                      lambda: menu_queries.get_menu_items_by_dietary_restrictions(
+                          restaurant_id, menu_id, dietary_restrictions=restrictions)),
+        BenchmarkCase('get_restaurant_price_analytics', 'function',
+                      lambda: menu_queries.get_restaurant_price_analytics(n=3)),
+        BenchmarkCase('get_restaurant_price_analytics[active_only]', 'function',
+                      lambda: menu_queries.get_restaurant_price_analytics(n=3, active_only=True)),
+        BenchmarkCase('get_specific_restaurant_analytics', 'function',
+                      lambda: menu_queries.get_specific_restaurant_analytics(restaurant_id)),
+        BenchmarkCase('get_specific_restaurant_analytics[active_only]', 'function',
+                      lambda: menu_queries.get_specific_restaurant_analytics(restaurant_id, active_only=True)),
+
+        BenchmarkCase('restaurant-sections', 'view',
+                      view('restaurant-sections', {'restaurant_id': restaurant_id})),
+        BenchmarkCase('active-sections', 'view',
+                      view('active-sections', {'restaurant_id': restaurant_id})),
+        BenchmarkCase('menu-versions', 'view',
+                      view('menu-versions', {'restaurant_id': restaurant_id, 'menu_id': menu_id})),
+        BenchmarkCase('menu-items[cold]', 'view',
+                      view('menu-items', {'restaurant_id': restaurant_id, 'menu_id': menu_id}), cold=True),
+        BenchmarkCase('menu-items[warm]', 'view',
+                      view('menu-items', {'restaurant_id': restaurant_id, 'menu_id': menu_id})),
+        BenchmarkCase('menu-items-dietary[cold]', 'view',
+                      view('menu-items-dietary', {'restaurant_id': restaurant_id, 'menu_id': menu_id},
+                           {'restrictions': ','.join(restrictions)}), cold=True),
+        BenchmarkCase('restaurant-analytics', 'view', view('restaurant-analytics', query={'n': 3})),
+        BenchmarkCase('specific-restaurant-analytics', 'view',
+                      view('specific-restaurant-analytics', {'restaurant_id': restaurant_id})),
+    ]
+    details = {
+        'restaurant': restaurant_id,
+        'menu': menu_id,
+        'menusection': targets['section_id'],
+        'menuitem': targets['item_id'],
+        'dietaryrestriction': DietaryRestriction.objects.values_list('id', flat=True).first(),
+    }
+    for basename, pk in details.items():
+        cases.append(BenchmarkCase(f'{basename}-list', 'view', view(f'{basename}-list')))
+        if pk is not None:
+            cases.append(BenchmarkCase(f'{basename}-detail', 'view', view(f'{basename}-detail', {'pk': pk})))
+    return cases
+
+
+def _run_function(case):
+    metrics, token = instrumentation.start_request()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(instrumentation.query_wrapper))
+            started = time.perf_counter()
+            case.call()
+            elapsed = time.perf_counter() - started
+    finally:
+        instrumentation.end_request(token)
+    return elapsed, metrics.queries
+
+
+def _run_view(case):
+    # RequestInstrumentationMiddleware already counts the request's queries
+    started = time.perf_counter()
+    response = case.call()
+    elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise RuntimeError(f'{case.name} returned HTTP {response.status_code}')
+    return elapsed, int(response.get('X-Query-Count', 0))
+
+
+def run_case(case, repeat, warmup):
+    runner = _run_view if case.kind == 'view' else _run_function
+    timings, queries = [], []
+    for run in range(warmup + repeat):
+        if case.cold:
+            cache.clear()
+        elapsed, query_count = runner(case)
+        if run >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(query_count)
+    return {
+        'name': case.name,
+        'kind': case.kind,
+        'cold': case.cold,
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def table_counts():
+    models = {
+        'restaurants': Restaurant,
+        'menus': Menu,
+        'versions': MenuVersion,
+        'sections': MenuSection,
+        'items': MenuItem,
+        'dietary_links': MenuItemDietaryRestriction,
+    }
+    return {name: model.objects.count() for name, model in models.items()}
+
+
+def run_benchmarks(repeat=20, warmup=2, seed=42, only=None, log=None):
+    """
+    Times every case and returns a JSON-serializable report.
+
+    Args:
+        repeat (int): Timed runs per case
+        warmup (int): Untimed runs per case before timing starts
+        seed (int): Seed used to pick the restaurant and menu the cases run against
+        only (list, optional): Substrings; only cases whose name contains one of them run
+        log (callable, optional): Receives a progress line per case
+
+    Returns:
+        dict: 'environment' (database, versions, row counts) and 'results' (one entry per case)
+    """
+    targets = pick_targets(seed)
+    if targets is None:
+        raise ValueError('No active menu versions found; generate data first')
+
+    # SERVER_NAME must pass ALLOWED_HOSTS, which only accepts 'testserver' under the test runner
+    client = Client(SERVER_NAME='localhost')
+    results = []
+    for case in build_cases(targets, client):
+        if only and not any(fragment in case.name for fragment in only):
+            continue
+        result = run_case(case, repeat, warmup)
+        results.append(result)
+        if log:
+            log(result)
+
+    return {
+        'environment': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'database_version': '.'.join(str(part) for part in connection.get_database_version()),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': seed,
+            'repeat': repeat,
+            'warmup': warmup,
+            'targets': targets,
+            'rows': table_counts(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    """
+    Pairs each result with the same case in a baseline report.
+
+    Returns:
+        list: (name, baseline median_ms, current median_ms, ratio, baseline queries, current queries)
+    """
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    rows = []
+    for result in report['results']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else None
+        rows.append((result['name'], before['median_ms'], result['median_ms'], ratio,
+                     before['queries'], result['queries']))
+    return rows
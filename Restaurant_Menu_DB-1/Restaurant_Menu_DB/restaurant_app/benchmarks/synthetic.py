@@ -0,0 +1,171 @@
+import random
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from restaurant_app.models import (
+    Restaurant, Menu, MenuVersion, MenuSection, MenuItem,
+    DietaryRestriction, MenuItemDietaryRestriction
+)
+
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '10m': 10_000_000,
+}
+
+MENUS_PER_RESTAURANT = 2
+VERSIONS_PER_MENU = 2
+SECTIONS_PER_VERSION = 6
+ITEMS_PER_SECTION = 10
+ITEMS_PER_RESTAURANT = MENUS_PER_RESTAURANT * VERSIONS_PER_MENU * SECTIONS_PER_VERSION * ITEMS_PER_SECTION
+
+MENU_NAMES = ['Lunch', 'Dinner', 'Brunch', 'Drinks', 'Kids', 'Late Night']
+SECTION_NAMES = ['Starters', 'Soups', 'Salads', 'Mains', 'Sides', 'Desserts', 'Specials', 'Beverages']
+DISH_WORDS = ['Grilled', 'Roasted', 'Spicy', 'Crispy', 'Smoked', 'Braised', 'Fresh', 'Garlic',
+              'Lemon', 'Herb', 'Chili', 'Honey', 'Truffle', 'Basil', 'Ginger', 'Sesame']
+DISH_NOUNS = ['Chicken', 'Salmon', 'Tofu', 'Risotto', 'Burger', 'Noodles', 'Tacos', 'Curry',
+              'Steak', 'Soup', 'Salad', 'Pasta', 'Dumplings', 'Flatbread', 'Cake', 'Lemonade']
+DIETARY_RESTRICTIONS = ['Vegan', 'Vegetarian', 'Gluten-Free', 'Dairy-Free', 'Nut-Free', 'Halal',
+                        'Kosher', 'Keto']
+
+
+def ensure_schema():
+    """
+    Creates the tables of any restaurant_app model that is missing from the database.
+
+    A benchmark-only shortcut for throwaway databases. Real databases get their
+    schema from `manage.py migrate`; tables created here are not recorded in the
+    migration history, so do not run migrate against the same database later.
+    """
+    from django.apps import apps
+
+    existing = set(connection.introspection.table_names())
+    created = []
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config('restaurant_app').get_models():
+            if model._meta.db_table not in existing:
+                editor.create_model(model)
+                created.append(model._meta.db_table)
+    return created
+
+
+def _next_id(model):
+    return (model.objects.aggregate(latest=Max('id'))['latest'] or 0) + 1
+
+
+class SyntheticMenuGenerator:
+    """
+    Fills Restaurant -> Menu -> MenuVersion -> MenuSection -> MenuItem -> MenuItemDietaryRestriction
+    with reproducible data for a given seed.
+
+    Every restaurant gets the same shape (ITEMS_PER_RESTAURANT items over a fixed
+    number of menus, versions and sections, the latest version of each menu
+    active); names, prices and dietary tags vary with the seed. Primary keys are
+    assigned up front so rows can be bulk inserted without reading IDs back, and
+    rows are flushed every `chunk_size` items to keep memory bounded.
+    """
+
+    def __init__(self, items, seed=42, chunk_size=20_000):
+        self.items = items
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.counts = {
+            'restaurants': 0,
+            'menus': 0,
+            'versions': 0,
+            'sections': 0,
+            'items': 0,
+            'dietary_links': 0,
+        }
+
+    def run(self, log=None):
+        restriction_ids = self._ensure_restrictions()
+
+        ids = {model: _next_id(model) for model in (Restaurant, Menu, MenuVersion, MenuSection, MenuItem)}
+        pending = {model: [] for model in (Restaurant, Menu, MenuVersion, MenuSection, MenuItem,
+                                           MenuItemDietaryRestriction)}
+        restaurants = max(1, -(-self.items // ITEMS_PER_RESTAURANT))
+
+        for number in range(restaurants):
+            restaurant_id = ids[Restaurant]
+            ids[Restaurant] += 1
+            pending[Restaurant].append(Restaurant(
+                id=restaurant_id,
+                name=f'{self.random.choice(DISH_WORDS)} {self.random.choice(DISH_NOUNS)} House #{restaurant_id}',
+                address=f'{self.random.randint(1, 9999)} Synthetic Street'
+            ))
+            self._add_menus(restaurant_id, ids, pending, restriction_ids)
+
+            if len(pending[MenuItem]) >= self.chunk_size or number == restaurants - 1:
+                self._flush(pending)
+                if log:
+                    log(f"{self.counts['items']} items written")
+        return self.counts
+
+    def _ensure_restrictions(self):
+        existing = dict(DietaryRestriction.objects.filter(
+            name__in=DIETARY_RESTRICTIONS
+        ).values_list('name', 'id'))
+        missing = [name for name in DIETARY_RESTRICTIONS if name not in existing]
+        if missing:
+            DietaryRestriction.objects.bulk_create([DietaryRestriction(name=name) for name in missing])
+            existing = dict(DietaryRestriction.objects.filter(
+                name__in=DIETARY_RESTRICTIONS
+            ).values_list('name', 'id'))
+        return [existing[name] for name in DIETARY_RESTRICTIONS]
+
+    def _add_menus(self, restaurant_id, ids, pending, restriction_ids):
+        for menu_name in self.random.sample(MENU_NAMES, MENUS_PER_RESTAURANT):
+            menu_id = ids[Menu]
+            ids[Menu] += 1
+            pending[Menu].append(Menu(id=menu_id, restaurant_id=restaurant_id, name=menu_name))
+
+            for version_number in range(1, VERSIONS_PER_MENU + 1):
+                version_id = ids[MenuVersion]
+                ids[MenuVersion] += 1
+                pending[MenuVersion].append(MenuVersion(
+                    id=version_id,
+                    menu_id=menu_id,
+                    version_number=version_number,
+                    is_active=version_number == VERSIONS_PER_MENU,
+                    created_by='Synthetic data'
+                ))
+
+                for section_name in self.random.sample(SECTION_NAMES, SECTIONS_PER_VERSION):
+                    section_id = ids[MenuSection]
+                    ids[MenuSection] += 1
+                    pending[MenuSection].append(MenuSection(
+                        id=section_id, menu_version_id=version_id, name=section_name
+                    ))
+
+                    for position in range(ITEMS_PER_SECTION):
+                        item_id = ids[MenuItem]
+                        ids[MenuItem] += 1
+                        pending[MenuItem].append(MenuItem(
+                            id=item_id,
+                            section_id=section_id,
+                            name=f'{self.random.choice(DISH_WORDS)} {self.random.choice(DISH_NOUNS)} {position + 1}',
+                            description=f'{self.random.choice(DISH_WORDS)} and {self.random.choice(DISH_WORDS).lower()}',
+                            price=Decimal(self.random.randint(199, 4999)) / 100
+                        ))
+                        for restriction_id in self.random.sample(restriction_ids, self.random.randint(0, 3)):
+                            pending[MenuItemDietaryRestriction].append(MenuItemDietaryRestriction(
+                                item_id=item_id, restriction_id=restriction_id
+                            ))
+
+    def _flush(self, pending):
+        counters = {
+            Restaurant: 'restaurants',
+            Menu: 'menus',
+            MenuVersion: 'versions',
+            MenuSection: 'sections',
+            MenuItem: 'items',
+            MenuItemDietaryRestriction: 'dietary_links',
+        }
+        with transaction.atomic():
+            for model, counter in counters.items():
+                model.objects.bulk_create(pending[model], batch_size=2000)
+                self.counts[counter] += len(pending[model])
+                pending[model] = []
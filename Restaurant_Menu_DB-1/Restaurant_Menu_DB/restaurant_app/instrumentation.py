@@ -0,0 +1,125 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+MILLISECOND_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+METRICS = {
+    'queries': QUERY_BUCKETS,
+    'db_ms': MILLISECOND_BUCKETS,
+    'serialization_ms': MILLISECOND_BUCKETS,
+    'total_ms': MILLISECOND_BUCKETS,
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running count and sum, safe to share between threads."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'count': count, 'sum': round(total, 3)}
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serialization_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+
+class MetricsRegistry:
+    """Per-process histograms of request metrics, keyed by resolved URL name."""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, values):
+        histograms = self._endpoints.get(endpoint)
+        if histograms is None:
+            with self._lock:
+                histograms = self._endpoints.setdefault(endpoint, {
+                    name: Histogram(buckets) for name, buckets in METRICS.items()
+                })
+        for name, value in values.items():
+            histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            endpoint: {name: histogram.snapshot() for name, histogram in histograms.items()}
+            for endpoint, histograms in sorted(endpoints.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = MetricsRegistry()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper hook counting queries and database time of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+@contextmanager
+def timed_serialization():
+    """Adds the time spent in the block to the current request's serialization time."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serialization_time += time.perf_counter() - started
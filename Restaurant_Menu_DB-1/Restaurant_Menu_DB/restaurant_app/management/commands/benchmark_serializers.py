@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from restaurant_app.models import Restaurant, Menu, MenuVersion, MenuSection, MenuItem
+from restaurant_app.serializers import MenuItemSerializer, MenuItemReadSerializer
+
+
+def _best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = ('Compares listing MenuItem rows through MenuItemSerializer (ModelSerializer) and '
+            'MenuItemReadSerializer (values() fast path). Fixture rows are rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-speedup', type=float, default=5.0,
+                            help='Fail if the fast path is not at least this many times faster '
+                                 '(default: 5, 0 disables the check)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        with transaction.atomic():
+            self._ensure_items(rows)
+
+            queryset = MenuItem.objects.order_by('id')[:rows]
+            values = MenuItemReadSerializer.values(MenuItem.objects.order_by('id'))[:rows]
+
+            # .all() clones the querysets so every run includes the query, not a cached result
+            model_serializer = _best_of(
+                options['repeat'], lambda: MenuItemSerializer(queryset.all(), many=True).data
+            )
+            fast_serializer = _best_of(
+                options['repeat'], lambda: MenuItemReadSerializer.serialize_rows(values.all())
+            )
+
+            transaction.set_rollback(True)
+
+        speedup = model_serializer / fast_serializer
+        self.stdout.write(f'ModelSerializer:     {model_serializer * 1000:8.1f} ms for {rows} items')
+        self.stdout.write(f'Values fast path:    {fast_serializer * 1000:8.1f} ms for {rows} items')
+        self.stdout.write(self.style.SUCCESS(f'Speedup:             {speedup:8.1f}x'))
+
+        if options['min_speedup'] and speedup < options['min_speedup']:
+            raise CommandError(f"Speedup {speedup:.1f}x is below the required {options['min_speedup']}x")
+
+    def _ensure_items(self, rows):
+        missing = rows - MenuItem.objects.count()
+        if missing <= 0:
+            return
+        restaurant = Restaurant.objects.create(name='Benchmark Restaurant')
+        menu = Menu.objects.create(restaurant=restaurant, name='Benchmark Menu')
+        version = MenuVersion.objects.create(menu=menu, version_number=1, is_active=False)
+        section = MenuSection.objects.create(menu_version=version, name='Benchmark Section')
+        MenuItem.objects.bulk_create([
+            MenuItem(section=section, name=f'Benchmark Item {number}',
+                     description='Benchmark description', price=f'{number % 5000}.99')
+            for number in range(missing)
+        ], batch_size=2000)
@@ -0,0 +1,23 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services import catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes every active menu into the memory-mapped catalog snapshot at CATALOG_SNAPSHOT_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched per round trip')
+        parser.add_argument('--output', help='Write the snapshot here instead of CATALOG_SNAPSHOT_PATH')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        path = str(options['output'] or catalog_snapshot.snapshot_path())
+        menus = catalog_snapshot.build_snapshot(path, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {menus} menus ({os.path.getsize(path) / 1024 / 1024:.1f} MiB) to {path} '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services import menu_search
+
+
+class Command(BaseCommand):
+    help = 'Builds the menu item search index from the active-menu read model and writes it to SEARCH_INDEX_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched per round trip')
+        parser.add_argument('--output', help='Write the index here instead of SEARCH_INDEX_PATH')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = menu_search.build_index(chunk_size=options['chunk_size'])
+        menu_search.save_index(index, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {index.document_count} items and {len(index.postings)} terms '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from restaurant_app import replicas
+
+
+class Command(BaseCommand):
+    help = ('Measures the replication lag of every read replica against the heartbeat '
+            'that manage.py replica_heartbeat stamps on the primary')
+
+    def handle(self, *args, **options):
+        if not replicas.replica_aliases():
+            self.stdout.write('No read replicas configured')
+            return
+
+        lag = replicas.monitor.check()
+        for alias, seconds in lag.items():
+            if alias in replicas.monitor.healthy:
+                detail = f'lag {seconds:.1f} s' if seconds is not None else 'lag not measured'
+                self.stdout.write(self.style.SUCCESS(f'{alias}: healthy, {detail}'))
+            elif seconds is None:
+                self.stdout.write(self.style.ERROR(f'{alias}: unavailable or no heartbeat replicated'))
+            else:
+                self.stdout.write(self.style.WARNING(f'{alias}: dropped, lag {seconds:.1f} s'))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services.menu_export import iter_export, FORMATS, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Streams restaurants with their full menu trees as JSON lines or CSV, one row per menu item and per empty section'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+        parser.add_argument('--restaurant-ids', type=lambda value: [int(pk) for pk in value.split(',')],
+                            help='Comma-separated restaurant IDs to export')
+        parser.add_argument('--active-only', action='store_true',
+                            help='Only export active menu versions')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Items read per query')
+
+    def handle(self, *args, **options):
+        chunks = iter_export(
+            options['format'],
+            restaurant_ids=options['restaurant_ids'],
+            active_only=options['active_only'],
+            chunk_size=options['chunk_size']
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
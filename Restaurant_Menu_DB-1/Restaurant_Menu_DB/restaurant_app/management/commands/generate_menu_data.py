@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_app.benchmarks import synthetic
+from restaurant_app.services import price_stats, active_menu
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with reproducible synthetic restaurants, menus, versions, sections, '
+            'items and dietary tags for benchmarking')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(synthetic.SCALES), default='1k',
+                            help='Approximate number of menu items to generate')
+        parser.add_argument('--items', type=int,
+                            help='Exact item target, overrides --scale')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=20_000,
+                            help='Items buffered in memory before each bulk insert')
+        parser.add_argument('--create-schema', action='store_true',
+                            help='Create missing restaurant_app tables directly from the models first '
+                                 '(throwaway benchmark databases only; use migrate otherwise)')
+
+    def handle(self, *args, **options):
+        items = options['items'] or synthetic.SCALES[options['scale']]
+        if items <= 0:
+            raise CommandError('--items must be positive')
+
+        if options['create_schema']:
+            created = synthetic.ensure_schema()
+            if created:
+                self.stdout.write(f"Created tables: {', '.join(created)}")
+
+        generator = synthetic.SyntheticMenuGenerator(
+            items, seed=options['seed'], chunk_size=options['chunk_size']
+        )
+        counts = generator.run(log=self.stdout.write)
+
+        # bulk_create skips the signal handlers that keep the derived tables current
+        price_stats.rebuild_all()
+        active_menu.rebuild_all()
+
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Generated {summary}'))
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_app.services.menu_import import MenuImporter, iter_rows, FORMATS, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports restaurants, menus, versions, sections, items and dietary tags from JSON lines or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='File format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows written per transaction')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format {'/'.join(FORMATS)}")
+
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                result = MenuImporter(chunk_size=options['chunk_size']).run(iter_rows(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+
+        created = ', '.join(f'{count} {name}' for name, count in result['created'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {result['rows']} rows ({result['error_count']} errors). Created {created}."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services import active_menu
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized active-menu read model (ActiveMenuItem) for every menu'
+
+    def handle(self, *args, **options):
+        total = active_menu.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the active-menu read model for {total} menus'))
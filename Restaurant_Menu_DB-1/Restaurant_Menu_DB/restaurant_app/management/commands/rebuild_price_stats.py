@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services import price_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized per-restaurant price statistics table from all menu items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched and written per batch')
+
+    def handle(self, *args, **options):
+        total = price_stats.rebuild_all(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt price statistics for {total} restaurants'))
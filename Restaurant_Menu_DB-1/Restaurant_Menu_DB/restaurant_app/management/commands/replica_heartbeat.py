@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from restaurant_app import replicas
+
+
+class Command(BaseCommand):
+    help = ('Stamps the replication heartbeat on the primary every REPLICA_HEARTBEAT_SECONDS; '
+            'run exactly one per primary, the replica monitors of the web workers only read it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Stamp a single heartbeat and exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            replicas.stamp_heartbeat()
+            self.stdout.write(self.style.SUCCESS('Heartbeat stamped'))
+            return
+
+        self.stdout.write(f'Stamping a heartbeat every {replicas.heartbeat_seconds()} s')
+        while True:
+            try:
+                replicas.stamp_heartbeat()
+            except DatabaseError as e:
+                self.stderr.write(f'Heartbeat failed: {e}')
+                connections.close_all()
+            time.sleep(replicas.heartbeat_seconds())
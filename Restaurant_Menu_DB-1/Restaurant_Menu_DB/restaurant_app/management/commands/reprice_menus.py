@@ -0,0 +1,66 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_app.services.menu_repricing import RepricingRule, reprice
+
+
+class Command(BaseCommand):
+    help = 'Applies percentage price changes to active menu versions with one set-based UPDATE per rule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--percent', help='Price change in percent, e.g. 4.5 or -10')
+        parser.add_argument('--round-to', default='0.01', help='Round new prices to a multiple of this')
+        parser.add_argument('--minimum-price', default='0.00', help='Lower bound for new prices')
+        parser.add_argument('--restaurant', type=int, action='append', default=[],
+                            help='Only reprice this restaurant (repeatable)')
+        parser.add_argument('--section', action='append', default=[],
+                            help='Only reprice sections with this name (repeatable)')
+        parser.add_argument('--dietary', action='append', default=[],
+                            help='Only reprice items tagged with this restriction (repeatable)')
+        parser.add_argument('--rules-file',
+                            help='JSON file with a list of rules, as accepted by /api/reprice/menus/')
+        parser.add_argument('--clone', action='store_true',
+                            help='Reprice copies of the active versions instead of the versions themselves')
+        parser.add_argument('--publish', action='store_true', help='With --clone, activate the repriced copies')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without keeping them')
+
+    def handle(self, *args, **options):
+        if options['rules_file']:
+            try:
+                with open(options['rules_file'], encoding='utf-8') as source:
+                    rules = json.load(source)
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+        elif options['percent'] is not None:
+            rules = [{
+                'percent': options['percent'],
+                'round_to': options['round_to'],
+                'minimum_price': options['minimum_price'],
+                'restaurant_ids': options['restaurant'],
+                'section_names': options['section'],
+                'dietary_restrictions': options['dietary'],
+            }]
+        else:
+            raise CommandError('Pass --percent or --rules-file')
+
+        if not isinstance(rules, list) or not rules:
+            raise CommandError('The rules file must hold a non-empty list of rules')
+        try:
+            result = reprice(
+                [RepricingRule.from_dict(rule) for rule in rules],
+                clone=options['clone'],
+                publish=options['publish'],
+                dry_run=options['dry_run']
+            )
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        for number, report in enumerate(result['rules'], 1):
+            self.stdout.write(
+                f"Rule {number} ({report['rule']['percent']}%): {report['items']} items, "
+                f"total {report['total_before']} -> {report['total_after']}"
+            )
+        outcome = 'Would reprice' if result['dry_run'] else 'Repriced'
+        self.stdout.write(self.style.SUCCESS(f"{outcome} {len(result['versions'])} menu versions"))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_app.benchmarks import runner
+
+
+class Command(BaseCommand):
+    help = ('Times every menu_queries function and read endpoint against the current database, '
+            'records SQL query counts and writes the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed runs per case')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Seed for choosing the restaurant and menu to query')
+        parser.add_argument('--only', nargs='*', help='Run only cases whose name contains one of these')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare median timings against')
+
+    def handle(self, *args, **options):
+        if options['repeat'] <= 0:
+            raise CommandError('--repeat must be positive')
+
+        def log(result):
+            self.stdout.write(
+                f"{result['name']:<55} median {result['median_ms']:9.3f} ms  "
+                f"p95 {result['p95_ms']:9.3f} ms  {result['queries']:3d} queries"
+            )
+
+        try:
+            report = runner.run_benchmarks(
+                repeat=options['repeat'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                only=options['only'],
+                log=log
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['results'])} results to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            self.stdout.write('')
+            for name, before, after, ratio, queries_before, queries_after in runner.compare(report, baseline):
+                change = f'{ratio:6.2f}x' if ratio is not None else '     -'
+                self.stdout.write(
+                    f'{name:<55} {before:9.3f} -> {after:9.3f} ms  {change}  '
+                    f'queries {queries_before} -> {queries_after}'
+                )
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from restaurant_app.services import pdf_ingestion
+
+
+class Command(BaseCommand):
+    help = 'Processes queued menu PDFs in a process pool, writing each one as a new MenuVersion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            help='Parser processes (defaults to the CPU count)')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds between queue polls when idle')
+        parser.add_argument('--stale-after', type=int, default=30 * 60,
+                            help='Seconds after which a job stuck in Processing is re-queued')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        pdf_ingestion.run_worker(
+            workers=options['workers'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            stale_after=timedelta(seconds=options['stale_after']),
+            log=self.stdout.write
+        )
@@ -0,0 +1,47 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant_app.models import MenuVersion
+from restaurant_app.services.dietary_tagging import sync_version_tags
+
+
+class Command(BaseCommand):
+    help = 'Sets the dietary restrictions of a menu version\'s items from a JSON feed in a few bulk queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help='JSON file with a list of entries, as accepted by the dietary-tags endpoint')
+        parser.add_argument('--restaurant', type=int, required=True, help='Restaurant ID')
+        parser.add_argument('--menu', type=int, required=True, help='Menu ID')
+        parser.add_argument('--version-number', type=int, required=True, help='Version number to tag')
+        parser.add_argument('--prune', action='store_true',
+                            help='Remove all restrictions from items missing from the feed')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without making them')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['feed'], encoding='utf-8') as source:
+                entries = json.load(source)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if not isinstance(entries, list) or not entries:
+            raise CommandError('The feed must hold a non-empty list of entries')
+
+        try:
+            result = sync_version_tags(
+                options['restaurant'], options['menu'], options['version_number'], entries,
+                prune=options['prune'],
+                dry_run=options['dry_run']
+            )
+        except MenuVersion.DoesNotExist:
+            raise CommandError('Menu version not found')
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        for error in result['errors']:
+            self.stderr.write(f"Entry {error['entry']}: {error['message']}")
+        outcome = 'Would tag' if result['dry_run'] else 'Tagged'
+        self.stdout.write(self.style.SUCCESS(
+            f"{outcome} {result['items']} items: {result['added']} links added, {result['removed']} removed"
+        ))
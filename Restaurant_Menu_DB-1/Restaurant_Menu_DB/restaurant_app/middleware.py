@@ -0,0 +1,149 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation, replicas
+
+logger = logging.getLogger(__name__)
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records SQL query count, database time, serialization time and total latency
+    for every request, tagged with the resolved URL name.
+
+    Results go into the in-process histograms served by metrics_view and into a
+    Server-Timing response header. Requests that run more queries than
+    QUERY_BUDGETS allows for their method and URL name are logged, or raise
+    QueryBudgetExceeded when QUERY_BUDGETS_ENFORCE is on (meant for CI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = instrumentation.start_request()
+        started = time.perf_counter()
+        try:
+            with self.instrument_connections():
+                response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # The async ORM runs queries on the request's thread-sensitive thread,
+        # whose connection objects are its own, so the wrappers are installed
+        # and removed there. The metrics context variable is copied along.
+        metrics, token = instrumentation.start_request()
+        started = time.perf_counter()
+        try:
+            stack = await sync_to_async(self.instrument_connections)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    @staticmethod
+    def instrument_connections():
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(instrumentation.query_wrapper))
+        return stack
+
+    def finish(self, request, response, metrics, total_time):
+        endpoint = self.endpoint_name(request)
+        instrumentation.registry.record(endpoint, {
+            'queries': metrics.queries,
+            'db_ms': metrics.db_time * 1000,
+            'serialization_ms': metrics.serialization_time * 1000,
+            'total_ms': total_time * 1000,
+        })
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.1f}, '
+            f'serialization;dur={metrics.serialization_time * 1000:.1f}, '
+            f'total;dur={total_time * 1000:.1f}'
+        )
+        response['X-Query-Count'] = str(metrics.queries)
+
+        self.check_budget(endpoint, metrics.queries, request.method)
+        return response
+
+    @staticmethod
+    def endpoint_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return '<unresolved>'
+        return match.view_name
+
+    @staticmethod
+    def check_budget(endpoint, queries, method='GET'):
+        # A plain URL name budgets reads; writes and read-only POST endpoints need 'METHOD name'
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        budget = budgets.get(f'{method} {endpoint}')
+        if budget is None and method in ('GET', 'HEAD'):
+            budget = budgets.get(endpoint)
+        if budget is None or queries <= budget:
+            return
+        message = f'{method} {endpoint} ran {queries} SQL queries, budget is {budget}'
+        if getattr(settings, 'QUERY_BUDGETS_ENFORCE', False):
+            raise instrumentation.QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Gives read-your-writes consistency on top of replica routing.
+
+    A request that writes to the primary gets a cookie pinning its client to
+    the primary for REPLICA_STICKY_SECONDS, longer than a replica may trail
+    before it is dropped. Requests carrying the cookie read from the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'replica_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = replicas.start_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = replicas.start_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state.wrote and replicas.replica_aliases():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=replicas.sticky_seconds(), httponly=True, samesite='Lax'
+            )
+        return response
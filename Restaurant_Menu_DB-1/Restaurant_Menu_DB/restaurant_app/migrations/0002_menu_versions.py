@@ -0,0 +1,94 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def split_menus_into_versions(apps, schema_editor):
+    """
+    Turns the old one-row-per-version menus into one menu with a version per row.
+
+    Rows sharing a restaurant and menu name become the versions of the first of
+    them, numbered by their old version (bumped where two rows had the same one);
+    the highest is the active version. Sections move from the menu link table to
+    their version, and processing logs follow their menu to its version.
+    """
+    Menu = apps.get_model('restaurant_app', 'Menu')
+    MenuVersion = apps.get_model('restaurant_app', 'MenuVersion')
+    MenuSection = apps.get_model('restaurant_app', 'MenuSection')
+    MenuMenuSection = apps.get_model('restaurant_app', 'Menu_MenuSection')
+    ProcessingLog = apps.get_model('restaurant_app', 'ProcessingLog')
+
+    groups = {}
+    for menu in Menu.objects.order_by('version', 'id'):
+        groups.setdefault((menu.restaurant_id, menu.name), []).append(menu)
+
+    version_ids = {}
+    for menus in groups.values():
+        version_number = 0
+        for menu in menus:
+            version_number = max(menu.version or 1, version_number + 1)
+            version_ids[menu.pk] = MenuVersion.objects.create(
+                menu_id=menus[0].pk, version_number=version_number, created_at=menu.created_at,
+                is_active=menu is menus[-1]
+            ).pk
+
+    for log in ProcessingLog.objects.exclude(menu_id=None):
+        log.menu_version_id = version_ids[log.menu_id]
+        log.save(update_fields=['menu_version'])
+
+    # A section shared by several menus stays with the first one it was linked to
+    for link in MenuMenuSection.objects.order_by('id'):
+        MenuSection.objects.filter(pk=link.section_id, menu_version=None).update(
+            menu_version_id=version_ids[link.menu_id]
+        )
+    # Sections outside any menu were unreachable
+    MenuSection.objects.filter(menu_version=None).delete()
+
+    for menus in groups.values():
+        duplicates = [menu.pk for menu in menus[1:]]
+        if duplicates:
+            # Keep the logs of the merged rows from cascading with them
+            ProcessingLog.objects.filter(menu_id__in=duplicates).update(menu_id=menus[0].pk)
+            Menu.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RenameField(model_name='dietaryrestriction', old_name='restriction_name', new_name='name'),
+        migrations.RenameField(model_name='menu', old_name='menu_name', new_name='name'),
+        migrations.RenameField(model_name='menusection', old_name='section_name', new_name='name'),
+        migrations.RenameField(model_name='menuitem', old_name='item_name', new_name='name'),
+        migrations.RenameField(model_name='processinglog', old_name='processed_at', new_name='started_at'),
+        migrations.RenameModel(old_name='MenuItem_DietaryRestriction', new_name='MenuItemDietaryRestriction'),
+        migrations.CreateModel(
+            name='MenuVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version_number', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.CharField(default='System', max_length=255)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Indicates if this is the currently active version')),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurant_app.menu')),
+            ],
+            options={
+                'ordering': ['-version_number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menusection',
+            name='menu_version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='restaurant_app.menuversion'),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='menu_version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='restaurant_app.menuversion'),
+        ),
+        migrations.RunPython(split_menus_into_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,202 @@
+# Generated by Django 5.1.3 on 2026-10-17 00:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0002_menu_versions'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='menu_menusection',
+            unique_together=None,
+        ),
+        migrations.RemoveField(
+            model_name='menu_menusection',
+            name='menu',
+        ),
+        migrations.RemoveField(
+            model_name='menu_menusection',
+            name='section',
+        ),
+        migrations.AlterUniqueTogether(
+            name='menu',
+            unique_together={('restaurant', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='menuitem',
+            unique_together={('section', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='menusection',
+            unique_together={('menu_version', 'name')},
+        ),
+        migrations.RemoveField(
+            model_name='processinglog',
+            name='menu',
+        ),
+        migrations.AddField(
+            model_name='dietaryrestriction',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dietaryrestriction',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='menu',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='menu',
+            name='name',
+            field=models.CharField(default='Unnamed Menu', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='name',
+            field=models.CharField(db_index=True, default='Unnamed Item', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='restaurant_app.menusection'),
+        ),
+        migrations.AlterField(
+            model_name='menusection',
+            name='menu_version',
+            field=models.ForeignKey(help_text='The specific version of the menu this section belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='restaurant_app.menuversion'),
+        ),
+        migrations.AlterField(
+            model_name='menusection',
+            name='name',
+            field=models.CharField(default='Unnamed Section', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='processinglog',
+            name='file_name',
+            field=models.CharField(default='Unnamed File', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='processinglog',
+            name='started_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='processinglog',
+            name='status',
+            field=models.CharField(db_index=True, default='Pending', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='name',
+            field=models.CharField(default='Unnamed Restaurant', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterUniqueTogether(
+            name='menuversion',
+            unique_together={('menu', 'version_number')},
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['section'], name='restaurant__section_40b90c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['name'], name='restaurant__name_2445bc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['price'], name='restaurant__price_6c39c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemdietaryrestriction',
+            index=models.Index(fields=['item'], name='restaurant__item_id_154a48_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemdietaryrestriction',
+            index=models.Index(fields=['restriction'], name='restaurant__restric_072f6f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menusection',
+            index=models.Index(fields=['menu_version'], name='restaurant__menu_ve_78dc7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuversion',
+            index=models.Index(fields=['menu'], name='restaurant__menu_id_2dc67f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuversion',
+            index=models.Index(fields=['is_active'], name='restaurant__is_acti_903f2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processinglog',
+            index=models.Index(fields=['menu_version'], name='restaurant__menu_ve_84192f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processinglog',
+            index=models.Index(fields=['status'], name='restaurant__status_2ab211_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processinglog',
+            index=models.Index(fields=['completed_at'], name='restaurant__complet_9c8e91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['name'], name='restaurant__name_6aa240_idx'),
+        ),
+        migrations.DeleteModel(
+            name='Menu_MenuSection',
+        ),
+        migrations.RemoveField(
+            model_name='menu',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='menu',
+            name='version',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='menusection',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='menusection',
+            name='updated_at',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0003_menu_versions_cleanup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantPriceStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='restaurant_app.restaurant')),
+                ('item_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_item_id', models.BigIntegerField(blank=True, null=True)),
+                ('max_item_id', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item_count'], name='restaurant__item_co_802d01_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0004_restaurantpricestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuIngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='menu_pdfs/')),
+                ('activate', models.BooleanField(default=False, help_text='Make the new version active once it is written')),
+                ('created_by', models.CharField(default='System', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_by', models.CharField(blank=True, max_length=255, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurant_app.menu')),
+                ('processing_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_job', to='restaurant_app.processinglog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['claimed_at'], name='restaurant__claimed_412823_idx')],
+            },
+        ),
+    ]
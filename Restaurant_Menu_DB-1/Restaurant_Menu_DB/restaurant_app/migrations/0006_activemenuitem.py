@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0005_menuingestionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveMenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_name', models.CharField(max_length=255)),
+                ('menu_name', models.CharField(max_length=255)),
+                ('menu_version_id', models.BigIntegerField()),
+                ('version_number', models.IntegerField()),
+                ('section_id', models.BigIntegerField()),
+                ('section_name', models.CharField(max_length=255)),
+                ('item_id', models.BigIntegerField(blank=True, null=True)),
+                ('item_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('dietary_restriction_ids', models.JSONField(default=list)),
+                ('menu', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant_app.menu')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant_app.restaurant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['menu', 'section_id', 'item_id'], name='restaurant__menu_id_4d18ef_idx'), models.Index(fields=['menu_version_id'], name='restaurant__menu_ve_073fc0_idx')],
+            },
+        ),
+    ]
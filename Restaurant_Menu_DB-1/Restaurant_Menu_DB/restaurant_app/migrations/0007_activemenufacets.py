@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0006_activemenuitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveMenuFacets',
+            fields=[
+                ('menu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='restaurant_app.menu')),
+                ('menu_version_id', models.BigIntegerField()),
+                ('sections', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant_app.restaurant')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-17 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant_app', '0008_replicationheartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveMenuChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_id', models.BigIntegerField(unique=True)),
+            ],
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 class Restaurant(models.Model):
@@ -53,10 +53,15 @@ class MenuVersion(models.Model):
 
     def save(self, *args, **kwargs):
         """Override save to ensure only one version is active at a time"""
-        if self.is_active:
+        if not self.is_active:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            # Lock the menu row so concurrent publishes of the same menu run one after the other
+            Menu.objects.select_for_update().filter(pk=self.menu_id).values_list('pk', flat=True).first()
             # Set all other versions of this menu to inactive
-            MenuVersion.objects.filter(menu=self.menu).exclude(pk=self.pk).update(is_active=False)
-        super().save(*args, **kwargs)
+            MenuVersion.objects.filter(menu_id=self.menu_id, is_active=True).exclude(pk=self.pk).update(is_active=False)
+            super().save(*args, **kwargs)
 
 class MenuSection(models.Model):
     """Defines sections in a menu version. Now connected to MenuVersion instead of Menu."""
@@ -130,3 +135,116 @@ class ProcessingLog(models.Model):
 
     def __str__(self):
         return f"Processing {self.file_name} - {self.status}"
+
+
+class RestaurantPriceStats(models.Model):
+    """Materialized per-restaurant price statistics, maintained by MenuItem save/delete hooks"""
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, primary_key=True,
+                                      related_name='price_stats')
+    item_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Plain IDs rather than foreign keys so that deleting the extreme item does
+    # not null them out before the delete hook gets to see which item it was
+    min_item_id = models.BigIntegerField(null=True, blank=True)
+    max_item_id = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item_count']),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.item_count} items"
+
+class MenuIngestionJob(models.Model):
+    """Queue entry for an uploaded menu PDF. Its progress is recorded in the linked ProcessingLog."""
+    processing_log = models.OneToOneField(ProcessingLog, on_delete=models.CASCADE, related_name='ingestion_job')
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, db_index=True)
+    file = models.FileField(upload_to='menu_pdfs/')
+    activate = models.BooleanField(default=False, help_text="Make the new version active once it is written")
+    created_by = models.CharField(max_length=255, default='System')
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=255, blank=True, null=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['claimed_at']),
+        ]
+
+    def __str__(self):
+        return f"Ingest {self.file.name} into {self.menu_id}"
+
+class ActiveMenuItem(models.Model):
+    """
+    Denormalized read model of the active version of every menu: one row per item,
+    plus one item-less row for each section without items. Rebuilt per menu when a
+    version is published or its sections change; item-level changes replace just
+    the item's row. Serving an active menu is a single range scan on
+    (menu, section_id, item_id).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+')
+    restaurant_name = models.CharField(max_length=255)
+    # Covered by the (menu, section_id, item_id) index
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='+', db_index=False)
+    menu_name = models.CharField(max_length=255)
+    # Plain IDs: the rows are replaced wholesale whenever these change
+    menu_version_id = models.BigIntegerField()
+    version_number = models.IntegerField()
+    section_id = models.BigIntegerField()
+    section_name = models.CharField(max_length=255)
+    item_id = models.BigIntegerField(null=True, blank=True)
+    item_name = models.CharField(max_length=255, null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    dietary_restriction_ids = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['menu', 'section_id', 'item_id']),
+            models.Index(fields=['menu_version_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_name} v{self.version_number} - {self.section_name} - {self.item_name}"
+
+class ActiveMenuFacets(models.Model):
+    """
+    Precomputed browse facets of a menu's active version: per section, the item
+    count, items per price bucket and items per dietary restriction. Rebuilt
+    together with the menu's ActiveMenuItem rows and adjusted with each item row.
+    """
+    menu = models.OneToOneField(Menu, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+')
+    menu_version_id = models.BigIntegerField()
+    sections = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Facets of menu {self.menu_id}"
+
+class ActiveMenuChange(models.Model):
+    """
+    Marker of the latest read-model change of a menu, for processes that follow
+    the read model (catalog snapshots). Every change replaces the menu's row, so
+    row IDs order the changes. Unlike ActiveMenuItem rows, the marker outlives a
+    menu that was deleted or lost its active version.
+    """
+    # Plain ID: the marker of a deleted menu stays behind
+    menu_id = models.BigIntegerField(unique=True)
+
+    def __str__(self):
+        return f"Change of menu {self.menu_id}"
+
+class ReplicationHeartbeat(models.Model):
+    """
+    Single row manage.py replica_heartbeat stamps on the primary. How far a replica's
+    copy of the stamp trails the primary's is its replication lag.
+    """
+    beat_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Heartbeat at {self.beat_at}"
@@ -0,0 +1,151 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering columns instead of using OFFSET.
+
+    Each page is fetched with a WHERE clause on the last seen values of the
+    ordering columns (e.g. name > 'x' OR (name = 'x' AND id > 5)), so with an
+    index on those columns a deep page costs the same as the first one.
+
+    Views choose the available orderings through `keyset_orderings`, a dict of
+    name -> tuple of fields that must end in a unique column; clients select one
+    with ?ordering=<name>. Cursors are opaque base64 tokens.
+    """
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_orderings = {'id': ('id',)}
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering_name, self.ordering = self.get_ordering(request, view)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['r'])
+
+        queryset = queryset.order_by(*[f'-{field}' if reverse else field for field in self.ordering])
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(cursor['v'], reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # Walking backwards from a later page means there is always a next page
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                return min(requested, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, request, view):
+        orderings = getattr(view, 'keyset_orderings', None) or self.default_orderings
+        name = request.query_params.get(self.ordering_query_param)
+        if name not in orderings:
+            name = next(iter(orderings))
+        return name, orderings[name]
+
+    def seek_filter(self, values, reverse):
+        """
+        Builds the row-value comparison (f1, f2, ...) > (v1, v2, ...) as an OR of ANDs.
+        """
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            equal = {prefix: values[index] for index, prefix in enumerate(self.ordering[:position])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[position]})
+        return condition
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.ordering:
+            value = row[field] if isinstance(row, dict) else getattr(row, field)
+            values.append(str(value) if isinstance(value, Decimal) else value)
+        payload = json.dumps({'o': self.ordering_name, 'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """
+        Decodes the cursor of the request and converts its values to the types of the ordering fields.
+
+        Raises:
+            NotFound: The cursor was tampered with or belongs to another ordering
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            values = cursor['v']
+            if (cursor['o'] != self.ordering_name or cursor['r'] not in (0, 1)
+                    or not isinstance(values, list) or len(values) != len(self.ordering)):
+                raise ValueError
+            return {'r': cursor['r'], 'v': [
+                self.clean_value(model, field, value) for field, value in zip(self.ordering, values)
+            ]}
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def clean_value(model, field, value):
+        # Seeking past NULL is undefined, and the ordering columns are not nullable
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError
+        return model._meta.get_field(field).to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,23 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed_serialization
+from .services.compact_menu import CompactMenu
+
+
+class MenuJSONEncoder(JSONEncoder):
+    """DRF's JSONEncoder that also encodes CompactMenu payloads, e.g. inside batch responses."""
+
+    def default(self, obj):
+        if isinstance(obj, CompactMenu):
+            return obj.to_dict()
+        return super().default(obj)
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its encoding time to the request instrumentation."""
+    encoder_class = MenuJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,245 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Replica chosen for the current read scope, or None outside of one
+_scope = ContextVar('replica_scope', default=None)
+# RequestState of the current request, set by ReplicaPinningMiddleware
+_request = ContextVar('replica_request', default=None)
+
+
+class RequestState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'READ_REPLICAS', ()))
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def start_request(pinned=False):
+    state = RequestState(pinned)
+    return state, _request.set(state)
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+def _pinned():
+    state = _request.get()
+    return state is not None and state.pinned
+
+
+@contextmanager
+def replica_reads():
+    """
+    Lets the ORM reads in the block go to one healthy replica.
+
+    Nested blocks keep the outer block's replica, so a request never mixes
+    rows from replicas that are at different points of the replication stream.
+    Pinned requests and blocks without a healthy replica read from the primary.
+    """
+    if _scope.get() is not None:
+        yield
+        return
+    healthy = monitor.healthy_replicas()
+    alias = random.choice(healthy) if healthy and not _pinned() else DEFAULT_DB_ALIAS
+    token = _scope.set(alias)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def read_from_replica(func):
+    """Runs a read-only function, sync or async, inside replica_reads()."""
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Sends reads inside replica_reads() to the scope's replica and everything else to the primary.
+
+    A write pins the rest of the request to the primary, and
+    ReplicaPinningMiddleware keeps the client pinned for REPLICA_STICKY_SECONDS
+    so it reads its own writes. Reads inside a transaction on the primary stay
+    on the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _scope.get()
+        if alias is None or alias == DEFAULT_DB_ALIAS or _pinned():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _beat_at(alias):
+    from restaurant_app.models import ReplicationHeartbeat
+    return ReplicationHeartbeat.objects.using(alias).filter(pk=1).values_list('beat_at', flat=True).first()
+
+
+def heartbeat_seconds():
+    return getattr(settings, 'REPLICA_HEARTBEAT_SECONDS', 1)
+
+
+def stamp_heartbeat():
+    """
+    Stamps a new heartbeat on the primary.
+
+    Called by a single writer (manage.py replica_heartbeat) every
+    REPLICA_HEARTBEAT_SECONDS; the monitors of the web workers only read it.
+    """
+    from restaurant_app.models import ReplicationHeartbeat
+    ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        pk=1, defaults={'beat_at': timezone.now()}
+    )
+
+
+class ReplicaMonitor:
+    """
+    Tracks which replicas are fit to serve reads.
+
+    Every REPLICA_CHECK_SECONDS a background thread compares each replica's
+    heartbeat row with the primary's. A caught-up replica holds the primary's
+    latest stamp; one that trails it by more than REPLICA_MAX_LAG_SECONDS, or
+    cannot be queried, is dropped until a later check finds it caught up.
+    Replicas only serve reads once the first check has passed them, and none
+    do while the primary's heartbeat is missing or stale, since lag cannot be
+    measured without manage.py replica_heartbeat running.
+    """
+
+    def __init__(self):
+        self.healthy = ()
+        self.lag = {}
+        self.checked_at = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def healthy_replicas(self):
+        if not replica_aliases():
+            return ()
+        if self._thread is None:
+            self.start()
+        return self.healthy
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='replica-monitor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception('Replica check failed')
+            finally:
+                connections.close_all()
+            time.sleep(getattr(settings, 'REPLICA_CHECK_SECONDS', 1))
+
+    def check(self):
+        """
+        Measures every replica's lag and updates the healthy set. Only reads.
+
+        Returns:
+            dict: {alias: lag in seconds, or None when the replica could not be queried or holds no heartbeat}
+        """
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 2)
+        primary_beat = _beat_at(DEFAULT_DB_ALIAS)
+        beating = primary_beat is not None and (
+            max_lag is None or (timezone.now() - primary_beat).total_seconds() <= max_lag + heartbeat_seconds()
+        )
+        if not beating and self.healthy:
+            logger.warning('No recent heartbeat on the primary; is manage.py replica_heartbeat running?')
+
+        lag = {}
+        healthy = []
+        for alias in replica_aliases():
+            try:
+                replica_beat = _beat_at(alias)
+            except DatabaseError as e:
+                logger.warning('Replica %s is unavailable: %s', alias, e)
+                lag[alias] = None
+                continue
+            if not beating:
+                lag[alias] = None
+            elif replica_beat is not None and replica_beat >= primary_beat:
+                lag[alias] = 0.0
+            elif replica_beat is None:
+                # Has not replicated a single heartbeat yet
+                lag[alias] = None
+            else:
+                lag[alias] = (primary_beat - replica_beat).total_seconds()
+            if max_lag is None or (lag[alias] is not None and lag[alias] <= max_lag):
+                healthy.append(alias)
+
+        for alias in set(self.healthy) - set(healthy):
+            logger.warning('Replica %s dropped, lag %s s', alias, lag[alias])
+        for alias in set(healthy) - set(self.healthy):
+            logger.info('Replica %s serving reads', alias)
+        self.healthy = tuple(healthy)
+        self.lag = lag
+        self.checked_at = timezone.now()
+        return lag
+
+    def status(self):
+        return {
+            'checked_at': self.checked_at,
+            'replicas': {
+                alias: {'healthy': alias in self.healthy, 'lag_seconds': self.lag.get(alias)}
+                for alias in replica_aliases()
+            }
+        }
+
+
+monitor = ReplicaMonitor()
@@ -1,7 +1,109 @@
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.utils import timezone
 from rest_framework import serializers
-from .models import MenuSection
+from .models import Restaurant, Menu, MenuSection, MenuItem, DietaryRestriction
+
+RESTAURANT_FIELDS = ['id', 'name', 'address', 'phone_number', 'email', 'website', 'created_at', 'updated_at']
+MENU_FIELDS = ['id', 'restaurant', 'name', 'created_at']
+MENU_SECTION_FIELDS = ['id', 'menu_version', 'name']
+MENU_ITEM_FIELDS = ['id', 'section', 'name', 'description', 'price']
+DIETARY_RESTRICTION_FIELDS = ['id', 'name', 'description']
+
+class RestaurantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Restaurant
+        fields = RESTAURANT_FIELDS
+
+class MenuSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Menu
+        fields = MENU_FIELDS
 
 class MenuSectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuSection
-        fields = ['id', 'name', 'display_order', 'menu']
+        fields = MENU_SECTION_FIELDS
+
+class MenuItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MenuItem
+        fields = MENU_ITEM_FIELDS
+
+class DietaryRestrictionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DietaryRestriction
+        fields = DIETARY_RESTRICTION_FIELDS
+
+
+def _datetime(value):
+    # Same output as DRF's DateTimeField with the default ISO 8601 format
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ValuesReadSerializer:
+    """
+    Read-only serializer working on QuerySet.values() rows instead of model instances.
+
+    Produces the same output as the matching ModelSerializer for list and retrieve,
+    but skips model instantiation and the per-instance field objects: each row dict
+    is emitted as-is, with only the fields listed in `converters` transformed.
+    Foreign keys come out as primary keys, like PrimaryKeyRelatedField.
+    """
+    fields = []
+    converters = {}
+    # {field: decimal_places} of DecimalFields read as plain numbers and formatted
+    # here; the database backend's Decimal conversion of every value costs more
+    # than the rest of the row. They come last in each row.
+    decimal_fields = {}
+
+    @classmethod
+    def values(cls, queryset):
+        """Selects the rows serialize_rows expects from a queryset of the model."""
+        return queryset.values(
+            *[field for field in cls.fields if field not in cls.decimal_fields],
+            **{f'raw_{field}': ExpressionWrapper(F(field), output_field=FloatField()) for field in cls.decimal_fields}
+        )
+
+    @classmethod
+    def serialize_rows(cls, rows):
+        converters = list(cls.converters.items())
+        decimal_fields = [(field, f'raw_{field}', f'{{:.{places}f}}'.format)
+                          for field, places in cls.decimal_fields.items()]
+        if not converters and not decimal_fields:
+            return list(rows)
+        data = []
+        for row in rows:
+            for field, convert in converters:
+                value = row[field]
+                if value is not None:
+                    row[field] = convert(value)
+            for field, raw_field, format_number in decimal_fields:
+                value = row.pop(raw_field)
+                row[field] = None if value is None else format_number(value)
+            data.append(row)
+        return data
+
+    @classmethod
+    def serialize_row(cls, row):
+        return cls.serialize_rows([row])[0]
+
+class RestaurantReadSerializer(ValuesReadSerializer):
+    fields = RESTAURANT_FIELDS
+    converters = {'created_at': _datetime, 'updated_at': _datetime}
+
+class MenuReadSerializer(ValuesReadSerializer):
+    fields = MENU_FIELDS
+    converters = {'created_at': _datetime}
+
+class MenuSectionReadSerializer(ValuesReadSerializer):
+    fields = MENU_SECTION_FIELDS
+
+class MenuItemReadSerializer(ValuesReadSerializer):
+    fields = MENU_ITEM_FIELDS
+    decimal_fields = {'price': MenuItem._meta.get_field('price').decimal_places}
+
+class DietaryRestrictionReadSerializer(ValuesReadSerializer):
+    fields = DIETARY_RESTRICTION_FIELDS
@@ -0,0 +1,311 @@
+from itertools import groupby
+
+from django.db import transaction
+from django.http import Http404
+
+from restaurant_app.models import (
+    MenuVersion, MenuSection, MenuItem, MenuItemDietaryRestriction, ActiveMenuItem, ActiveMenuFacets, ActiveMenuChange
+)
+from . import menu_cache, menu_search, menu_facets, catalog_snapshot
+from .compact_menu import CompactMenu
+
+MENU_ROW_FIELDS = (
+    'restaurant_id', 'restaurant_name', 'menu_name', 'version_number',
+    'section_id', 'section_name', 'item_id', 'item_name', 'description', 'price', 'dietary_restriction_ids'
+)
+
+
+def rebuild_menu(menu_id):
+    """
+    Replaces the read-model rows and browse facets of a menu with its currently active version.
+
+    Menus without an active version end up with no rows. Either way the
+    menu's change marker is replaced (see mark_changed).
+
+    Args:
+        menu_id (int): Menu ID
+
+    Returns:
+        int: Number of rows written
+    """
+    with transaction.atomic():
+        rows = _build_rows(menu_id)
+        ActiveMenuItem.objects.filter(menu_id=menu_id).delete()
+        ActiveMenuItem.objects.bulk_create(rows, batch_size=1000)
+        menu_facets.replace_menu(menu_id, rows)
+        mark_changed(menu_id)
+        transaction.on_commit(lambda: menu_search.menu_changed(menu_id, rows))
+        transaction.on_commit(lambda: catalog_snapshot.menu_changed(menu_id))
+    return len(rows)
+
+
+def refresh_item(menu_id, section_id, item_id):
+    """
+    Brings the read-model row and facet counts of one item of an active menu up to date.
+
+    Used for item-level changes instead of rebuild_menu, so saving an item costs
+    the same on a menu of any size. The row is replaced rather than updated so
+    that other processes following the read model by row ID pick up the change.
+    Moving an item to another section is not handled here; rebuild the menu.
+
+    Args:
+        menu_id (int): Menu ID
+        section_id (int): ID of the item's section in the menu's active version
+        item_id (int): Item ID; the item may have been deleted meanwhile
+
+    Returns:
+        int: Number of rows written
+    """
+    with transaction.atomic():
+        old = ActiveMenuItem.objects.filter(menu_id=menu_id, section_id=section_id, item_id=item_id).first()
+        new = _build_item_row(menu_id, section_id, item_id)
+        if old is None and new is None:
+            return 0
+
+        rows = []
+        if old is not None:
+            ActiveMenuItem.objects.filter(pk=old.pk).delete()
+        else:
+            # The section's item-less row, if this is its first item
+            ActiveMenuItem.objects.filter(menu_id=menu_id, section_id=section_id, item_id__isnull=True).delete()
+        if new is not None:
+            rows.append(new)
+        elif not ActiveMenuItem.objects.filter(menu_id=menu_id, section_id=section_id).exists():
+            rows.append(ActiveMenuItem(
+                restaurant_id=old.restaurant_id, restaurant_name=old.restaurant_name, menu_id=menu_id,
+                menu_name=old.menu_name, menu_version_id=old.menu_version_id, version_number=old.version_number,
+                section_id=section_id, section_name=old.section_name
+            ))
+        ActiveMenuItem.objects.bulk_create(rows)
+        menu_facets.replace_item(menu_id, old, new)
+        mark_changed(menu_id)
+        transaction.on_commit(lambda: menu_search.item_changed(menu_id, item_id, new))
+        transaction.on_commit(lambda: catalog_snapshot.menu_changed(menu_id))
+    return len(rows)
+
+
+def mark_changed(menu_id):
+    """
+    Replaces the menu's ActiveMenuChange marker, giving it a higher ID than every earlier change.
+
+    Other processes follow the markers instead of the read-model rows, since a
+    menu that was deleted or lost its active version leaves no rows behind.
+    """
+    ActiveMenuChange.objects.filter(menu_id=menu_id).delete()
+    ActiveMenuChange.objects.create(menu_id=menu_id)
+
+
+def menu_deleted(menu_id):
+    """Records the deletion of a menu, whose read-model rows and facets went with it."""
+    with transaction.atomic():
+        mark_changed(menu_id)
+        transaction.on_commit(lambda: catalog_snapshot.menu_changed(menu_id))
+
+
+def _build_item_row(menu_id, section_id, item_id):
+    item = MenuItem.objects.filter(
+        pk=item_id, section_id=section_id,
+        section__menu_version__menu_id=menu_id, section__menu_version__is_active=True
+    ).values(
+        'name', 'description', 'price', 'section__name', 'section__menu_version_id',
+        'section__menu_version__version_number', 'section__menu_version__menu__name',
+        'section__menu_version__menu__restaurant_id', 'section__menu_version__menu__restaurant__name'
+    ).first()
+    if item is None:
+        return None
+    return ActiveMenuItem(
+        restaurant_id=item['section__menu_version__menu__restaurant_id'],
+        restaurant_name=item['section__menu_version__menu__restaurant__name'],
+        menu_id=menu_id,
+        menu_name=item['section__menu_version__menu__name'],
+        menu_version_id=item['section__menu_version_id'],
+        version_number=item['section__menu_version__version_number'],
+        section_id=section_id,
+        section_name=item['section__name'],
+        item_id=item_id,
+        item_name=item['name'],
+        description=item['description'],
+        price=item['price'],
+        dietary_restriction_ids=list(MenuItemDietaryRestriction.objects.filter(
+            item_id=item_id
+        ).order_by('restriction_id').values_list('restriction_id', flat=True))
+    )
+
+
+def _build_rows(menu_id):
+    version = MenuVersion.objects.filter(menu_id=menu_id, is_active=True).values(
+        'id', 'version_number', 'menu__name', 'menu__restaurant_id', 'menu__restaurant__name'
+    ).first()
+
+    rows = []
+    if version is not None:
+        sections = list(MenuSection.objects.filter(
+            menu_version_id=version['id']
+        ).order_by('id').values_list('id', 'name'))
+        items = MenuItem.objects.filter(
+            section__menu_version_id=version['id']
+        ).order_by('section_id', 'id').values_list('section_id', 'id', 'name', 'description', 'price')
+
+        restrictions = {}
+        for item_id, restriction_id in MenuItemDietaryRestriction.objects.filter(
+            item__section__menu_version_id=version['id']
+        ).order_by('restriction_id').values_list('item_id', 'restriction_id'):
+            restrictions.setdefault(item_id, []).append(restriction_id)
+
+        section_items = {}
+        for section_id, item_id, name, description, price in items:
+            section_items.setdefault(section_id, []).append((item_id, name, description, price))
+
+        base = {
+            'restaurant_id': version['menu__restaurant_id'],
+            'restaurant_name': version['menu__restaurant__name'],
+            'menu_id': menu_id,
+            'menu_name': version['menu__name'],
+            'menu_version_id': version['id'],
+            'version_number': version['version_number'],
+        }
+        for section_id, section_name in sections:
+            entries = section_items.get(section_id) or [(None, None, None, None)]
+            for item_id, name, description, price in entries:
+                rows.append(ActiveMenuItem(
+                    **base,
+                    section_id=section_id,
+                    section_name=section_name,
+                    item_id=item_id,
+                    item_name=name,
+                    description=description,
+                    price=price,
+                    dietary_restriction_ids=restrictions.get(item_id, [])
+                ))
+    return rows
+
+
+def rebuild_all():
+    """
+    Rebuilds the read model for every menu that has an active version.
+
+    Returns:
+        int: Number of menus rebuilt
+    """
+    active = MenuVersion.objects.filter(is_active=True)
+    stale = ActiveMenuItem.objects.exclude(menu_id__in=active.values('menu_id'))
+    for menu_id in stale.values_list('menu_id', flat=True).distinct():
+        mark_changed(menu_id)
+    stale.delete()
+    ActiveMenuFacets.objects.exclude(menu_id__in=active.values('menu_id')).delete()
+    menu_ids = list(active.order_by('menu_id').values_list('menu_id', flat=True))
+    for menu_id in menu_ids:
+        rebuild_menu(menu_id)
+    return len(menu_ids)
+
+
+def version_changed(version):
+    """Rebuilds the menu if the saved or deleted version is, or was until now, the active one."""
+    if version.is_active or ActiveMenuItem.objects.filter(menu_version_id=version.pk).exists():
+        rebuild_menu(version.menu_id)
+
+
+def read_menu(restaurant_id, menu_id):
+    """
+    Reads the active version of a menu from the read model with a single query.
+
+    Also caches the version's dietary index built from the same rows, so a
+    following dietary filter on the menu needs no query for it.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        menu_id (int): Menu ID
+
+    Returns:
+        CompactMenu: Same as get_menu_items_by_version, or None when the menu
+        has no rows (not built yet, no active version or no sections)
+
+    Raises:
+        Http404: The menu belongs to another restaurant
+    """
+    menu_data, index = _assemble(restaurant_id, _menu_rows(menu_id))
+    if menu_data is not None:
+        menu_cache.set_dietary_index(menu_id, menu_data.version, index)
+    return menu_data
+
+
+async def aread_menu(restaurant_id, menu_id):
+    """Async version of read_menu."""
+    rows = [row async for row in _menu_rows(menu_id)]
+    menu_data, index = _assemble(restaurant_id, rows)
+    if menu_data is not None:
+        await menu_cache.aset_dietary_index(menu_id, menu_data.version, index)
+    return menu_data
+
+
+def read_menus(menu_ids):
+    """
+    Reads the active versions of many menus from the read model with a single query.
+
+    Args:
+        menu_ids (iterable): Menu IDs
+
+    Returns:
+        dict: {menu_id: (restaurant_id, menu_data)} for the menus that have rows
+    """
+    grouped = {}
+    for row in ActiveMenuItem.objects.filter(menu_id__in=menu_ids).order_by('menu_id', 'section_id', 'item_id').values_list(
+        'menu_id', *MENU_ROW_FIELDS
+    ):
+        grouped.setdefault(row[0], []).append(row[1:])
+
+    menus = {}
+    for menu_id, rows in grouped.items():
+        restaurant_id = rows[0][0]
+        menus[menu_id] = (restaurant_id, _assemble(restaurant_id, rows)[0])
+    return menus
+
+
+def iter_menus(chunk_size=5000):
+    """
+    Streams every menu in the read model, in menu ID order, with one query.
+
+    Yields:
+        tuple: (menu_id, restaurant_id, CompactMenu)
+    """
+    rows = ActiveMenuItem.objects.order_by('menu_id', 'section_id', 'item_id').values_list(
+        'menu_id', *MENU_ROW_FIELDS
+    ).iterator(chunk_size=chunk_size)
+    for menu_id, menu_rows in groupby(rows, key=lambda row: row[0]):
+        menu_rows = [row[1:] for row in menu_rows]
+        restaurant_id = menu_rows[0][0]
+        yield menu_id, restaurant_id, _assemble(restaurant_id, menu_rows)[0]
+
+
+def _menu_rows(menu_id):
+    return ActiveMenuItem.objects.filter(menu_id=menu_id).order_by('section_id', 'item_id').values_list(
+        *MENU_ROW_FIELDS
+    )
+
+
+def _assemble(restaurant_id, rows):
+    """Builds the menu payload and the dietary index of its version from read-model rows."""
+    header = None
+    sections = []
+    current_section = None
+    index = {}
+    for (row_restaurant_id, restaurant_name, menu_name, version_number, section_id, section_name,
+         item_id, item_name, description, price, restriction_ids) in rows:
+        if header is None:
+            if row_restaurant_id != int(restaurant_id):
+                raise Http404('No Menu matches the given query.')
+            header = (restaurant_name, menu_name, version_number)
+        if section_id != current_section:
+            current_section = section_id
+            items = []
+            sections.append((section_name, items))
+        if item_id is None:
+            continue
+        items.append((item_id, item_name, description, price))
+        for restriction_id in restriction_ids:
+            index.setdefault(restriction_id, set()).add(item_id)
+
+    if header is None:
+        return None, {}
+    menu_data = CompactMenu.from_sections(*header, sections)
+    return menu_data, {restriction_id: frozenset(item_ids) for restriction_id, item_ids in index.items()}
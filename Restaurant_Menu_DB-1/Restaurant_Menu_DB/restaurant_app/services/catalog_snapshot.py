@@ -0,0 +1,201 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from restaurant_app.models import ActiveMenuChange
+from . import active_menu, menu_cache
+from .compact_menu import response_body
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MENUCAT2'
+# Magic, number of menus, offset of the index, highest ActiveMenuChange ID when the build started
+HEADER = struct.Struct('<8sIQq')
+# Menu ID, restaurant ID, record offset, record length; sorted by menu ID
+INDEX_ENTRY = struct.Struct('<qqQI')
+# Each record is the quoted ETag followed by the response body
+ETAG_SIZE = 34
+
+
+def snapshot_path():
+    return getattr(settings, 'CATALOG_SNAPSHOT_PATH', None)
+
+
+def build_snapshot(path=None, chunk_size=5000):
+    """
+    Writes the menu items response of every active menu into one file.
+
+    Layout: header, packed records, then the index. The file is written next
+    to its final path and renamed into place, so workers never map a partial
+    file and pick up the new one on their next refresh.
+
+    Args:
+        path (str, optional): Defaults to CATALOG_SNAPSHOT_PATH
+        chunk_size (int): Read-model rows fetched per round trip
+
+    Returns:
+        int: Number of menus written
+    """
+    path = str(path or snapshot_path())
+    last_change_id = ActiveMenuChange.objects.aggregate(last=Max('id'))['last'] or 0
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.catalog_snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            output.write(bytes(HEADER.size))
+            offset = HEADER.size
+            index = []
+            for menu_id, restaurant_id, menu in active_menu.iter_menus(chunk_size):
+                body = response_body(menu)
+                record = menu_cache.etag_for(body).encode('ascii') + body
+                output.write(record)
+                index.append(INDEX_ENTRY.pack(menu_id, restaurant_id, offset, len(record)))
+                offset += len(record)
+            output.write(b''.join(index))
+            output.seek(0)
+            output.write(HEADER.pack(MAGIC, len(index), offset, last_change_id))
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return len(index)
+
+
+class CatalogSnapshot:
+    """
+    A mapped snapshot file.
+
+    The mapping is read-only and shared, so every worker on a host serves from
+    the same pages of the OS page cache. Lookups binary-search the index in
+    place; only the record being served is copied out.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            stat = os.fstat(source.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self.data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.index_offset, self.last_change_id = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        # Menus changed since the snapshot was built; they are served from the database
+        self.changed = set()
+        self.checked_change_id = self.last_change_id
+
+    def lookup(self, menu_id):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_menu_id, restaurant_id, offset, length = INDEX_ENTRY.unpack_from(
+                self.data, self.index_offset + middle * INDEX_ENTRY.size
+            )
+            if entry_menu_id < menu_id:
+                low = middle + 1
+            elif entry_menu_id > menu_id:
+                high = middle
+            else:
+                record = self.data[offset:offset + length]
+                return restaurant_id, record[ETAG_SIZE:], record[:ETAG_SIZE].decode('ascii')
+        return None
+
+    def catch_up(self):
+        """
+        Marks the menus whose read model changed since the last check.
+
+        Every change to a menu's read model replaces its ActiveMenuChange
+        marker, so any marker above the last checked ID marks its menu as
+        changed. That includes renaming the menu or its restaurant (see
+        signals) and menus that were deleted or deactivated, which have no
+        read-model rows left to notice.
+        """
+        for change_id, menu_id in ActiveMenuChange.objects.filter(
+            id__gt=self.checked_change_id
+        ).values_list('id', 'menu_id'):
+            self.changed.add(menu_id)
+            self.checked_change_id = max(self.checked_change_id, change_id)
+
+
+_snapshot = None
+_last_refresh = None
+_lock = threading.Lock()
+
+
+def _refresh_due():
+    interval = getattr(settings, 'CATALOG_SNAPSHOT_REFRESH_SECONDS', 5)
+    return _last_refresh is None or time.monotonic() - _last_refresh >= interval
+
+
+def _refresh():
+    global _snapshot
+    path = snapshot_path()
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None:
+        _snapshot = None
+        return
+    if _snapshot is None or _snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+        try:
+            _snapshot = CatalogSnapshot(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning('Cannot map catalog snapshot %s: %s', path, e)
+            _snapshot = None
+            return
+    _snapshot.catch_up()
+
+
+def get_snapshot():
+    """
+    Returns this process's mapped snapshot, or None without a usable file.
+
+    The file is mapped on first use. At most every CATALOG_SNAPSHOT_REFRESH_SECONDS
+    the process maps the file again if it was swapped and asks the read model
+    which menus changed since the build.
+    """
+    global _last_refresh
+    if not _refresh_due():
+        return _snapshot
+    with _lock:
+        if _refresh_due():
+            _refresh()
+            _last_refresh = time.monotonic()
+        return _snapshot
+
+
+def menu_changed(menu_id):
+    """Stops serving a rebuilt menu from this process's snapshot right away."""
+    snapshot = _snapshot
+    if snapshot is not None:
+        snapshot.changed.add(menu_id)
+
+
+def _lookup(snapshot, menu_id):
+    if snapshot is None or menu_id in snapshot.changed:
+        return None
+    return snapshot.lookup(menu_id)
+
+
+def lookup(menu_id):
+    """
+    Looks up the encoded menu items response of an active menu.
+
+    Returns:
+        tuple: (restaurant_id, body, etag) like menu_cache.get_rendered, or None when
+        the menu is not in the snapshot or changed since it was built
+    """
+    return _lookup(get_snapshot(), int(menu_id))
+
+
+async def alookup(menu_id):
+    """Async version of lookup; the periodic refresh runs in a thread."""
+    snapshot = await sync_to_async(get_snapshot)() if _refresh_due() else _snapshot
+    return _lookup(snapshot, int(menu_id))
@@ -0,0 +1,107 @@
+from django.core.exceptions import ValidationError
+
+from restaurant_app.models import MenuItemDietaryRestriction
+from . import menu_cache, lookup_cache
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_NONE = 'none'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL, MATCH_NONE)
+
+
+def get_version_index(menu_id, version_number):
+    """
+    Returns the dietary index of a menu version, building it with a single query on a cache miss.
+
+    Args:
+        menu_id (int): Menu ID
+        version_number (int): Version number
+
+    Returns:
+        dict: {restriction_id: frozenset of MenuItem IDs carrying that restriction}
+    """
+    index = menu_cache.get_dietary_index(menu_id, version_number)
+    if index is not None:
+        return index
+
+    index = _build_index(_version_links(menu_id, version_number))
+    menu_cache.set_dietary_index(menu_id, version_number, index)
+    return index
+
+
+async def aget_version_index(menu_id, version_number):
+    """Async version of get_version_index."""
+    index = await menu_cache.aget_dietary_index(menu_id, version_number)
+    if index is not None:
+        return index
+
+    index = _build_index([link async for link in _version_links(menu_id, version_number)])
+    await menu_cache.aset_dietary_index(menu_id, version_number, index)
+    return index
+
+
+def _version_links(menu_id, version_number):
+    return MenuItemDietaryRestriction.objects.filter(
+        item__section__menu_version__menu_id=menu_id,
+        item__section__menu_version__version_number=version_number
+    ).values_list('restriction_id', 'item_id')
+
+
+def _build_index(links):
+    building = {}
+    for restriction_id, item_id in links:
+        building.setdefault(restriction_id, set()).add(item_id)
+    return {restriction_id: frozenset(item_ids) for restriction_id, item_ids in building.items()}
+
+
+def resolve_restriction_ids(names):
+    """
+    Maps dietary restriction names to IDs through the in-process lookup cache.
+
+    Returns:
+        tuple: (list of IDs found, list of names that do not exist)
+    """
+    return _resolve(names, lookup_cache.restriction_ids())
+
+
+async def aresolve_restriction_ids(names):
+    """Async version of resolve_restriction_ids."""
+    return _resolve(names, await lookup_cache.arestriction_ids())
+
+
+def _resolve(names, restriction_ids):
+    found = [restriction_ids[name] for name in names if name in restriction_ids]
+    missing = [name for name in names if name not in restriction_ids]
+    return found, missing
+
+
+def build_item_filter(index, restriction_ids, match=MATCH_ANY, missing_names=()):
+    """
+    Builds a predicate on MenuItem IDs from set operations over the version index.
+
+    Args:
+        index (dict): Version index from get_version_index
+        restriction_ids (list): Restriction IDs to filter by
+        match (str): 'any' keeps items with at least one restriction, 'all' items with every
+            restriction, 'none' items with none of them
+        missing_names (iterable): Requested names that matched no restriction
+
+    Returns:
+        callable: item_id -> bool
+    """
+    if match not in MATCH_MODES:
+        raise ValidationError(f"match must be one of {', '.join(MATCH_MODES)}")
+
+    sets = [index.get(restriction_id, frozenset()) for restriction_id in restriction_ids]
+
+    if match == MATCH_ALL:
+        # An unknown restriction can never be satisfied
+        if missing_names or not sets:
+            return lambda item_id: False
+        matching = frozenset.intersection(*sets)
+        return matching.__contains__
+
+    matching = frozenset().union(*sets)
+    if match == MATCH_NONE:
+        return lambda item_id: item_id not in matching
+    return matching.__contains__
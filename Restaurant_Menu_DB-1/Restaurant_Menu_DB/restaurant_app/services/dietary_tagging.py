@@ -0,0 +1,143 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from restaurant_app.models import MenuVersion, MenuItem, DietaryRestriction, MenuItemDietaryRestriction
+from restaurant_app.signals import deferred_dietary_link_handlers
+from . import menu_cache, active_menu
+
+BATCH_SIZE = 1000
+
+
+def _restriction_names(entry):
+    names = entry.get('restrictions')
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValidationError('restrictions must be a list of names')
+    return {name.strip() for name in names if name.strip()}
+
+
+def _version_items(version_id):
+    """Item IDs of a version, and the same IDs keyed by (section name, item name)."""
+    item_ids = set()
+    by_name = {}
+    for item_id, section_name, name in MenuItem.objects.filter(
+        section__menu_version_id=version_id
+    ).values_list('id', 'section__name', 'name'):
+        item_ids.add(item_id)
+        by_name.setdefault((section_name, name), []).append(item_id)
+    return item_ids, by_name
+
+
+def _wanted_tags(entries, item_ids, items_by_name):
+    """
+    Maps each item named by the entries to the restriction names it should carry.
+
+    Returns:
+        tuple: ({item_id: set of names}, list of errors for entries matching no item)
+    """
+    wanted = {}
+    errors = []
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValidationError('Each entry must be an object')
+        names = _restriction_names(entry)
+        if entry.get('item_id') is not None:
+            try:
+                item_id = int(entry['item_id'])
+            except (TypeError, ValueError):
+                raise ValidationError('item_id must be an integer')
+            matched = [item_id] if item_id in item_ids else []
+        elif entry.get('section') and entry.get('name'):
+            # Items are matched by name when the feed does not know our IDs
+            matched = items_by_name.get((entry['section'], entry['name']), [])
+        else:
+            raise ValidationError('Each entry needs item_id, or section and name')
+
+        if not matched:
+            errors.append({'entry': position, 'message': 'Item not found in this menu version'})
+        for item_id in matched:
+            wanted.setdefault(item_id, set()).update(names)
+    return wanted, errors
+
+
+def sync_version_tags(restaurant_id, menu_id, version_number, entries, prune=False, dry_run=False):
+    """
+    Sets the dietary restrictions of many items of a menu version at once.
+
+    Each listed item ends up with exactly the restrictions given for it; the
+    difference against its current links is worked out in memory and written
+    with one bulk insert and one delete, whatever the number of items.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        menu_id (int): Menu ID
+        version_number (int): Version to tag
+        entries (list): Dicts with 'restrictions' (list of restriction names) and
+            either 'item_id' or 'section' and 'name'
+        prune (bool): Also remove every restriction from the version's items missing from entries
+        dry_run (bool): Report the changes without writing them
+
+    Returns:
+        dict: Counts of tagged items and added/removed links, plus errors for entries matching no item
+
+    Raises:
+        MenuVersion.DoesNotExist: No such version of the restaurant's menu
+        ValidationError: An entry is malformed or names an unknown restriction
+    """
+    version = MenuVersion.objects.filter(
+        menu_id=menu_id, menu__restaurant_id=restaurant_id, version_number=version_number
+    ).values('id', 'is_active').first()
+    if version is None:
+        raise MenuVersion.DoesNotExist
+
+    item_ids, items_by_name = _version_items(version['id'])
+    wanted, errors = _wanted_tags(entries, item_ids, items_by_name)
+    if prune:
+        for item_id in item_ids:
+            wanted.setdefault(item_id, set())
+
+    names = set().union(*wanted.values())
+    restriction_ids = dict(
+        DietaryRestriction.objects.filter(name__in=names).values_list('name', 'id')
+    ) if names else {}
+    unknown = names - restriction_ids.keys()
+    if unknown:
+        raise ValidationError(f'Unknown dietary restrictions: {", ".join(sorted(unknown))}')
+
+    wanted_links = {
+        (item_id, restriction_ids[name])
+        for item_id, item_names in wanted.items()
+        for name in item_names
+    }
+    existing_links = {
+        (item_id, restriction_id): link_id
+        for link_id, item_id, restriction_id in MenuItemDietaryRestriction.objects.filter(
+            item__section__menu_version_id=version['id']
+        ).values_list('id', 'item_id', 'restriction_id')
+    }
+    added = wanted_links - existing_links.keys()
+    removed = [
+        link_id for link, link_id in existing_links.items()
+        if link[0] in wanted and link not in wanted_links
+    ]
+
+    if not dry_run and (added or removed):
+        # The per-link handlers would refresh the read model once per removed link
+        with transaction.atomic(), deferred_dietary_link_handlers():
+            MenuItemDietaryRestriction.objects.bulk_create([
+                MenuItemDietaryRestriction(item_id=item_id, restriction_id=restriction_id)
+                for item_id, restriction_id in added
+            ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+            for start in range(0, len(removed), BATCH_SIZE):
+                MenuItemDietaryRestriction.objects.filter(id__in=removed[start:start + BATCH_SIZE]).delete()
+        # What the signal handlers would have done, once for the whole version
+        menu_cache.invalidate_dietary(menu_id, version_number)
+        if version['is_active']:
+            active_menu.rebuild_menu(menu_id)
+
+    return {
+        'dry_run': dry_run,
+        'items': len(wanted),
+        'added': len(added),
+        'removed': len(removed),
+        'errors': errors,
+    }
@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from restaurant_app.models import Restaurant, DietaryRestriction
+
+_MISSING = object()
+RESTRICTIONS_KEY = 'restrictions'
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Counts hits, misses and evictions so the metrics endpoint can report them.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+restrictions = LRUCache(maxsize=1, ttl=getattr(settings, 'LOOKUP_CACHE_TTL', 300))
+restaurants = LRUCache(
+    maxsize=getattr(settings, 'LOOKUP_CACHE_RESTAURANTS', 10000),
+    ttl=getattr(settings, 'LOOKUP_CACHE_TTL', 300)
+)
+
+_seen_signal = None
+_last_check = 0.0
+_check_lock = threading.Lock()
+
+
+def _signal_path():
+    return getattr(settings, 'LOOKUP_CACHE_SIGNAL_PATH', None)
+
+
+def _signal_mtime():
+    try:
+        return os.stat(_signal_path()).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def _check_signal():
+    """
+    Drops this process's entries when another process has touched the signal file.
+
+    The file is stat()ed at most every LOOKUP_CACHE_CHECK_SECONDS, so a warm
+    lookup costs no SQL and, most of the time, no system call.
+    """
+    global _seen_signal, _last_check
+    now = time.monotonic()
+    if now - _last_check < getattr(settings, 'LOOKUP_CACHE_CHECK_SECONDS', 1):
+        return
+    with _check_lock:
+        _last_check = now
+        mtime = _signal_mtime()
+        if mtime != _seen_signal:
+            _seen_signal = mtime
+            restrictions.clear()
+            restaurants.clear()
+
+
+def invalidate():
+    """
+    Drops the cached lookups in every process.
+
+    Clears this process's caches and touches the signal file, which the other
+    processes notice on their next check. Called by the Restaurant and
+    DietaryRestriction signal handlers once the change has committed.
+    """
+    global _seen_signal
+    path = _signal_path()
+    if path:
+        with open(path, 'a'):
+            os.utime(path)
+    with _check_lock:
+        _seen_signal = _signal_mtime()
+    restrictions.clear()
+    restaurants.clear()
+
+
+def invalidate_on_commit():
+    transaction.on_commit(invalidate)
+
+
+def restriction_ids():
+    """
+    Returns {name: ID} for every dietary restriction.
+
+    The table is small and almost static, so it is cached whole; names that are
+    not in it are answered from the same entry.
+    """
+    _check_signal()
+    found = restrictions.get(RESTRICTIONS_KEY)
+    if found is None:
+        found = _load_restriction_ids()
+    return found
+
+
+async def arestriction_ids():
+    """
+    Async version of restriction_ids.
+
+    A miss is loaded in a worker thread (see _in_worker_thread), so it overlaps
+    the ORM calls it is gathered with.
+    """
+    _check_signal()
+    found = restrictions.get(RESTRICTIONS_KEY)
+    if found is None:
+        found = await _in_worker_thread(_load_restriction_ids)()
+    return found
+
+
+def _load_restriction_ids():
+    found = dict(DietaryRestriction.objects.values_list('name', 'id'))
+    restrictions.set(RESTRICTIONS_KEY, found)
+    return found
+
+
+def get_restaurant(restaurant_id):
+    """
+    Returns a restaurant's metadata.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+
+    Returns:
+        dict: 'id', 'name' and 'address', or None if there is no such restaurant
+    """
+    _check_signal()
+    restaurant_id = int(restaurant_id)
+    restaurant = restaurants.get(restaurant_id, _MISSING)
+    if restaurant is _MISSING:
+        restaurant = _load_restaurant(restaurant_id)
+    return restaurant
+
+
+async def aget_restaurant(restaurant_id):
+    """
+    Async version of get_restaurant.
+
+    A miss is loaded in a worker thread (see _in_worker_thread), so it overlaps
+    the ORM calls it is gathered with.
+    """
+    _check_signal()
+    restaurant_id = int(restaurant_id)
+    restaurant = restaurants.get(restaurant_id, _MISSING)
+    if restaurant is _MISSING:
+        restaurant = await _in_worker_thread(_load_restaurant)(restaurant_id)
+    return restaurant
+
+
+def _load_restaurant(restaurant_id):
+    restaurant = Restaurant.objects.filter(id=restaurant_id).values('id', 'name', 'address').first()
+    restaurants.set(restaurant_id, restaurant)
+    return restaurant
+
+
+def _in_worker_thread(load):
+    """
+    Wraps a cache load to run in asgiref's thread pool.
+
+    Async ORM calls are thread-sensitive and all run on one thread, one after
+    the other; a load in a pool thread of its own runs alongside them. No request
+    cycle closes the connection it opens there, so it is closed right away.
+    With LOOKUP_CACHE_LOAD_OFF_THREAD off, loads run on the ORM thread instead.
+    """
+    if not getattr(settings, 'LOOKUP_CACHE_LOAD_OFF_THREAD', True):
+        return sync_to_async(load)
+
+    def run(*args):
+        try:
+            return load(*args)
+        finally:
+            connections.close_all()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def stats():
+    return {
+        'restrictions': restrictions.stats(),
+        'restaurants': restaurants.stats(),
+    }
@@ -0,0 +1,281 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from restaurant_app import replicas
+
+SNAPSHOT_KEY = 'menu_snapshot:{menu_id}:{version_number}'
+ACTIVE_KEY = 'menu_snapshot:{menu_id}:active'
+RENDERED_KEY = 'menu_rendered:{menu_id}:{version_number}'
+RENDERED_ACTIVE_KEY = 'menu_rendered:{menu_id}:active'
+DIETARY_KEY = 'menu_dietary:{menu_id}:{version_number}'
+DIFF_KEY = 'menu_diff:{menu_id}:{generation}:{from_version}:{to_version}'
+GENERATION_KEY = 'menu_generation:{menu_id}'
+CHANGED_KEY = 'menu_changed:{menu_id}'
+
+
+def _timeout():
+    return getattr(settings, 'MENU_SNAPSHOT_TIMEOUT', None)
+
+
+def _mark_changed(menu_id):
+    # A replica may still serve a menu's old rows for a while after it changed;
+    # payloads built meanwhile must not be cached, or they would outlive the lag
+    if replicas.replica_aliases():
+        cache.set(CHANGED_KEY.format(menu_id=menu_id), True, timeout=replicas.sticky_seconds())
+
+
+def _cacheable(menu_id):
+    return not replicas.replica_aliases() or cache.get(CHANGED_KEY.format(menu_id=menu_id)) is None
+
+
+async def _acacheable(menu_id):
+    return not replicas.replica_aliases() or await cache.aget(CHANGED_KEY.format(menu_id=menu_id)) is None
+
+
+def get_snapshot(menu_id, version_number=None):
+    """
+    Looks up a cached menu payload.
+
+    Args:
+        menu_id (int): Menu ID
+        version_number (int, optional): Specific version number. Defaults to None (active version).
+
+    Returns:
+        tuple: (restaurant_id, CompactMenu) or None on a cache miss
+    """
+    if version_number:
+        return cache.get(SNAPSHOT_KEY.format(menu_id=menu_id, version_number=version_number))
+
+    # The active pointer carries the payload of the version it points to, so
+    # reading the active menu is a single cache hit.
+    active = cache.get(ACTIVE_KEY.format(menu_id=menu_id))
+    if active is None:
+        return None
+    return active[1]
+
+
+async def aget_snapshot(menu_id, version_number=None):
+    """Async version of get_snapshot."""
+    if version_number:
+        return await cache.aget(SNAPSHOT_KEY.format(menu_id=menu_id, version_number=version_number))
+    active = await cache.aget(ACTIVE_KEY.format(menu_id=menu_id))
+    if active is None:
+        return None
+    return active[1]
+
+
+def _snapshot_entries(menu_id, version_number, restaurant_id, menu_data, is_active):
+    snapshot = (restaurant_id, menu_data)
+    entries = {SNAPSHOT_KEY.format(menu_id=menu_id, version_number=version_number): snapshot}
+    if is_active:
+        entries[ACTIVE_KEY.format(menu_id=menu_id)] = (version_number, snapshot)
+    return entries
+
+
+def set_snapshot(menu_id, version_number, restaurant_id, menu_data, is_active=False):
+    """
+    Stores a fully built menu payload for a version, and the active pointer if it is the active one.
+    """
+    if _cacheable(menu_id):
+        cache.set_many(_snapshot_entries(menu_id, version_number, restaurant_id, menu_data, is_active),
+                       timeout=_timeout())
+
+
+async def aset_snapshot(menu_id, version_number, restaurant_id, menu_data, is_active=False):
+    """Async version of set_snapshot."""
+    if await _acacheable(menu_id):
+        await cache.aset_many(_snapshot_entries(menu_id, version_number, restaurant_id, menu_data, is_active),
+                              timeout=_timeout())
+
+
+def get_snapshots(requests):
+    """
+    Looks up the cached payloads of many menus with one cache round trip.
+
+    Args:
+        requests (iterable): (menu_id, version_number or None for the active version) pairs
+
+    Returns:
+        dict: {(menu_id, version_number): (restaurant_id, menu_data)} for the hits only
+    """
+    keys = {}
+    for menu_id, version_number in requests:
+        if version_number:
+            keys[SNAPSHOT_KEY.format(menu_id=menu_id, version_number=version_number)] = (menu_id, version_number)
+        else:
+            keys[ACTIVE_KEY.format(menu_id=menu_id)] = (menu_id, version_number)
+
+    found = {}
+    for key, value in cache.get_many(keys).items():
+        menu_id, version_number = keys[key]
+        found[(menu_id, version_number)] = value if version_number else value[1]
+    return found
+
+
+def set_snapshots(snapshots):
+    """
+    Stores many built payloads with one cache round trip.
+
+    Args:
+        snapshots (iterable): (menu_id, version_number, restaurant_id, menu_data, is_active) tuples
+    """
+    snapshots = list(snapshots)
+    if replicas.replica_aliases():
+        changed = cache.get_many([CHANGED_KEY.format(menu_id=snapshot[0]) for snapshot in snapshots])
+        snapshots = [snapshot for snapshot in snapshots
+                     if CHANGED_KEY.format(menu_id=snapshot[0]) not in changed]
+
+    entries = {}
+    for snapshot in snapshots:
+        entries.update(_snapshot_entries(*snapshot))
+    if entries:
+        cache.set_many(entries, timeout=_timeout())
+
+
+def get_rendered(menu_id, version_number=None):
+    """
+    Looks up the pre-serialized JSON response body of a menu.
+
+    Args:
+        menu_id (int): Menu ID
+        version_number (int, optional): Specific version number. Defaults to None (active version).
+
+    Returns:
+        tuple: (restaurant_id, body, etag) or None on a cache miss
+    """
+    return cache.get(_rendered_key(menu_id, version_number))
+
+
+async def aget_rendered(menu_id, version_number=None):
+    """Async version of get_rendered."""
+    return await cache.aget(_rendered_key(menu_id, version_number))
+
+
+def _rendered_key(menu_id, version_number):
+    if version_number:
+        return RENDERED_KEY.format(menu_id=menu_id, version_number=version_number)
+    return RENDERED_ACTIVE_KEY.format(menu_id=menu_id)
+
+
+def etag_for(body):
+    """Strong ETag of an encoded response body."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _render(restaurant_id, body):
+    return (restaurant_id, body, etag_for(body))
+
+
+def set_rendered(menu_id, version_number, restaurant_id, body):
+    """
+    Stores an encoded response body with a strong ETag derived from it.
+
+    Args:
+        menu_id (int): Menu ID
+        version_number (int, optional): Version number the payload was requested with (None for active)
+        restaurant_id (int): Restaurant the menu belongs to
+        body (bytes): Complete JSON response body, e.g. from compact_menu.response_body
+
+    Returns:
+        tuple: (restaurant_id, body, etag)
+    """
+    rendered = _render(restaurant_id, body)
+    if _cacheable(menu_id):
+        cache.set(_rendered_key(menu_id, version_number), rendered, timeout=_timeout())
+    return rendered
+
+
+async def aset_rendered(menu_id, version_number, restaurant_id, body):
+    """Async version of set_rendered."""
+    rendered = _render(restaurant_id, body)
+    if await _acacheable(menu_id):
+        await cache.aset(_rendered_key(menu_id, version_number), rendered, timeout=_timeout())
+    return rendered
+
+
+def get_dietary_index(menu_id, version_number):
+    """
+    Looks up the dietary index of a version: {restriction_id: frozenset(item_ids)}, or None on a miss.
+    """
+    return cache.get(DIETARY_KEY.format(menu_id=menu_id, version_number=version_number))
+
+
+async def aget_dietary_index(menu_id, version_number):
+    """Async version of get_dietary_index."""
+    return await cache.aget(DIETARY_KEY.format(menu_id=menu_id, version_number=version_number))
+
+
+def set_dietary_index(menu_id, version_number, index):
+    if _cacheable(menu_id):
+        cache.set(DIETARY_KEY.format(menu_id=menu_id, version_number=version_number), index, timeout=_timeout())
+
+
+async def aset_dietary_index(menu_id, version_number, index):
+    if await _acacheable(menu_id):
+        await cache.aset(
+            DIETARY_KEY.format(menu_id=menu_id, version_number=version_number), index, timeout=_timeout()
+        )
+
+
+def invalidate_dietary(menu_id, version_number):
+    """
+    Drops the dietary index of a version after its item/restriction links changed.
+    """
+    cache.delete(DIETARY_KEY.format(menu_id=menu_id, version_number=version_number))
+    _bump_generation(menu_id)
+    _mark_changed(menu_id)
+
+
+def _generation(menu_id):
+    return cache.get(GENERATION_KEY.format(menu_id=menu_id), 0)
+
+
+def _bump_generation(menu_id):
+    try:
+        cache.incr(GENERATION_KEY.format(menu_id=menu_id))
+    except ValueError:
+        cache.set(GENERATION_KEY.format(menu_id=menu_id), 1, timeout=None)
+
+
+def get_diff(menu_id, from_version, to_version):
+    return cache.get(DIFF_KEY.format(
+        menu_id=menu_id, generation=_generation(menu_id), from_version=from_version, to_version=to_version
+    ))
+
+
+def set_diff(menu_id, from_version, to_version, diff):
+    if _cacheable(menu_id):
+        cache.set(DIFF_KEY.format(
+            menu_id=menu_id, generation=_generation(menu_id), from_version=from_version, to_version=to_version
+        ), diff, timeout=_timeout())
+
+
+def invalidate_version(menu_id, version_number):
+    """
+    Drops everything cached for a version together with the menu's active pointers.
+
+    Diffs are keyed by a per-menu generation that is bumped here, since any
+    pair of versions may include this one.
+    """
+    cache.delete_many([
+        DIETARY_KEY.format(menu_id=menu_id, version_number=version_number),
+        SNAPSHOT_KEY.format(menu_id=menu_id, version_number=version_number),
+        ACTIVE_KEY.format(menu_id=menu_id),
+        RENDERED_KEY.format(menu_id=menu_id, version_number=version_number),
+        RENDERED_ACTIVE_KEY.format(menu_id=menu_id),
+    ])
+    _bump_generation(menu_id)
+    _mark_changed(menu_id)
+
+
+def invalidate_menu(menu_id):
+    """
+    Drops the active pointers of a menu, e.g. after the active version changed.
+    """
+    cache.delete_many([
+        ACTIVE_KEY.format(menu_id=menu_id),
+        RENDERED_ACTIVE_KEY.format(menu_id=menu_id),
+    ])
+    _mark_changed(menu_id)
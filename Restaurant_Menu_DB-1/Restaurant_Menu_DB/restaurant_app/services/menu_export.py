@@ -0,0 +1,159 @@
+import csv
+import json
+
+from restaurant_app.models import MenuSection, MenuItem, MenuItemDietaryRestriction
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+# Same layout as the bulk import rows, so an export can be imported again
+EXPORT_FIELDS = (
+    'restaurant_name', 'address', 'menu_name', 'version_number', 'is_active',
+    'section_name', 'item_name', 'description', 'price', 'dietary_restrictions',
+)
+
+_ITEM_COLUMNS = (
+    'id',
+    'section__menu_version__menu__restaurant__name',
+    'section__menu_version__menu__restaurant__address',
+    'section__menu_version__menu__name',
+    'section__menu_version__version_number',
+    'section__menu_version__is_active',
+    'section__name',
+    'name',
+    'description',
+    'price',
+)
+
+_SECTION_COLUMNS = (
+    'id',
+    'menu_version__menu__restaurant__name',
+    'menu_version__menu__restaurant__address',
+    'menu_version__menu__name',
+    'menu_version__version_number',
+    'menu_version__is_active',
+    'name',
+)
+
+
+def iter_export_rows(restaurant_ids=None, active_only=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams one row per menu item, with its parents and dietary restrictions,
+    followed by one row without item fields per section that has no items.
+
+    Items are read in keyset batches on the primary key (id > last seen id) as
+    values_list tuples, and the dietary links of each batch come from one extra
+    query; empty sections are read the same way. Memory stays flat on every
+    backend, including MySQL where QuerySet.iterator() cannot stream from the
+    server. Versions without any sections have no rows and are not exported.
+
+    Args:
+        restaurant_ids (list, optional): Only export these restaurants
+        active_only (bool): Only export active menu versions
+        chunk_size (int): Items per batch
+
+    Yields:
+        dict: Row keyed by EXPORT_FIELDS
+    """
+    items = MenuItem.objects.order_by('id')
+    if restaurant_ids:
+        items = items.filter(section__menu_version__menu__restaurant_id__in=restaurant_ids)
+    if active_only:
+        items = items.filter(section__menu_version__is_active=True)
+
+    yield from _iter_item_rows(items, chunk_size)
+
+    sections = MenuSection.objects.filter(items__isnull=True).order_by('id')
+    if restaurant_ids:
+        sections = sections.filter(menu_version__menu__restaurant_id__in=restaurant_ids)
+    if active_only:
+        sections = sections.filter(menu_version__is_active=True)
+
+    for batch in _iter_batches(sections, _SECTION_COLUMNS, chunk_size):
+        for _, restaurant_name, address, menu_name, version_number, is_active, section_name in batch:
+            yield {
+                'restaurant_name': restaurant_name,
+                'address': address,
+                'menu_name': menu_name,
+                'version_number': version_number,
+                'is_active': is_active,
+                'section_name': section_name,
+                'item_name': None,
+                'description': None,
+                'price': None,
+                'dietary_restrictions': [],
+            }
+
+
+def _iter_batches(queryset, columns, chunk_size):
+    """Reads values_list tuples in keyset batches on the primary key, which must be the first column."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).values_list(*columns)[:chunk_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield batch
+
+
+def _iter_item_rows(items, chunk_size):
+    for batch in _iter_batches(items, _ITEM_COLUMNS, chunk_size):
+        restrictions = {}
+        for item_id, name in MenuItemDietaryRestriction.objects.filter(
+            item_id__in=[row[0] for row in batch]
+        ).order_by('restriction__name').values_list('item_id', 'restriction__name'):
+            restrictions.setdefault(item_id, []).append(name)
+
+        for (item_id, restaurant_name, address, menu_name, version_number, is_active,
+             section_name, item_name, description, price) in batch:
+            yield {
+                'restaurant_name': restaurant_name,
+                'address': address,
+                'menu_name': menu_name,
+                'version_number': version_number,
+                'is_active': is_active,
+                'section_name': section_name,
+                'item_name': item_name,
+                'description': description,
+                'price': str(price),
+                'dietary_restrictions': restrictions.get(item_id, []),
+            }
+
+
+class _Echo:
+    """File-like object whose write returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            '|'.join(row[field]) if field == 'dietary_restrictions'
+            else ('' if row[field] is None else row[field])
+            for field in EXPORT_FIELDS
+        ])
+
+
+def iter_export(fmt, **filters):
+    """
+    Streams a whole export as text chunks in the given format ('jsonl' or 'csv').
+    """
+    rows = iter_export_rows(**filters)
+    if fmt == 'csv':
+        return iter_csv(rows)
+    if fmt == 'jsonl':
+        return iter_jsonl(rows)
+    raise ValueError(f"format must be one of {', '.join(FORMATS)}")
@@ -0,0 +1,218 @@
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from restaurant_app.models import (
+    ActiveMenuFacets, Restaurant, DietaryRestriction, MenuItem, MenuItemDietaryRestriction
+)
+from . import dietary_filter
+
+# Lower bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = (Decimal('0'), Decimal('5'), Decimal('10'), Decimal('15'), Decimal('20'), Decimal('30'),
+                 Decimal('50'))
+GENERATION_KEY = 'browse_facets_generation'
+TOTALS_KEY = 'browse_facets:{generation}:{section_name}'
+TOTALS_TIMEOUT = 60
+
+
+def bucket_label(position):
+    low = PRICE_BUCKETS[position]
+    if position + 1 == len(PRICE_BUCKETS):
+        return f'{low}+'
+    return f'{low}-{PRICE_BUCKETS[position + 1]}'
+
+
+def price_bucket(price):
+    return bucket_label(max(bisect_right(PRICE_BUCKETS, price) - 1, 0))
+
+
+def summarize(rows):
+    """
+    Aggregates ActiveMenuItem rows of one menu into per-section facet counts.
+
+    Returns:
+        dict: {section_name: {'items': n, 'price_buckets': {label: n}, 'restrictions': {restriction_id: n}}}
+    """
+    sections = {}
+    for row in rows:
+        _count(sections, row, 1)
+    return sections
+
+
+def _count(sections, row, step):
+    section = sections.setdefault(row.section_name, {'items': 0, 'price_buckets': {}, 'restrictions': {}})
+    if row.item_id is None:
+        return
+    section['items'] += step
+    _step(section['price_buckets'], price_bucket(row.price), step)
+    for restriction_id in row.dietary_restriction_ids:
+        # JSON object keys are strings, so store them as such from the start
+        _step(section['restrictions'], str(restriction_id), step)
+
+
+def _step(counts, key, step):
+    count = counts.get(key, 0) + step
+    if count:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+
+def replace_menu(menu_id, rows):
+    """Stores the facets of a menu's freshly rebuilt read-model rows, or drops them when there are none."""
+    if rows:
+        ActiveMenuFacets.objects.update_or_create(
+            menu_id=menu_id,
+            defaults={
+                'restaurant_id': rows[0].restaurant_id,
+                'menu_version_id': rows[0].menu_version_id,
+                'sections': summarize(rows),
+                'updated_at': timezone.now()
+            }
+        )
+    else:
+        ActiveMenuFacets.objects.filter(menu_id=menu_id).delete()
+    _bump_generation()
+
+
+def replace_item(menu_id, old_row, new_row):
+    """
+    Adjusts a menu's facets for one item row that was replaced, added (old_row is None)
+    or removed (new_row is None), leaving them as summarize() would build them.
+    """
+    facets = ActiveMenuFacets.objects.select_for_update().filter(menu_id=menu_id).first()
+    if facets is None:
+        return
+    if old_row is not None:
+        _count(facets.sections, old_row, -1)
+    if new_row is not None:
+        _count(facets.sections, new_row, 1)
+    facets.updated_at = timezone.now()
+    facets.save(update_fields=['sections', 'updated_at'])
+    _bump_generation()
+
+
+def _bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def _add(totals, key, counts):
+    target = totals.setdefault(key, {})
+    for name, count in counts.items():
+        target[name] = target.get(name, 0) + count
+
+
+def _totals(restaurant_ids, section_name):
+    queryset = ActiveMenuFacets.objects.all()
+    if restaurant_ids:
+        queryset = queryset.filter(restaurant_id__in=restaurant_ids)
+
+    totals = {'restaurants': {}, 'price_buckets': {}, 'restrictions': {}}
+    for restaurant_id, sections in queryset.values_list('restaurant_id', 'sections').iterator(chunk_size=2000):
+        for name, section in sections.items():
+            if section_name and name != section_name:
+                continue
+            totals['restaurants'][restaurant_id] = totals['restaurants'].get(restaurant_id, 0) + section['items']
+            _add(totals, 'price_buckets', section['price_buckets'])
+            _add(totals, 'restrictions', section['restrictions'])
+    return totals
+
+
+def get_facets(restaurant_ids=None, section_name=None):
+    """
+    Facet counts over the active menus selected by restaurant and section name.
+
+    Counts come from the precomputed ActiveMenuFacets rows, so they describe
+    the selected slice of the catalog; price and dietary filters narrow the
+    browse results, not the facets. Unfiltered totals are cached briefly.
+
+    Returns:
+        dict: 'restaurants', 'price_buckets' and 'dietary_restrictions', each a list of {name, count}
+    """
+    key = None
+    totals = None
+    if not restaurant_ids:
+        key = TOTALS_KEY.format(generation=cache.get(GENERATION_KEY, 0), section_name=section_name or '')
+        totals = cache.get(key)
+    if totals is None:
+        totals = _totals(restaurant_ids, section_name)
+        if key:
+            cache.set(key, totals, timeout=TOTALS_TIMEOUT)
+
+    restaurant_names = dict(Restaurant.objects.filter(
+        id__in=list(totals['restaurants'])
+    ).values_list('id', 'name'))
+    restriction_names = dict(DietaryRestriction.objects.filter(
+        id__in=[int(pk) for pk in totals['restrictions']]
+    ).values_list('id', 'name'))
+
+    labels = [bucket_label(position) for position in range(len(PRICE_BUCKETS))]
+    return {
+        'restaurants': sorted(
+            ({'id': pk, 'name': restaurant_names.get(pk), 'count': count}
+             for pk, count in totals['restaurants'].items() if count),
+            key=lambda entry: (-entry['count'], entry['id'])
+        ),
+        'price_buckets': [
+            {'name': label, 'count': totals['price_buckets'].get(label, 0)} for label in labels
+        ],
+        'dietary_restrictions': sorted(
+            ({'id': int(pk), 'name': restriction_names[int(pk)], 'count': count}
+             for pk, count in totals['restrictions'].items() if int(pk) in restriction_names),
+            key=lambda entry: (-entry['count'], entry['name'])
+        ),
+    }
+
+
+def browse_items(min_price=None, max_price=None, restrictions=None, match=dietary_filter.MATCH_ANY,
+                 restaurant_ids=None, section_name=None):
+    """
+    Items of active menu versions matching the browse filters, as values() rows.
+
+    The price range is applied to MenuItem.price directly so its index can
+    drive the query; dietary restrictions are matched through ID subqueries on
+    the link table with the same any/all/none semantics as the dietary view.
+
+    Raises:
+        ValidationError: match is not one of any, all, none
+    """
+    if match not in dietary_filter.MATCH_MODES:
+        raise ValidationError(f"match must be one of {', '.join(dietary_filter.MATCH_MODES)}")
+
+    items = MenuItem.objects.filter(section__menu_version__is_active=True)
+    if min_price is not None:
+        items = items.filter(price__gte=min_price)
+    if max_price is not None:
+        items = items.filter(price__lte=max_price)
+    if restaurant_ids:
+        items = items.filter(section__menu_version__menu__restaurant_id__in=restaurant_ids)
+    if section_name:
+        items = items.filter(section__name=section_name)
+
+    if restrictions:
+        restriction_ids, missing = dietary_filter.resolve_restriction_ids(restrictions)
+        links = MenuItemDietaryRestriction.objects.values('item_id')
+        if match == dietary_filter.MATCH_NONE:
+            items = items.exclude(id__in=links.filter(restriction_id__in=restriction_ids))
+        elif match == dietary_filter.MATCH_ALL:
+            if missing or not restriction_ids:
+                items = items.none()
+            for restriction_id in restriction_ids:
+                items = items.filter(id__in=links.filter(restriction_id=restriction_id))
+        else:
+            items = items.filter(id__in=links.filter(restriction_id__in=restriction_ids))
+
+    return items.values(
+        'id', 'name', 'description', 'price',
+        section_name=F('section__name'),
+        menu_id=F('section__menu_version__menu_id'),
+        restaurant_id=F('section__menu_version__menu__restaurant_id'),
+        restaurant_name=F('section__menu_version__menu__restaurant__name'),
+    )
@@ -0,0 +1,367 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction, DatabaseError
+
+from restaurant_app.models import (
+    Restaurant, Menu, MenuVersion, MenuSection, MenuItem,
+    DietaryRestriction, MenuItemDietaryRestriction
+)
+from . import menu_cache, price_stats, active_menu, lookup_cache
+
+FORMATS = ('jsonl', 'csv')
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+CREATED_COUNTERS = ('restaurants', 'menus', 'versions', 'sections', 'items', 'dietary_restrictions', 'dietary_links')
+
+
+def iter_rows(stream, fmt):
+    """
+    Lazily parses an import file, one row at a time.
+
+    Every row describes one menu item together with its parents:
+    restaurant_name, menu_name, version_number, section_name, item_name,
+    price and optionally address, description, is_active and
+    dietary_restrictions ('|'-separated in CSV, a list or string in JSON lines).
+    A row without item fields describes a section without items, as written by
+    the exporter for empty sections.
+
+    Args:
+        stream: Text stream to read from
+        fmt (str): 'jsonl' or 'csv'
+
+    Yields:
+        tuple: (line number, dict or None, parse error message or None)
+    """
+    if fmt == 'csv':
+        # The header is line 1
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row, None
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, 'Each line must be a JSON object'
+                continue
+            yield line_number, row, None
+    else:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+
+def _text(row, field, required=True):
+    value = row.get(field)
+    value = str(value).strip() if value is not None else ''
+    if required and not value:
+        raise ValueError(f'{field} is required')
+    return value
+
+
+def _parse_row(row):
+    """
+    Validates one raw row and converts it to the values the importer needs.
+    """
+    try:
+        version_number = int(row.get('version_number') or 1)
+    except (TypeError, ValueError):
+        raise ValueError('version_number must be an integer')
+
+    restrictions = row.get('dietary_restrictions') or []
+    if isinstance(restrictions, str):
+        restrictions = restrictions.split('|')
+    restrictions = sorted({str(name).strip() for name in restrictions if str(name).strip()})
+
+    item_name = _text(row, 'item_name', required=False) or None
+    price = None
+    if item_name is None:
+        # A section without items
+        if restrictions or _text(row, 'price', required=False) or _text(row, 'description', required=False):
+            raise ValueError('item_name is required')
+    else:
+        try:
+            price = Decimal(str(row.get('price'))).quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ValueError('price must be a decimal number')
+        if price < 0 or price.adjusted() >= 8:
+            raise ValueError('price is out of range')
+
+    is_active = row.get('is_active', True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() not in ('0', 'false', 'no', 'n')
+
+    return {
+        'restaurant_name': _text(row, 'restaurant_name'),
+        'address': _text(row, 'address', required=False) or None,
+        'menu_name': _text(row, 'menu_name'),
+        'version_number': version_number,
+        'is_active': bool(is_active),
+        'section_name': _text(row, 'section_name'),
+        'item_name': item_name,
+        'description': _text(row, 'description', required=False) or None,
+        'price': price,
+        'dietary_restrictions': restrictions,
+    }
+
+
+class MenuImporter:
+    """
+    Streams rows into the database in chunks of bulk_create calls.
+
+    Foreign keys are resolved through in-memory maps of the parent objects
+    (restaurants, menus, versions, sections, dietary restrictions), which grow
+    with the number of distinct parents only; items are never kept beyond
+    the chunk they belong to. Each chunk is written in its own transaction.
+
+    bulk_create does not send signals, so the price statistics and the menu
+    caches of everything touched are refreshed once at the end.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.restaurants = {}
+        self.menus = {}
+        self.versions = {}
+        self.sections = {}
+        self.restrictions = {}
+        self.touched_restaurants = set()
+        self.touched_versions = set()
+        self.rows = 0
+        self.created = dict.fromkeys(CREATED_COUNTERS, 0)
+        self.errors = []
+        self.error_count = 0
+        # What the chunk being written created and touched, merged in once it commits
+        self.pending = None
+
+    def error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_number, 'error': message})
+
+    def run(self, rows):
+        """
+        Imports an iterable of rows as produced by iter_rows.
+
+        Returns:
+            dict: Row count, created object counts and per-row errors
+        """
+        chunk = []
+        for line_number, row, parse_error in rows:
+            self.rows += 1
+            if parse_error:
+                self.error(line_number, parse_error)
+                continue
+            try:
+                chunk.append((line_number, _parse_row(row)))
+            except ValueError as e:
+                self.error(line_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+
+        self._refresh_derived_data()
+        return self.result()
+
+    def result(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+    def _resolve(self, resolved, model, key_fields, keys, build, counter):
+        """
+        Maps natural keys to IDs, fetching existing rows and bulk-creating missing ones.
+
+        The lookup is an __in filter on each key column followed by an exact match
+        in memory; it is run again after bulk_create because MySQL does not return
+        the primary keys of bulk-inserted rows.
+
+        Returns:
+            set: Keys that had to be created
+        """
+        missing = {key for key in keys if key not in resolved}
+
+        def fetch():
+            if not missing:
+                return
+            lookup = {
+                f'{field}__in': {key[position] for key in missing}
+                for position, field in enumerate(key_fields)
+            }
+            for values in model.objects.filter(**lookup).order_by('id').values_list(*key_fields, 'id'):
+                key, pk = values[:-1], values[-1]
+                if key in missing:
+                    resolved[key] = pk
+                    missing.discard(key)
+
+        fetch()
+        created = set(missing)
+        if created:
+            model.objects.bulk_create([build(key) for key in created])
+            self.pending['created'][counter] += len(created)
+            fetch()
+        return created
+
+    def _write_chunk(self, chunk):
+        self.pending = {
+            'created': dict.fromkeys(CREATED_COUNTERS, 0),
+            'restaurants': set(),
+            'versions': set(),
+            'errors': [],
+        }
+        try:
+            with transaction.atomic():
+                self._write_chunk_rows(chunk)
+        except DatabaseError as e:
+            # Parents resolved in the rolled back transaction are gone again
+            self.restaurants.clear()
+            self.menus.clear()
+            self.versions.clear()
+            self.sections.clear()
+            self.restrictions.clear()
+            for line_number, _ in chunk:
+                self.error(line_number, f'Chunk failed: {e}')
+            return
+
+        for counter, count in self.pending['created'].items():
+            self.created[counter] += count
+        self.touched_restaurants |= self.pending['restaurants']
+        self.touched_versions |= self.pending['versions']
+        for line_number, message in self.pending['errors']:
+            self.error(line_number, message)
+
+    def _write_chunk_rows(self, chunk):
+        addresses = {}
+        for _, row in chunk:
+            addresses.setdefault(row['restaurant_name'], row['address'])
+        self._resolve(
+            self.restaurants, Restaurant, ('name',),
+            {(row['restaurant_name'],) for _, row in chunk},
+            lambda key: Restaurant(name=key[0], address=addresses[key[0]]),
+            'restaurants'
+        )
+
+        for _, row in chunk:
+            row['restaurant_id'] = self.restaurants[(row['restaurant_name'],)]
+            self.pending['restaurants'].add(row['restaurant_id'])
+
+        self._resolve(
+            self.menus, Menu, ('restaurant_id', 'name'),
+            {(row['restaurant_id'], row['menu_name']) for _, row in chunk},
+            lambda key: Menu(restaurant_id=key[0], name=key[1]),
+            'menus'
+        )
+
+        activate = {}
+        for _, row in chunk:
+            row['menu_id'] = self.menus[(row['restaurant_id'], row['menu_name'])]
+            activate.setdefault((row['menu_id'], row['version_number']), row['is_active'])
+
+        new_versions = self._resolve(
+            self.versions, MenuVersion, ('menu_id', 'version_number'),
+            set(activate),
+            lambda key: MenuVersion(menu_id=key[0], version_number=key[1], is_active=activate[key],
+                                    created_by='Bulk import'),
+            'versions'
+        )
+        # bulk_create skips MenuVersion.save, so apply its single-active-version rule here
+        for key in new_versions:
+            if activate[key]:
+                MenuVersion.objects.filter(menu_id=key[0]).exclude(
+                    pk=self.versions[key]
+                ).update(is_active=False)
+
+        for _, row in chunk:
+            row['version_id'] = self.versions[(row['menu_id'], row['version_number'])]
+            self.pending['versions'].add((row['menu_id'], row['version_number']))
+
+        self._resolve(
+            self.sections, MenuSection, ('menu_version_id', 'name'),
+            {(row['version_id'], row['section_name']) for _, row in chunk},
+            lambda key: MenuSection(menu_version_id=key[0], name=key[1]),
+            'sections'
+        )
+
+        for _, row in chunk:
+            row['section_id'] = self.sections[(row['version_id'], row['section_name'])]
+
+        items = self._write_items(chunk)
+        self._write_dietary_links(items)
+
+    def _write_items(self, chunk):
+        chunk = [(line_number, row) for line_number, row in chunk if row['item_name'] is not None]
+        item_keys = {(row['section_id'], row['item_name']) for _, row in chunk}
+        existing = set(MenuItem.objects.filter(
+            section_id__in={key[0] for key in item_keys},
+            name__in={key[1] for key in item_keys}
+        ).values_list('section_id', 'name'))
+
+        new_rows = {}
+        for line_number, row in chunk:
+            key = (row['section_id'], row['item_name'])
+            if key in existing or key in new_rows:
+                self.pending['errors'].append((
+                    line_number, f"Item '{row['item_name']}' already exists in section '{row['section_name']}'"
+                ))
+                continue
+            new_rows[key] = row
+
+        MenuItem.objects.bulk_create([
+            MenuItem(
+                section_id=row['section_id'],
+                name=row['item_name'],
+                description=row['description'],
+                price=row['price']
+            )
+            for row in new_rows.values()
+        ], batch_size=self.chunk_size)
+        self.pending['created']['items'] += len(new_rows)
+
+        ids = {}
+        if new_rows:
+            for section_id, name, pk in MenuItem.objects.filter(
+                section_id__in={key[0] for key in new_rows},
+                name__in={key[1] for key in new_rows}
+            ).values_list('section_id', 'name', 'id'):
+                ids[(section_id, name)] = pk
+        return [(ids[key], row) for key, row in new_rows.items() if key in ids]
+
+    def _write_dietary_links(self, items):
+        names = {name for _, row in items for name in row['dietary_restrictions']}
+        if not names:
+            return
+        self._resolve(
+            self.restrictions, DietaryRestriction, ('name',),
+            {(name,) for name in names},
+            lambda key: DietaryRestriction(name=key[0]),
+            'dietary_restrictions'
+        )
+
+        links = [
+            MenuItemDietaryRestriction(item_id=item_id, restriction_id=self.restrictions[(name,)])
+            for item_id, row in items
+            for name in row['dietary_restrictions']
+        ]
+        MenuItemDietaryRestriction.objects.bulk_create(links, batch_size=self.chunk_size, ignore_conflicts=True)
+        self.pending['created']['dietary_links'] += len(links)
+
+    def _refresh_derived_data(self):
+        # Lookups cached as missing may exist now
+        if self.created['restaurants'] or self.created['dietary_restrictions']:
+            lookup_cache.invalidate()
+        for restaurant_id in self.touched_restaurants:
+            price_stats.rebuild_restaurant(restaurant_id)
+        for menu_id, version_number in self.touched_versions:
+            menu_cache.invalidate_version(menu_id, version_number)
+        for menu_id in {menu_id for menu_id, _ in self.touched_versions}:
+            active_menu.rebuild_menu(menu_id)
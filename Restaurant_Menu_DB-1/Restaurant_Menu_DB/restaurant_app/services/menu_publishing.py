@@ -0,0 +1,141 @@
+from django.db import connection, transaction
+from django.db.models import Max
+
+from restaurant_app.models import Menu, MenuVersion, MenuSection, MenuItem, MenuItemDietaryRestriction
+from . import menu_cache, price_stats, active_menu
+
+
+def _lock_menu(menu_id):
+    # Every change of a menu's active version goes through this row lock, so
+    # concurrent publishes are serialized and exactly one version stays active
+    return Menu.objects.select_for_update().get(pk=menu_id)
+
+
+def _get_version(menu_id, version_number=None):
+    if version_number:
+        return MenuVersion.objects.get(menu_id=menu_id, version_number=version_number)
+    return MenuVersion.objects.get(menu_id=menu_id, is_active=True)
+
+
+def _activate(menu_id, version):
+    MenuVersion.objects.filter(menu_id=menu_id, is_active=True).exclude(pk=version.pk).update(is_active=False)
+    if not version.is_active:
+        MenuVersion.objects.filter(pk=version.pk).update(is_active=True)
+        version.is_active = True
+
+
+def publish_version(menu_id, version_number):
+    """
+    Makes a version the active one of its menu.
+
+    Args:
+        menu_id (int): Menu ID
+        version_number (int): Version number to activate
+
+    Returns:
+        MenuVersion: The published version
+
+    Raises:
+        MenuVersion.DoesNotExist: The menu has no such version
+    """
+    with transaction.atomic():
+        _lock_menu(menu_id)
+        version = _get_version(menu_id, version_number)
+        _activate(menu_id, version)
+        # update() skips the signal handlers that maintain the read model
+        active_menu.rebuild_menu(menu_id)
+
+    menu_cache.invalidate_menu(menu_id)
+    return version
+
+
+def _copy_contents(source_version_id, target_version_id):
+    """
+    Copies sections, items and dietary links between versions with three INSERT ... SELECT statements.
+
+    New rows are matched to their originals by name, which is unique per
+    version for sections and per section for items.
+    """
+    quote = connection.ops.quote_name
+    section = quote(MenuSection._meta.db_table)
+    item = quote(MenuItem._meta.db_table)
+    link = quote(MenuItemDietaryRestriction._meta.db_table)
+
+    copied = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {section} (menu_version_id, name) '
+            f'SELECT %s, name FROM {section} WHERE menu_version_id = %s ORDER BY id',
+            [target_version_id, source_version_id]
+        )
+        copied['sections'] = cursor.rowcount
+
+        cursor.execute(
+            f'INSERT INTO {item} (section_id, name, description, price) '
+            f'SELECT new_section.id, old_item.name, old_item.description, old_item.price '
+            f'FROM {item} old_item '
+            f'JOIN {section} old_section ON old_section.id = old_item.section_id '
+            f'JOIN {section} new_section ON new_section.menu_version_id = %s AND new_section.name = old_section.name '
+            f'WHERE old_section.menu_version_id = %s ORDER BY old_item.id',
+            [target_version_id, source_version_id]
+        )
+        copied['items'] = cursor.rowcount
+
+        cursor.execute(
+            f'INSERT INTO {link} (item_id, restriction_id) '
+            f'SELECT new_item.id, old_link.restriction_id '
+            f'FROM {link} old_link '
+            f'JOIN {item} old_item ON old_item.id = old_link.item_id '
+            f'JOIN {section} old_section ON old_section.id = old_item.section_id '
+            f'JOIN {section} new_section ON new_section.menu_version_id = %s AND new_section.name = old_section.name '
+            f'JOIN {item} new_item ON new_item.section_id = new_section.id AND new_item.name = old_item.name '
+            f'WHERE old_section.menu_version_id = %s',
+            [target_version_id, source_version_id]
+        )
+        copied['dietary_links'] = cursor.rowcount
+    return copied
+
+
+def clone_version(menu_id, source_version_number=None, activate=False, created_by='System', notes=None):
+    """
+    Copies a version with all its sections, items and dietary links into a new version of the same menu.
+
+    The copy runs as set-based INSERT ... SELECT statements, so its cost does
+    not grow with the number of ORM objects.
+
+    Args:
+        menu_id (int): Menu ID
+        source_version_number (int, optional): Version to copy. Defaults to None (active version).
+        activate (bool): Publish the new version in the same transaction
+        created_by (str): Recorded on the new version
+        notes (str, optional): Recorded on the new version. Defaults to a note naming the source.
+
+    Returns:
+        tuple: (new MenuVersion, dict of copied row counts)
+
+    Raises:
+        MenuVersion.DoesNotExist: The source version does not exist
+    """
+    with transaction.atomic():
+        menu = _lock_menu(menu_id)
+        source = _get_version(menu_id, source_version_number)
+        latest = MenuVersion.objects.filter(menu_id=menu_id).aggregate(latest=Max('version_number'))['latest']
+
+        version = MenuVersion(
+            menu=menu,
+            version_number=latest + 1,
+            created_by=created_by,
+            notes=notes or f'Cloned from version {source.version_number}',
+            is_active=False
+        )
+        version.save()
+        copied = _copy_contents(source.pk, version.pk)
+
+        if activate:
+            _activate(menu_id, version)
+            active_menu.rebuild_menu(menu_id)
+        # Raw inserts skip the signal handlers
+        price_stats.rebuild_restaurant(menu.restaurant_id)
+
+    menu_cache.invalidate_version(menu_id, version.version_number)
+    return version, copied
@@ -0,0 +1,220 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q, Sum, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Greatest, Round
+
+from restaurant_app.models import MenuItem, MenuItemDietaryRestriction
+from . import menu_cache, price_stats, active_menu, menu_publishing
+
+PREVIEW_SIZE = 20
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _decimal(data, field, default=None):
+    value = data.get(field, default)
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValidationError(f'{field} must be a number')
+
+
+def _names(data, field):
+    value = data.get(field) or []
+    if isinstance(value, str) or not all(isinstance(name, str) for name in value):
+        raise ValidationError(f'{field} must be a list of names')
+    return list(value)
+
+
+class RepricingRule:
+    """
+    One price change: every item in scope gets price * (1 + percent / 100),
+    rounded to the nearest multiple of round_to and kept at or above minimum_price.
+
+    Each scope narrows the items further; an empty scope matches everything.
+    Items tagged with any of `dietary_restrictions` are in the dietary scope.
+    """
+
+    def __init__(self, percent, round_to=Decimal('0.01'), minimum_price=Decimal('0.00'),
+                 restaurant_ids=(), section_names=(), dietary_restrictions=()):
+        self.percent = percent
+        self.round_to = round_to
+        self.minimum_price = minimum_price
+        self.restaurant_ids = list(restaurant_ids)
+        self.section_names = list(section_names)
+        self.dietary_restrictions = list(dietary_restrictions)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a rule from its JSON form.
+
+        Raises:
+            ValidationError: A field is missing or out of range
+        """
+        if not isinstance(data, dict):
+            raise ValidationError('Each rule must be an object')
+        if data.get('percent') is None:
+            raise ValidationError('percent is required')
+        percent = _decimal(data, 'percent')
+        round_to = _decimal(data, 'round_to', '0.01')
+        minimum_price = _decimal(data, 'minimum_price', '0.00')
+        if percent <= -100:
+            raise ValidationError('percent must be greater than -100')
+        if not Decimal('0.01') <= round_to <= Decimal('100'):
+            raise ValidationError('round_to must be between 0.01 and 100')
+        if minimum_price < 0:
+            raise ValidationError('minimum_price must not be negative')
+
+        try:
+            restaurant_ids = [int(restaurant_id) for restaurant_id in data.get('restaurant_ids') or []]
+        except (TypeError, ValueError):
+            raise ValidationError('restaurant_ids must be a list of integers')
+        return cls(
+            percent, round_to, minimum_price,
+            restaurant_ids=restaurant_ids,
+            section_names=_names(data, 'section_names'),
+            dietary_restrictions=_names(data, 'dietary_restrictions')
+        )
+
+    def scope(self):
+        conditions = Q()
+        if self.restaurant_ids:
+            conditions &= Q(section__menu_version__menu__restaurant_id__in=self.restaurant_ids)
+        if self.section_names:
+            conditions &= Q(section__name__in=self.section_names)
+        if self.dietary_restrictions:
+            conditions &= Q(id__in=MenuItemDietaryRestriction.objects.filter(
+                restriction__name__in=self.dietary_restrictions
+            ).values('item_id'))
+        return conditions
+
+    def new_price(self):
+        factor = Value(1 + self.percent / 100, output_field=DecimalField(max_digits=12, decimal_places=6))
+        step = Value(self.round_to, output_field=PRICE_FIELD)
+        rounded = ExpressionWrapper(Round(F('price') * factor / step) * step, output_field=PRICE_FIELD)
+        return Greatest(rounded, Value(self.minimum_price, output_field=PRICE_FIELD), output_field=PRICE_FIELD)
+
+    def describe(self):
+        return {
+            'percent': str(self.percent),
+            'round_to': str(self.round_to),
+            'minimum_price': str(self.minimum_price),
+            'restaurant_ids': self.restaurant_ids,
+            'section_names': self.section_names,
+            'dietary_restrictions': self.dietary_restrictions,
+        }
+
+
+def _target_versions(rules):
+    """Active versions holding at least one item matched by any rule."""
+    matched = Q()
+    for rule in rules:
+        matched |= rule.scope()
+    return list(
+        MenuItem.objects.filter(matched, section__menu_version__is_active=True).values(
+            'section__menu_version_id', 'section__menu_version__menu_id',
+            'section__menu_version__version_number', 'section__menu_version__menu__restaurant_id'
+        ).order_by('section__menu_version__menu_id').distinct()
+    )
+
+
+def _money(value):
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def _apply_rule(rule, version_ids):
+    """
+    Applies a rule with one UPDATE and reports the affected items.
+
+    The scope does not depend on prices, so the same filter selects the
+    items before and after the update.
+    """
+    items = MenuItem.objects.filter(rule.scope(), section__menu_version_id__in=version_ids)
+    before = items.aggregate(total=Sum('price'))
+    preview = list(items.order_by('id').values_list('id', 'name', 'price')[:PREVIEW_SIZE])
+
+    updated = items.update(price=rule.new_price())
+
+    after = items.aggregate(total=Sum('price'))
+    new_prices = dict(MenuItem.objects.filter(
+        id__in=[item_id for item_id, _, _ in preview]
+    ).values_list('id', 'price'))
+    return {
+        'rule': rule.describe(),
+        'items': updated,
+        'total_before': _money(before['total']),
+        'total_after': _money(after['total']),
+        'preview': [
+            {'id': item_id, 'name': name, 'old_price': str(price), 'new_price': str(new_prices[item_id])}
+            for item_id, name, price in preview
+        ],
+    }
+
+
+def reprice(rules, clone=False, publish=False, dry_run=False, created_by='System'):
+    """
+    Applies repricing rules to the items of active menu versions, one set-based UPDATE per rule.
+
+    Rules run in order, so an item matched by several rules gets each change
+    on top of the previous one.
+
+    Args:
+        rules (list): RepricingRule objects
+        clone (bool): Copy each affected active version and reprice the copies, leaving
+            the active versions untouched
+        publish (bool): With clone, make the repriced copies the active versions
+        dry_run (bool): Run the updates and roll them back, returning the same report. Nothing
+            is cloned; the preview runs against the active versions the copies would be made from
+        created_by (str): Recorded on cloned versions
+
+    Returns:
+        dict: 'dry_run', 'versions' (one entry per repriced version) and 'rules' (one report per rule)
+    """
+    notes = f'Repriced by {len(rules)} rule(s)'
+    with transaction.atomic():
+        versions = []
+        for target in _target_versions(rules):
+            version = {
+                'restaurant_id': target['section__menu_version__menu__restaurant_id'],
+                'menu_id': target['section__menu_version__menu_id'],
+                'version_id': target['section__menu_version_id'],
+                'version_number': target['section__menu_version__version_number'],
+            }
+            if clone and not dry_run:
+                copy, _ = menu_publishing.clone_version(version['menu_id'], created_by=created_by, notes=notes)
+                version.update(version_id=copy.pk, version_number=copy.version_number)
+            versions.append(version)
+
+        version_ids = [version['version_id'] for version in versions]
+        reports = [_apply_rule(rule, version_ids) for rule in rules]
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run:
+        _refresh_derived_data(versions, live=not clone)
+        if clone and publish:
+            # Publishing rebuilds the read model of each menu
+            for version in versions:
+                menu_publishing.publish_version(version['menu_id'], version['version_number'])
+
+    return {
+        'dry_run': dry_run,
+        'versions': [
+            {key: version[key] for key in ('restaurant_id', 'menu_id', 'version_number')}
+            for version in versions
+        ],
+        'rules': reports,
+    }
+
+
+def _refresh_derived_data(versions, live):
+    # update() skips the signal handlers that maintain these
+    for restaurant_id in {version['restaurant_id'] for version in versions}:
+        price_stats.rebuild_restaurant(restaurant_id)
+    for version in versions:
+        menu_cache.invalidate_version(version['menu_id'], version['version_number'])
+    if live:
+        for menu_id in {version['menu_id'] for version in versions}:
+            active_menu.rebuild_menu(menu_id)
@@ -0,0 +1,401 @@
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+from restaurant_app.models import ActiveMenuItem
+
+FIELD_WEIGHTS = {
+    'item_name': 3.0,
+    'section_name': 1.5,
+    'description': 1.0,
+    'restaurant_name': 1.0,
+    'menu_name': 1.0,
+}
+INDEXED_FIELDS = ('item_id', 'menu_id') + tuple(FIELD_WEIGHTS)
+
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+# Vocabulary terms sharing the most trigrams with a query token that get an edit-distance check
+FUZZY_CANDIDATES = 50
+MAX_FUZZY_TERMS = 20
+INDEX_FORMAT = 1
+
+_token_re = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercases, strips accents and splits text into word tokens."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _token_re.findall(text)
+
+
+def edit_distance(first, second, limit):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before_previous, previous_row = previous_row, row
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                row[j] = min(row[j], before_previous[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+def max_edits(token):
+    return 1 if len(token) <= 5 else 2
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the items of active menus.
+
+    Token postings map each term to {item_id: summed field weight}; trigram
+    postings map each trigram to the vocabulary terms containing it, so a
+    misspelt query term is resolved to a handful of similar terms before any
+    item posting is touched. The index is fed from the ActiveMenuItem read model
+    and follows it by row ID: `last_row_id` is the highest row already indexed.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.term_trigrams = {}
+        self.menu_items = {}
+        self.item_terms = {}
+        self.last_row_id = 0
+        self._vocabulary = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_vocabulary'] = None
+        return state
+
+    @property
+    def document_count(self):
+        return len(self.item_terms)
+
+    def replace_menu(self, menu_id, rows):
+        """
+        Swaps the indexed items of a menu for the given read-model rows (dicts or ActiveMenuItem objects).
+        """
+        for item_id in self.menu_items.pop(menu_id, ()):
+            self._remove_item(item_id)
+
+        item_ids = set()
+        for row in rows:
+            if isinstance(row, ActiveMenuItem):
+                row = {field: getattr(row, field) for field in INDEXED_FIELDS}
+            if row['item_id'] is None:
+                continue
+            self._add_item(row)
+            item_ids.add(row['item_id'])
+        if item_ids:
+            self.menu_items[menu_id] = item_ids
+
+    def replace_item(self, menu_id, item_id, row):
+        """
+        Swaps one indexed item of a menu for the given read-model row, or drops it when row is None.
+        """
+        self._remove_item(item_id)
+        item_ids = self.menu_items.setdefault(menu_id, set())
+        item_ids.discard(item_id)
+        if row is not None:
+            if isinstance(row, ActiveMenuItem):
+                row = {field: getattr(row, field) for field in INDEXED_FIELDS}
+            self._add_item(row)
+            item_ids.add(item_id)
+        if not item_ids:
+            del self.menu_items[menu_id]
+
+    def _add_item(self, row):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(row[field]):
+                weights[term] = weights.get(term, 0.0) + weight
+
+        item_id = row['item_id']
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                for trigram in trigrams(term):
+                    self.term_trigrams.setdefault(trigram, set()).add(term)
+                self._vocabulary = None
+            postings[item_id] = weight
+        self.item_terms[item_id] = tuple(weights)
+
+    def _remove_item(self, item_id):
+        for term in self.item_terms.pop(item_id, ()):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(item_id, None)
+            if not postings:
+                del self.postings[term]
+                for trigram in trigrams(term):
+                    terms = self.term_trigrams.get(trigram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self.term_trigrams[trigram]
+                self._vocabulary = None
+
+    def _sorted_vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def _prefix_terms(self, token):
+        vocabulary = self._sorted_vocabulary()
+        terms = []
+        for position in range(bisect_left(vocabulary, token), len(vocabulary)):
+            term = vocabulary[position]
+            if not term.startswith(token):
+                break
+            if term != token:
+                terms.append(term)
+        return terms
+
+    def _fuzzy_terms(self, token):
+        # Trigram postings narrow the vocabulary to likely candidates; edit distance decides
+        shared = {}
+        for trigram in trigrams(token):
+            for term in self.term_trigrams.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        candidates = sorted(shared, key=lambda term: (-shared[term], term))[:FUZZY_CANDIDATES]
+
+        limit = max_edits(token)
+        scored = []
+        for term in candidates:
+            distance = edit_distance(token, term, limit)
+            if distance <= limit:
+                scored.append((1 - distance / max(len(token), len(term)), term))
+        scored.sort(reverse=True)
+        return scored[:MAX_FUZZY_TERMS]
+
+    def _expand(self, token):
+        """Maps a query token to [(term, factor)]: the exact term, longer terms it prefixes, else similar terms."""
+        expansions = []
+        if token in self.postings:
+            expansions.append((token, 1.0))
+        if len(token) >= 2:
+            expansions.extend((term, PREFIX_FACTOR) for term in self._prefix_terms(token))
+        if not expansions and len(token) >= 3:
+            expansions.extend((term, FUZZY_FACTOR * similarity) for similarity, term in self._fuzzy_terms(token))
+        return expansions
+
+    def search(self, query, limit=20):
+        """
+        Ranks items against a free-text query.
+
+        Each query token is matched exactly, as a prefix, or (when neither
+        matches) against vocabulary terms within one or two edits, found through
+        the trigram postings; per-field weights are scaled by the
+        term's inverse document frequency. Items matching more query tokens rank
+        first, then by score.
+
+        Returns:
+            list: [(item_id, score)] best first
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.item_terms:
+            return []
+
+        total = len(self.item_terms)
+        scores = {}
+        matched = {}
+        for token in tokens:
+            best = {}
+            for term, factor in self._expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + total / len(postings))
+                for item_id, weight in postings.items():
+                    score = weight * idf * factor
+                    if score > best.get(item_id, 0.0):
+                        best[item_id] = score
+            for item_id, score in best.items():
+                scores[item_id] = scores.get(item_id, 0.0) + score
+                matched[item_id] = matched.get(item_id, 0) + 1
+
+        ranked = sorted(scores, key=lambda item_id: (-matched[item_id], -scores[item_id], item_id))
+        return [(item_id, round(scores[item_id], 4)) for item_id in ranked[:limit]]
+
+
+def build_index(chunk_size=5000):
+    """Builds a full index from the ActiveMenuItem read model in one ordered pass."""
+    index = SearchIndex()
+    _apply_rows(index, ActiveMenuItem.objects.order_by('menu_id', 'id'), chunk_size)
+    return index
+
+
+def _apply_rows(index, queryset, chunk_size=5000):
+    menu_id = None
+    rows = []
+    for row in queryset.values('id', *INDEXED_FIELDS).iterator(chunk_size=chunk_size):
+        if row['menu_id'] != menu_id:
+            if rows:
+                index.replace_menu(menu_id, rows)
+            menu_id, rows = row['menu_id'], []
+        rows.append(row)
+        index.last_row_id = max(index.last_row_id, row['id'])
+    if rows:
+        index.replace_menu(menu_id, rows)
+
+
+def catch_up(index):
+    """
+    Re-indexes the menus whose read-model rows were rebuilt since the index last looked.
+
+    Rebuilding a menu replaces all of its rows, so any row above `last_row_id`
+    marks its menu as changed. Every change to an active menu goes through a
+    rebuild, including renaming the menu or its restaurant (see signals), so the
+    names in the index catch up as well. Menus that lost all their rows stay in the index
+    until the next full build; search results are checked against the read
+    model, so they never show up.
+
+    Returns:
+        int: Number of menus re-indexed
+    """
+    changed = list(ActiveMenuItem.objects.filter(id__gt=index.last_row_id).values_list('menu_id', flat=True).distinct())
+    if not changed:
+        return 0
+    _apply_rows(index, ActiveMenuItem.objects.filter(menu_id__in=changed).order_by('menu_id', 'id'))
+    return len(changed)
+
+
+def index_path():
+    return getattr(settings, 'SEARCH_INDEX_PATH', None)
+
+
+def save_index(index, path=None):
+    """Writes the index next to its final path and renames it into place, so readers never see a partial file."""
+    path = str(path or index_path())
+    directory = os.path.dirname(path) or '.'
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.search_index-')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            pickle.dump((INDEX_FORMAT, index), output, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_index(path=None):
+    path = path or index_path()
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as source:
+        version, index = pickle.load(source)
+    return index if version == INDEX_FORMAT else None
+
+
+_index = None
+_last_refresh = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Returns this process's index: loaded from disk (or built) on first use and
+    caught up with the read model at most every SEARCH_INDEX_REFRESH_SECONDS.
+    """
+    global _index, _last_refresh
+    interval = getattr(settings, 'SEARCH_INDEX_REFRESH_SECONDS', 5)
+    with _lock:
+        if _index is None:
+            _index = load_index() or build_index()
+            _last_refresh = 0.0
+        if time.monotonic() - _last_refresh >= interval:
+            catch_up(_index)
+            _last_refresh = time.monotonic()
+        return _index
+
+
+def menu_changed(menu_id, rows):
+    """Applies a rebuilt menu to this process's index right away, if it has one loaded."""
+    with _lock:
+        if _index is not None:
+            _index.replace_menu(menu_id, rows)
+
+
+def item_changed(menu_id, item_id, row):
+    """Applies one refreshed item row (None when the item left the menu) to this process's index right away."""
+    with _lock:
+        if _index is not None:
+            _index.replace_item(menu_id, item_id, row)
+
+
+def search_menu_items(query, limit=20):
+    """
+    Searches items of active menus and returns them with their current read-model data.
+
+    Args:
+        query (str): Free-text query
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Dicts with restaurant, menu, section and item fields plus a relevance score
+    """
+    index = get_index()
+    with _lock:
+        # Ask for a few extra hits in case some have left the read model since they were indexed
+        hits = index.search(query, limit=limit + 10)
+    if not hits:
+        return []
+
+    rows = {
+        row['item_id']: row
+        for row in ActiveMenuItem.objects.filter(item_id__in=[item_id for item_id, _ in hits]).values(
+            'restaurant_id', 'restaurant_name', 'menu_id', 'menu_name', 'version_number',
+            'section_name', 'item_id', 'item_name', 'description', 'price'
+        )
+    }
+
+    results = []
+    for item_id, score in hits:
+        row = rows.get(item_id)
+        if row is None:
+            continue
+        results.append({
+            'restaurant_id': row['restaurant_id'],
+            'restaurant_name': row['restaurant_name'],
+            'menu_id': row['menu_id'],
+            'menu_name': row['menu_name'],
+            'version': row['version_number'],
+            'section_name': row['section_name'],
+            'id': item_id,
+            'name': row['item_name'],
+            'description': row['description'],
+            'price': str(row['price']),
+            'score': score
+        })
+        if len(results) == limit:
+            break
+    return results
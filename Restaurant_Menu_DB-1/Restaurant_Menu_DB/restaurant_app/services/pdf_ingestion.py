@@ -0,0 +1,272 @@
+import multiprocessing
+import os
+import re
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from restaurant_app.models import Menu, MenuIngestionJob, MenuItem, MenuSection, MenuVersion, ProcessingLog
+from . import menu_cache, price_stats, menu_publishing
+
+STATUS_PENDING = 'Pending'
+STATUS_PROCESSING = 'Processing'
+STATUS_COMPLETED = 'Completed'
+STATUS_FAILED = 'Failed'
+
+DEFAULT_SECTION = 'Menu'
+
+# "Margherita Pizza ....... $12.50" / "Soup of the day 6,00"
+ITEM_LINE = re.compile(r'^(?P<name>.*?[^\s.·…_-])[\s.·…_-]*[$€£]?\s*(?P<price>\d{1,7}(?:[.,]\d{2})?)\s*$')
+
+
+class PdfParseError(Exception):
+    pass
+
+
+def extract_text(path):
+    """
+    Extracts the text of every page of a PDF.
+
+    Requires the optional pypdf package.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise PdfParseError('PDF ingestion requires the pypdf package')
+
+    try:
+        reader = PdfReader(path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages)
+    except Exception as e:
+        raise PdfParseError(f'Could not read PDF: {e}')
+
+
+def _is_section_heading(line):
+    words = line.split()
+    return len(line) <= 40 and len(words) <= 5 and (line.isupper() or line.istitle())
+
+
+def parse_menu_text(text):
+    """
+    Turns extracted menu text into sections and items.
+
+    A line ending in a price is an item, a short title-like line without a price
+    starts a section, and any other line is taken as the description of the item
+    above it. Items before the first heading go into a 'Menu' section. Repeated
+    headings are merged and repeated item names within a section keep the first.
+
+    Returns:
+        list: [(section name, [(item name, description, Decimal price), ...]), ...]
+    """
+    sections = {}
+    current_section = None
+    current_item = None
+
+    for raw_line in text.splitlines():
+        line = ' '.join(raw_line.split())
+        if not line:
+            continue
+
+        match = ITEM_LINE.match(line)
+        if match and any(char.isalpha() for char in match.group('name')):
+            section_items = sections.setdefault(current_section or DEFAULT_SECTION, {})
+            name = match.group('name').strip()[:255]
+            price = Decimal(match.group('price').replace(',', '.'))
+            if name not in section_items:
+                section_items[name] = [name, None, price]
+                current_item = section_items[name]
+            else:
+                current_item = None
+        elif _is_section_heading(line):
+            current_section = line[:255]
+            current_item = None
+        elif current_item is not None:
+            current_item[1] = f'{current_item[1]} {line}' if current_item[1] else line
+
+    parsed = [
+        (section_name, [tuple(item) for item in items.values()])
+        for section_name, items in sections.items()
+        if items
+    ]
+    if not parsed:
+        raise PdfParseError('No menu items with prices were found')
+    return parsed
+
+
+def parse_pdf(path):
+    """
+    CPU-bound part of a job, run inside the process pool. Touches no database.
+    """
+    return parse_menu_text(extract_text(path))
+
+
+def enqueue(menu, uploaded_file, activate=False, created_by='System'):
+    """
+    Stores an uploaded PDF and queues it for ingestion.
+
+    Returns:
+        MenuIngestionJob: The queued job; its processing_log tracks the status
+    """
+    with transaction.atomic():
+        log = ProcessingLog.objects.create(file_name=uploaded_file.name[:255], status=STATUS_PENDING)
+        return MenuIngestionJob.objects.create(
+            processing_log=log,
+            menu=menu,
+            file=uploaded_file,
+            activate=activate,
+            created_by=created_by
+        )
+
+
+def release_stale_jobs(older_than):
+    """
+    Puts jobs whose worker died mid-processing back in the queue.
+    """
+    cutoff = timezone.now() - older_than
+    stale = MenuIngestionJob.objects.filter(
+        processing_log__status=STATUS_PROCESSING,
+        claimed_at__lt=cutoff
+    ).values_list('processing_log_id', flat=True)
+    with transaction.atomic():
+        released = ProcessingLog.objects.filter(id__in=list(stale)).update(status=STATUS_PENDING)
+    return released
+
+
+def claim_jobs(limit, worker_name):
+    """
+    Atomically moves up to `limit` pending jobs to Processing for this worker.
+
+    Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED where the database
+    supports it, so several worker commands can share the queue.
+    """
+    with transaction.atomic():
+        pending = MenuIngestionJob.objects.filter(
+            processing_log__status=STATUS_PENDING
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        jobs = list(pending.select_related('processing_log')[:limit])
+        if not jobs:
+            return []
+
+        now = timezone.now()
+        MenuIngestionJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            claimed_by=worker_name,
+            claimed_at=now
+        )
+        ProcessingLog.objects.filter(id__in=[job.processing_log_id for job in jobs]).update(
+            status=STATUS_PROCESSING,
+            started_at=now
+        )
+    return jobs
+
+
+def write_version(job, parsed_sections):
+    """
+    Writes the parsed sections and items as a new MenuVersion of the job's menu, in one transaction.
+    """
+    with transaction.atomic():
+        # Lock the menu so concurrent jobs for it get distinct version numbers
+        menu = Menu.objects.select_for_update().get(pk=job.menu_id)
+        latest = MenuVersion.objects.filter(menu=menu).aggregate(latest=Max('version_number'))['latest']
+        version = MenuVersion(
+            menu=menu,
+            version_number=(latest or 0) + 1,
+            created_by=job.created_by,
+            notes=f'Imported from {job.processing_log.file_name}',
+            # Published below once its contents exist, so the read model is built once
+            is_active=False
+        )
+        version.save()
+
+        MenuSection.objects.bulk_create([
+            MenuSection(menu_version=version, name=section_name)
+            for section_name, _ in parsed_sections
+        ])
+        section_ids = dict(MenuSection.objects.filter(menu_version=version).values_list('name', 'id'))
+        MenuItem.objects.bulk_create([
+            MenuItem(section_id=section_ids[section_name], name=name, description=description, price=price)
+            for section_name, items in parsed_sections
+            for name, description, price in items
+        ])
+
+        ProcessingLog.objects.filter(pk=job.processing_log_id).update(
+            status=STATUS_COMPLETED,
+            menu_version=version,
+            completed_at=timezone.now(),
+            error_message=None
+        )
+        if job.activate:
+            version = menu_publishing.publish_version(menu.id, version.version_number)
+
+    # bulk_create skips the signal handlers
+    price_stats.rebuild_restaurant(menu.restaurant_id)
+    menu_cache.invalidate_version(menu.id, version.version_number)
+    return version
+
+
+def fail_job(job, error):
+    ProcessingLog.objects.filter(pk=job.processing_log_id).update(
+        status=STATUS_FAILED,
+        completed_at=timezone.now(),
+        error_message=str(error)
+    )
+
+
+def run_worker(workers=None, poll_interval=2.0, once=False, stale_after=timedelta(minutes=30), log=print):
+    """
+    Claims queued jobs and parses their PDFs in a process pool.
+
+    Parsing happens in the pool; the database writes happen in this process once
+    a parse result comes back, so the children never open database connections.
+    The children are spawned rather than forked: the pool starts them on submit,
+    after claim_jobs has opened this process's connection, and a forked child
+    would share its socket.
+
+    Args:
+        workers (int, optional): Pool size (defaults to the CPU count)
+        poll_interval (float): Seconds to wait when the queue is empty
+        once (bool): Stop when the queue is drained instead of polling
+        stale_after (timedelta): Age after which a Processing job is considered abandoned
+        log (callable): Receives progress messages
+    """
+    workers = workers or os.cpu_count() or 1
+    worker_name = f'{socket.gethostname()}:{os.getpid()}'
+
+    released = release_stale_jobs(stale_after)
+    if released:
+        log(f'Re-queued {released} abandoned jobs')
+
+    in_flight = {}
+    # Spawned children import this module, which needs the app registry
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=django.setup) as pool:
+        while True:
+            free_slots = workers - len(in_flight)
+            if free_slots > 0:
+                for job in claim_jobs(free_slots, worker_name):
+                    in_flight[pool.submit(parse_pdf, job.file.path)] = job
+                    log(f'Processing {job.processing_log.file_name} (job {job.id})')
+
+            if not in_flight:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    version = write_version(job, future.result())
+                    log(f'Completed {job.processing_log.file_name} as version {version.version_number}')
+                except Exception as e:
+                    fail_job(job, e)
+                    log(f'Failed {job.processing_log.file_name}: {e}')
@@ -0,0 +1,167 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Min, Max
+from django.utils import timezone
+
+from restaurant_app.models import MenuItem, MenuSection, RestaurantPriceStats
+
+
+def restaurant_id_for_section(section_id):
+    return MenuSection.objects.filter(pk=section_id).values_list(
+        'menu_version__menu__restaurant_id', flat=True
+    ).first()
+
+
+def rebuild_restaurant(restaurant_id):
+    """
+    Recomputes the statistics row of one restaurant from its items.
+    """
+    items = MenuItem.objects.filter(section__menu_version__menu__restaurant_id=restaurant_id)
+    totals = items.aggregate(
+        item_count=Count('id'),
+        price_sum=Sum('price'),
+        min_price=Min('price'),
+        max_price=Max('price')
+    )
+    cheapest = items.order_by('price', 'id').values_list('id', flat=True).first()
+    priciest = items.order_by('-price', 'id').values_list('id', flat=True).first()
+
+    RestaurantPriceStats.objects.update_or_create(
+        restaurant_id=restaurant_id,
+        defaults={
+            'item_count': totals['item_count'],
+            'price_sum': totals['price_sum'] or Decimal('0.00'),
+            'min_price': totals['min_price'],
+            'max_price': totals['max_price'],
+            'min_item_id': cheapest,
+            'max_item_id': priciest,
+            'updated_at': timezone.now(),
+        }
+    )
+
+
+def rebuild_all(chunk_size=2000):
+    """
+    Rebuilds the whole statistics table in a single ordered pass over all items.
+
+    Args:
+        chunk_size (int): Rows fetched per round trip and written per bulk_create batch
+
+    Returns:
+        int: Number of restaurants with statistics
+    """
+    rows = MenuItem.objects.order_by(
+        'section__menu_version__menu__restaurant_id'
+    ).values_list(
+        'section__menu_version__menu__restaurant_id', 'id', 'price'
+    ).iterator(chunk_size=chunk_size)
+
+    now = timezone.now()
+    batch = []
+    total = 0
+    current = None
+
+    with transaction.atomic():
+        RestaurantPriceStats.objects.all().delete()
+
+        for restaurant_id, item_id, price in rows:
+            if current is None or current.restaurant_id != restaurant_id:
+                if current is not None:
+                    batch.append(current)
+                current = RestaurantPriceStats(
+                    restaurant_id=restaurant_id,
+                    item_count=0,
+                    price_sum=Decimal('0.00'),
+                    updated_at=now
+                )
+                if len(batch) >= chunk_size:
+                    RestaurantPriceStats.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            _add_item(current, item_id, price)
+
+        if current is not None:
+            batch.append(current)
+        RestaurantPriceStats.objects.bulk_create(batch)
+        total += len(batch)
+
+    return total
+
+
+def _to_decimal(price):
+    # Unsaved instances may still hold a float or int assigned by the caller
+    return price if isinstance(price, Decimal) else Decimal(str(price)).quantize(Decimal('0.01'))
+
+
+def _add_item(stats, item_id, price):
+    stats.item_count += 1
+    stats.price_sum += price
+    if stats.min_price is None or price < stats.min_price:
+        stats.min_price = price
+        stats.min_item_id = item_id
+    if stats.max_price is None or price > stats.max_price:
+        stats.max_price = price
+        stats.max_item_id = item_id
+
+
+def _locked_stats(restaurant_id, create=True):
+    locked = RestaurantPriceStats.objects.select_for_update()
+    if not create:
+        return locked.filter(restaurant_id=restaurant_id).first()
+    stats, _ = locked.get_or_create(
+        restaurant_id=restaurant_id,
+        defaults={'price_sum': Decimal('0.00')}
+    )
+    return stats
+
+
+def item_added(restaurant_id, item_id, price):
+    with transaction.atomic():
+        stats = _locked_stats(restaurant_id)
+        _add_item(stats, item_id, _to_decimal(price))
+        stats.updated_at = timezone.now()
+        stats.save()
+
+
+def item_removed(restaurant_id, item_id, price):
+    with transaction.atomic():
+        # Never create a row here: the restaurant itself may be mid-cascade-delete
+        stats = _locked_stats(restaurant_id, create=False)
+        if stats is None:
+            return
+        if item_id in (stats.min_item_id, stats.max_item_id) or stats.item_count <= 1:
+            # The extreme itself went away; the next one is not known incrementally
+            rebuild_restaurant(restaurant_id)
+            return
+        stats.item_count -= 1
+        stats.price_sum -= _to_decimal(price)
+        stats.updated_at = timezone.now()
+        stats.save()
+
+
+def item_changed(old_restaurant_id, new_restaurant_id, item_id, old_price, new_price):
+    if old_restaurant_id != new_restaurant_id:
+        if old_restaurant_id is not None:
+            item_removed(old_restaurant_id, item_id, old_price)
+        item_added(new_restaurant_id, item_id, new_price)
+        return
+
+    old_price, new_price = _to_decimal(old_price), _to_decimal(new_price)
+    if old_price == new_price:
+        return
+
+    with transaction.atomic():
+        stats = _locked_stats(new_restaurant_id)
+        if item_id in (stats.min_item_id, stats.max_item_id):
+            rebuild_restaurant(new_restaurant_id)
+            return
+        stats.price_sum += new_price - old_price
+        if stats.min_price is None or new_price < stats.min_price:
+            stats.min_price = new_price
+            stats.min_item_id = item_id
+        if stats.max_price is None or new_price > stats.max_price:
+            stats.max_price = new_price
+            stats.max_item_id = item_id
+        stats.updated_at = timezone.now()
+        stats.save()
@@ -0,0 +1,178 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Restaurant, Menu, MenuVersion, MenuSection, MenuItem, DietaryRestriction, MenuItemDietaryRestriction
+)
+from .services import menu_cache, price_stats, active_menu, lookup_cache
+
+# Set while a bulk change of dietary links takes care of the derived data itself
+_dietary_links_deferred = ContextVar('dietary_links_deferred', default=False)
+
+
+def _cascaded(instance, origin):
+    # Rows deleted because their parent was: the parent's own handler rebuilds the read model once
+    if origin is None:
+        return False
+    origin_model = origin.model if hasattr(origin, 'query') else type(origin)
+    return origin_model is not type(instance)
+
+
+@receiver([post_save, post_delete], sender=MenuVersion)
+def invalidate_menu_version(sender, instance, origin=None, **kwargs):
+    """Saving a version may also flip which version is active, so the menu pointer goes too."""
+    menu_cache.invalidate_version(instance.menu_id, instance.version_number)
+    if not _cascaded(instance, origin):
+        active_menu.version_changed(instance)
+
+
+@receiver([post_save, post_delete], sender=MenuSection)
+def invalidate_menu_section(sender, instance, origin=None, **kwargs):
+    try:
+        version = MenuVersion.objects.only('menu_id', 'version_number', 'is_active').get(pk=instance.menu_version_id)
+    except MenuVersion.DoesNotExist:
+        # Cascading delete of the version, which has its own signal
+        return
+    menu_cache.invalidate_version(version.menu_id, version.version_number)
+    if version.is_active and not _cascaded(instance, origin):
+        active_menu.rebuild_menu(version.menu_id)
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_menu_item(sender, instance, signal, origin=None, **kwargs):
+    section_ids = {instance.section_id}
+    previous = getattr(instance, '_price_stats_previous', None) if signal is post_save else None
+    if previous is not None:
+        section_ids.add(previous[0])
+    versions = list(MenuVersion.objects.filter(
+        sections__id__in=section_ids
+    ).values('menu_id', 'version_number', 'is_active'))
+    for version in versions:
+        menu_cache.invalidate_version(version['menu_id'], version['version_number'])
+    if _cascaded(instance, origin):
+        return
+    active_menu_ids = {version['menu_id'] for version in versions if version['is_active']}
+    if len(section_ids) > 1:
+        # Moved to another section: rebuild the menus on both ends
+        for menu_id in active_menu_ids:
+            active_menu.rebuild_menu(menu_id)
+    elif active_menu_ids:
+        active_menu.refresh_item(active_menu_ids.pop(), instance.section_id, instance.pk)
+
+
+@contextmanager
+def deferred_dietary_link_handlers():
+    """
+    Skips the per-link cache invalidation and read-model refresh in the block.
+
+    For bulk changes of dietary links that invalidate the dietary index and
+    rebuild the menu once themselves afterwards.
+    """
+    token = _dietary_links_deferred.set(True)
+    try:
+        yield
+    finally:
+        _dietary_links_deferred.reset(token)
+
+
+@receiver([post_save, post_delete], sender=MenuItemDietaryRestriction)
+def invalidate_dietary_link(sender, instance, origin=None, **kwargs):
+    if _dietary_links_deferred.get():
+        return
+    version = MenuVersion.objects.filter(
+        sections__items__id=instance.item_id
+    ).values('menu_id', 'version_number', 'is_active', 'sections__id').first()
+    if version is None:
+        return
+    menu_cache.invalidate_dietary(version['menu_id'], version['version_number'])
+    # A deleted restriction leaves its ID behind in the read model, which is harmless:
+    # filters resolve restriction names first and never ask for it
+    if version['is_active'] and not _cascaded(instance, origin):
+        active_menu.refresh_item(version['menu_id'], version['sections__id'], instance.item_id)
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+@receiver([post_save, post_delete], sender=DietaryRestriction)
+def invalidate_lookup_cache(sender, **kwargs):
+    lookup_cache.invalidate_on_commit()
+
+
+@receiver(pre_save, sender=Restaurant)
+@receiver(pre_save, sender=Menu)
+def remember_name(sender, instance, raw=False, **kwargs):
+    """Keeps the stored name so post_save can tell a rename from any other save."""
+    instance._previous_name = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+def _menus_renamed(menus):
+    # The names are part of every cached payload of every version and of the read-model rows.
+    # Rebuilding gives the active menus new read-model rows and change markers, which is how the search index
+    # and the catalog snapshots of other processes notice the change
+    for menu_id, version_number in MenuVersion.objects.filter(menu__in=menus).values_list('menu_id', 'version_number'):
+        menu_cache.invalidate_version(menu_id, version_number)
+    for menu_id in MenuVersion.objects.filter(menu__in=menus, is_active=True).values_list('menu_id', flat=True):
+        active_menu.rebuild_menu(menu_id)
+
+
+@receiver(post_save, sender=Restaurant)
+def rename_restaurant_in_menus(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_name', None)
+    if not raw and not created and previous is not None and previous != instance.name:
+        _menus_renamed(Menu.objects.filter(restaurant_id=instance.pk))
+
+
+@receiver(post_delete, sender=Menu)
+def drop_deleted_menu(sender, instance, **kwargs):
+    active_menu.menu_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Menu)
+def rename_menu_in_menus(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_name', None)
+    if not raw and not created and previous is not None and previous != instance.name:
+        _menus_renamed(Menu.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=MenuItem)
+def remember_item_price(sender, instance, raw=False, **kwargs):
+    """
+    Keeps the stored price and section so post_save can apply a delta to the price stats
+    and tell items that moved to another section.
+    """
+    instance._price_stats_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._price_stats_previous = MenuItem.objects.filter(
+        pk=instance.pk
+    ).values_list('section_id', 'price').first()
+
+
+@receiver(post_save, sender=MenuItem)
+def update_price_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    restaurant_id = price_stats.restaurant_id_for_section(instance.section_id)
+    previous = getattr(instance, '_price_stats_previous', None)
+    if created or previous is None:
+        price_stats.item_added(restaurant_id, instance.pk, instance.price)
+        return
+
+    old_section_id, old_price = previous
+    old_restaurant_id = restaurant_id
+    if old_section_id != instance.section_id:
+        old_restaurant_id = price_stats.restaurant_id_for_section(old_section_id)
+    price_stats.item_changed(old_restaurant_id, restaurant_id, instance.pk, old_price, instance.price)
+
+
+@receiver(post_delete, sender=MenuItem)
+def update_price_stats_on_delete(sender, instance, **kwargs):
+    restaurant_id = price_stats.restaurant_id_for_section(instance.section_id)
+    if restaurant_id is None:
+        return
+    price_stats.item_removed(restaurant_id, instance.pk, instance.price)
@@ -1,3 +1,1742 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import Http404
+from django.db import DatabaseError, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import BasePermission
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from restaurant_project.menu_queries import (
+    get_menu_items_by_version, get_menu_items_by_dietary_restrictions, get_active_menu_sections,
+    get_restaurant_price_analytics, get_specific_restaurant_analytics, get_menu_version_diff,
+    aget_menu_items_by_version, aget_menu_items_by_dietary_restrictions, aget_active_menu_sections,
+    aget_restaurant_price_analytics, aget_specific_restaurant_analytics
+)
+from . import replicas, serializers, views
+from .instrumentation import QueryBudgetExceeded
+from .pagination import KeysetPagination
+from .models import (
+    Restaurant, Menu, MenuVersion, MenuSection, MenuItem, DietaryRestriction, MenuItemDietaryRestriction,
+    RestaurantPriceStats, ProcessingLog, MenuIngestionJob, ActiveMenuItem, ActiveMenuFacets,
+    ReplicationHeartbeat
+)
+from .services import (
+    active_menu, catalog_snapshot, compact_menu, dietary_filter, dietary_tagging, lookup_cache, menu_cache, menu_export, menu_facets, menu_import, menu_publishing, menu_repricing, menu_search,
+    pdf_ingestion, price_stats
+)
+
+
+def make_pdf(lines):
+    """
+    Builds a one-page PDF showing each line as text, enough for text extraction.
+    """
+    text = 'BT /F1 12 Tf 14 TL 72 720 Td ' + ' '.join(
+        '(%s) Tj T*' % line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for line in lines
+    ) + ' ET'
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        '/Resources << /Font << /F1 5 0 R >> >> >>',
+        '<< /Length %d >>\nstream\n%s\nendstream' % (len(text), text),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf = '%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += '%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += 'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += ''.join('%010d 00000 n \n' % offset for offset in offsets)
+    pdf += 'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf.encode('latin-1')
+
+
+class MenuTestCase(TestCase):
+    """
+    One restaurant with a two-version dinner menu; version 2 is the active one.
+
+    The files shared between processes (lookup cache signal, catalog snapshot,
+    search index) live in a temporary directory for the duration of the class.
+    Lookup cache misses load on the ORM thread, since a worker thread's
+    connection would not see the test's uncommitted rows.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(
+            LOOKUP_CACHE_SIGNAL_PATH=os.path.join(directory, 'lookup_cache.signal'),
+            CATALOG_SNAPSHOT_PATH=os.path.join(directory, 'catalog_snapshot.bin'),
+            SEARCH_INDEX_PATH=os.path.join(directory, 'search_index.pickle'),
+            LOOKUP_CACHE_LOAD_OFF_THREAD=False,
+        ))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vegan = DietaryRestriction.objects.create(name='Vegan')
+        cls.gluten_free = DietaryRestriction.objects.create(name='Gluten-Free')
+        cls.restaurant = Restaurant.objects.create(name='Luigi', address='1 Main St')
+        cls.menu = Menu.objects.create(restaurant=cls.restaurant, name='Dinner')
+        cls.v1 = cls.create_version(1, False, {
+            'Starters': [('Soup', '4.50', [])],
+            'Mains': [('Pasta', '11.00', []), ('Risotto', '13.00', [cls.vegan])],
+        })
+        cls.v2 = cls.create_version(2, True, {
+            'Starters': [('Soup', '5.00', [cls.vegan]), ('Salad', '7.50', [cls.vegan, cls.gluten_free])],
+            'Mains': [('Pasta', '12.00', []), ('Steak', '25.00', [cls.gluten_free])],
+            'Desserts': [],
+        })
+
+    @classmethod
+    def create_version(cls, version_number, is_active, sections):
+        version = MenuVersion.objects.create(menu=cls.menu, version_number=version_number, is_active=is_active)
+        for section_name, items in sections.items():
+            section = MenuSection.objects.create(menu_version=version, name=section_name)
+            for name, price, restrictions in items:
+                item = MenuItem.objects.create(section=section, name=name, description=f'{name} of the day',
+                                               price=Decimal(price))
+                for restriction in restrictions:
+                    MenuItemDietaryRestriction.objects.create(item=item, restriction=restriction)
+        return version
+
+    def setUp(self):
+        cache.clear()
+        lookup_cache.invalidate()
+
+    def item(self, name, version=None):
+        return MenuItem.objects.get(section__menu_version=version or self.v2, name=name)
+
+    def menu_items(self, version_number=None, **headers):
+        params = {'version_number': version_number} if version_number else {}
+        return self.client.get(reverse('menu-items', args=[self.restaurant.id, self.menu.id]), params, **headers)
+
+    def menu_data(self, version_number=None):
+        response = self.menu_items(version_number)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def prices(self, version_number=None):
+        return {
+            item['name']: item['price']
+            for section in self.menu_data(version_number)['sections']
+            for item in section['items']
+        }
+
+    def admin_client(self):
+        self.client.force_login(User.objects.create_user('admin', password='secret', is_staff=True))
+
+
+class QueryBudgetTests(MenuTestCase):
+
+    def budgeted_requests(self):
+        restaurant_id, menu_id = self.restaurant.id, self.menu.id
+        section = MenuSection.objects.filter(menu_version=self.v2).first()
+        menu_args = [restaurant_id, menu_id]
+        yield 'menu-items', reverse('menu-items', args=menu_args), {}
+        yield 'menu-items', reverse('menu-items', args=menu_args), {'version_number': 1}
+        yield 'menu-items-dietary', reverse('menu-items-dietary', args=menu_args), {'restrictions': 'Vegan'}
+        yield 'menu-items-dietary', reverse('menu-items-dietary', args=menu_args), {
+            'restrictions': 'Vegan,Halal', 'version_number': 1, 'match': 'all'
+        }
+        yield 'restaurant-analytics', reverse('restaurant-analytics'), {}
+        yield 'restaurant-analytics', reverse('restaurant-analytics'), {'active_only': 'true'}
+        yield 'specific-restaurant-analytics', reverse('specific-restaurant-analytics', args=[restaurant_id]), {}
+        for basename, pk in [('restaurant', restaurant_id), ('menu', menu_id), ('menusection', section.id),
+                             ('menuitem', self.item('Soup').id), ('dietaryrestriction', self.vegan.id)]:
+            yield f'{basename}-list', reverse(f'{basename}-list'), {}
+            yield f'{basename}-detail', reverse(f'{basename}-detail', args=[pk]), {}
+
+    @override_settings(QUERY_BUDGETS_ENFORCE=True)
+    def test_cold_reads_stay_within_budget(self):
+        for name, url, params in self.budgeted_requests():
+            with self.subTest(url=url, params=params):
+                self.setUp()
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(int(response['X-Query-Count']), settings.QUERY_BUDGETS[name])
+
+    @override_settings(QUERY_BUDGETS_ENFORCE=True)
+    def test_cold_batch_stays_within_budget(self):
+        # Lunch comes from the read model; the dinner versions, missing from it, from the normalized tables
+        lunch = Menu.objects.create(restaurant=self.restaurant, name='Lunch')
+        MenuSection.objects.create(menu_version=MenuVersion.objects.create(menu=lunch, version_number=1,
+                                                                           is_active=True), name='Plates')
+        ActiveMenuItem.objects.filter(menu=self.menu).delete()
+        # Signed-in clients pay no session lookup on this public endpoint
+        self.client.force_login(User.objects.create_user('guest', password='secret'))
+        entries = [{'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id, 'version_number': 1},
+                   {'restaurant_id': self.restaurant.id, 'menu_id': lunch.id},
+                   {'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id}]
+        response = self.client.post(reverse('menu-batch'), {'menus': entries}, content_type='application/json')
+
+        self.assertEqual([entry['status'] for entry in response.json()['data']], ['success'] * 3)
+        self.assertLessEqual(int(response['X-Query-Count']), settings.QUERY_BUDGETS['POST menu-batch'])
+
+    def test_warm_menu_items_run_no_queries(self):
+        self.menu_items()
+        with self.assertNumQueries(0):
+            response = self.menu_items()
+        self.assertEqual(response['X-Query-Count'], '0')
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    @override_settings(QUERY_BUDGETS={'restaurant-list': 0}, QUERY_BUDGETS_ENFORCE=True)
+    def test_enforced_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('restaurant-list'))
+
+    @override_settings(QUERY_BUDGETS={'restaurant-list': 0})
+    def test_budget_only_logs_when_not_enforced(self):
+        with self.assertLogs('restaurant_app.middleware', 'WARNING'):
+            response = self.client.get(reverse('restaurant-list'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={'restaurant-detail': 1}, QUERY_BUDGETS_ENFORCE=True)
+    def test_read_budget_does_not_apply_to_writes(self):
+        response = self.client.patch(reverse('restaurant-detail', args=[self.restaurant.id]), {'name': 'Mario'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+
+class MenuCacheTests(MenuTestCase):
+
+    def test_warm_menu_runs_no_queries(self):
+        get_menu_items_by_version(self.restaurant.id, self.menu.id)
+        with self.assertNumQueries(0):
+            menu_data = get_menu_items_by_version(self.restaurant.id, self.menu.id).to_dict()
+        self.assertEqual(menu_data['version'], 2)
+        self.assertEqual({section['section_name'] for section in menu_data['sections']},
+                         {'Starters', 'Mains', 'Desserts'})
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.menu_items()['ETag']
+        response = self.menu_items(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_item_change_invalidates_the_cached_menu(self):
+        etag = self.menu_items()['ETag']
+        soup = self.item('Soup')
+        soup.price = Decimal('5.50')
+        soup.save()
+
+        response = self.menu_items(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.prices()['Soup'], '5.50')
+
+    def test_item_delete_invalidates_a_specific_version(self):
+        self.assertIn('Risotto', self.prices(1))
+        self.item('Risotto', self.v1).delete()
+        self.assertNotIn('Risotto', self.prices(1))
+
+    def test_activating_a_version_moves_the_active_menu(self):
+        self.menu_data()
+        self.v1.is_active = True
+        self.v1.save()
+        self.assertEqual(self.menu_data()['version'], 1)
+
+    def body(self):
+        return compact_menu.response_body(get_menu_items_by_version(self.restaurant.id, self.menu.id))
+
+    def test_rendered_body_is_dropped_with_its_version(self):
+        body = self.body()
+        _, body, etag = menu_cache.set_rendered(self.menu.id, None, self.restaurant.id, body)
+        menu_cache.set_rendered(self.menu.id, 2, self.restaurant.id, body)
+        self.assertEqual(json.loads(body), {'status': 'success', 'data': self.menu_data()})
+        self.assertEqual(menu_cache.get_rendered(self.menu.id), (self.restaurant.id, body, etag))
+
+        soup = self.item('Soup')
+        soup.price = Decimal('5.50')
+        soup.save()
+        self.assertIsNone(menu_cache.get_rendered(self.menu.id))
+        self.assertIsNone(menu_cache.get_rendered(self.menu.id, 2))
+
+        self.assertNotEqual(menu_cache.set_rendered(self.menu.id, None, self.restaurant.id, self.body())[2], etag)
+
+    def test_restaurant_rename_invalidates_every_version(self):
+        self.menu_items()
+        self.menu_items(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.name = 'Mario'
+            self.restaurant.save()
+
+        self.assertEqual(self.menu_data()['restaurant_name'], 'Mario')
+        self.assertEqual(self.menu_data(1)['restaurant_name'], 'Mario')
+        self.assertEqual(set(ActiveMenuItem.objects.filter(menu=self.menu).values_list('restaurant_name', flat=True)),
+                         {'Mario'})
+
+    def test_menu_rename_invalidates_every_version(self):
+        self.menu_items()
+        self.menu_items(1)
+        self.menu.name = 'Supper'
+        self.menu.save()
+
+        self.assertEqual(self.menu_data()['menu_name'], 'Supper')
+        self.assertEqual(self.menu_data(1)['menu_name'], 'Supper')
+
+    def test_menu_of_another_restaurant_is_not_served(self):
+        self.menu_data()
+        other = Restaurant.objects.create(name='Mario')
+        with self.assertRaises(Http404):
+            get_menu_items_by_version(other.id, self.menu.id)
+
+
+class ReadModelTests(MenuTestCase):
+    ROW_FIELDS = ('restaurant_id', 'restaurant_name', 'menu_id', 'menu_name', 'menu_version_id', 'version_number',
+                  'section_id', 'section_name', 'item_id', 'item_name', 'description', 'price',
+                  'dietary_restriction_ids')
+
+    def rows(self, menu=None):
+        return list(ActiveMenuItem.objects.filter(menu=menu or self.menu).order_by(
+            'section_id', 'item_id'
+        ).values_list(*self.ROW_FIELDS))
+
+    def assertReadModelCurrent(self, menu=None):
+        # Item-level refreshes must leave exactly what a full rebuild writes
+        menu = menu or self.menu
+
+        def state():
+            facets = ActiveMenuFacets.objects.filter(menu=menu).values_list('sections', flat=True).first()
+            return self.rows(menu), facets
+
+        refreshed = state()
+        active_menu.rebuild_menu(menu.id)
+        self.assertEqual(refreshed, state())
+
+    def test_menu_is_served_from_the_read_model(self):
+        with self.assertNumQueries(1):
+            menu_data = get_menu_items_by_version(self.restaurant.id, self.menu.id).to_dict()
+        self.assertEqual([section['section_name'] for section in menu_data['sections']],
+                         ['Starters', 'Mains', 'Desserts'])
+        self.assertEqual(menu_data['sections'][2]['items'], [])
+
+    def test_read_model_matches_the_normalized_tables(self):
+        self.assertEqual(get_menu_items_by_version(self.restaurant.id, self.menu.id),
+                         get_menu_items_by_version(self.restaurant.id, self.menu.id, 2))
+
+    def test_item_changes_refresh_single_rows(self):
+        soup = self.item('Soup')
+        soup.price = Decimal('6.00')
+        soup.save()
+        self.assertReadModelCurrent()
+
+        MenuItem.objects.create(section=soup.section, name='Bread', price=Decimal('2.00'))
+        self.assertReadModelCurrent()
+
+        MenuItem.objects.create(section=MenuSection.objects.get(menu_version=self.v2, name='Desserts'),
+                                name='Tiramisu', price=Decimal('6.50'))
+        self.assertReadModelCurrent()
+        self.assertEqual(len(self.rows()), 6)
+
+        self.item('Tiramisu').delete()
+        self.assertReadModelCurrent()
+        self.assertEqual(self.prices()['Soup'], '6.00')
+
+    def test_item_moved_between_sections(self):
+        steak = self.item('Steak')
+        steak.section = MenuSection.objects.get(menu_version=self.v2, name='Starters')
+        steak.save()
+        self.assertReadModelCurrent()
+
+    def test_item_moved_to_another_menu(self):
+        lunch = Menu.objects.create(restaurant=self.restaurant, name='Lunch')
+        plates = MenuSection.objects.create(
+            menu_version=MenuVersion.objects.create(menu=lunch, version_number=1, is_active=True), name='Plates'
+        )
+        steak = self.item('Steak')
+        steak.section = plates
+        steak.save()
+
+        self.assertReadModelCurrent()
+        self.assertReadModelCurrent(lunch)
+        self.assertEqual([row[9] for row in self.rows(lunch)], ['Steak'])
+        self.assertNotIn('Steak', self.prices())
+
+    def test_dietary_links(self):
+        link = MenuItemDietaryRestriction.objects.create(item=self.item('Pasta'), restriction=self.vegan)
+        self.assertReadModelCurrent()
+        link.delete()
+        self.assertReadModelCurrent()
+
+    def test_publishing_another_version(self):
+        self.v1.is_active = True
+        self.v1.save()
+        self.assertEqual({row[5] for row in self.rows()}, {1})
+        self.assertReadModelCurrent()
+
+        self.v1.delete()
+        self.assertEqual(self.rows(), [])
+
+    def test_renames_reach_the_rows(self):
+        self.restaurant.name = 'Mario'
+        self.restaurant.save()
+        self.menu.name = 'Supper'
+        self.menu.save()
+        self.assertEqual({row[1:4:2] for row in self.rows()}, {('Mario', 'Supper')})
+
+    def test_inactive_versions_are_not_in_the_read_model(self):
+        soup = self.item('Soup', self.v1)
+        soup.price = Decimal('1.00')
+        soup.save()
+        self.assertFalse(ActiveMenuItem.objects.filter(item_id=soup.id).exists())
+
+    def test_rebuild_all(self):
+        rows = self.rows()
+        ActiveMenuItem.objects.all().delete()
+        active_menu.rebuild_all()
+        self.assertEqual(self.rows(), rows)
+
+
+class PublishingTests(MenuTestCase):
+
+    def test_clone_copies_the_active_version(self):
+        version, copied = menu_publishing.clone_version(self.menu.id)
+
+        self.assertEqual(version.version_number, 3)
+        self.assertFalse(version.is_active)
+        self.assertEqual(copied, {'sections': 3, 'items': 4, 'dietary_links': 4})
+        self.assertEqual(self.menu_data(3)['sections'][0]['section_name'], 'Starters')
+        self.assertEqual(self.prices(3), self.prices())
+
+    def test_publish_switches_the_active_version(self):
+        self.menu_items()
+        menu_publishing.publish_version(self.menu.id, 1)
+
+        self.assertEqual(list(MenuVersion.objects.filter(menu=self.menu, is_active=True)), [self.v1])
+        self.assertEqual(self.menu_data()['version'], 1)
+        self.assertEqual(set(ActiveMenuItem.objects.filter(menu=self.menu).values_list('version_number', flat=True)),
+                         {1})
+
+    def test_clone_and_activate(self):
+        version, _ = menu_publishing.clone_version(self.menu.id, source_version_number=1, activate=True)
+        self.assertTrue(version.is_active)
+        self.assertEqual(self.menu_data()['version'], 3)
+        self.assertEqual(self.prices(), self.prices(1))
+
+    def test_missing_version(self):
+        with self.assertRaises(MenuVersion.DoesNotExist):
+            menu_publishing.publish_version(self.menu.id, 9)
+
+    def test_endpoints_require_an_admin(self):
+        publish_url = reverse('menu-version-publish', args=[self.restaurant.id, self.menu.id, 1])
+        self.assertEqual(self.client.post(publish_url).status_code, 403)
+
+        self.admin_client()
+        response = self.client.post(reverse('menu-version-clone', args=[self.restaurant.id, self.menu.id]),
+                                    {'source_version': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data']['version'], 3)
+        response = self.client.post(reverse('menu-version-publish', args=[self.restaurant.id, self.menu.id, 3]))
+        self.assertEqual(response.json()['data'], {'version': 3, 'is_active': True})
+
+
+class VersionDiffTests(MenuTestCase):
+
+    def test_diff(self):
+        diff = get_menu_version_diff(self.restaurant.id, self.menu.id, 1, 2)
+
+        self.assertEqual(diff['sections'], {'added': ['Desserts'], 'removed': [], 'renamed': []})
+        self.assertEqual([(item['section'], item['name']) for item in diff['items']['added']],
+                         [('Mains', 'Steak'), ('Starters', 'Salad')])
+        self.assertEqual([item['name'] for item in diff['items']['removed']], ['Risotto'])
+        self.assertEqual(
+            {(change['name'], change['old_price'], change['new_price']) for change in diff['price_changes']},
+            {('Pasta', '11.00', '12.00'), ('Soup', '4.50', '5.00')}
+        )
+        self.assertEqual(diff['dietary_changes'],
+                         [{'section': 'Starters', 'name': 'Soup', 'added': ['Vegan'], 'removed': []}])
+
+    def test_renamed_item(self):
+        v3, _ = menu_publishing.clone_version(self.menu.id, source_version_number=1)
+        risotto = self.item('Risotto', v3)
+        risotto.name = 'Mushroom Risotto'
+        risotto.save()
+
+        diff = get_menu_version_diff(self.restaurant.id, self.menu.id, 1, 3)
+        self.assertEqual(diff['items']['renamed'], [{'section': 'Mains', 'from': 'Risotto', 'to': 'Mushroom Risotto'}])
+        self.assertEqual(diff['items']['added'], [])
+
+    def test_cached_diff_follows_changes(self):
+        get_menu_version_diff(self.restaurant.id, self.menu.id, 1, 2)
+        steak = self.item('Steak')
+        steak.price = Decimal('27.00')
+        steak.save()
+
+        diff = get_menu_version_diff(self.restaurant.id, self.menu.id, 1, 2)
+        self.assertEqual([item['price'] for item in diff['items']['added'] if item['name'] == 'Steak'], ['27.00'])
+
+    def test_other_restaurant(self):
+        get_menu_version_diff(self.restaurant.id, self.menu.id, 1, 2)
+        other = Restaurant.objects.create(name='Mario')
+        with self.assertRaises(Http404):
+            get_menu_version_diff(other.id, self.menu.id, 1, 2)
+
+    def test_endpoint(self):
+        url = reverse('menu-version-diff', args=[self.restaurant.id, self.menu.id])
+        self.assertEqual(self.client.get(url, {'from': 1, 'to': 9}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'from': 'x', 'to': 2}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': 1, 'to': 2}).json()['data']['to_version'], 2)
+
+
+class SearchTests(MenuTestCase):
+
+    def search(self, query, index=None):
+        index = index or menu_search.build_index()
+        return [MenuItem.objects.get(pk=item_id).name for item_id, _ in index.search(query)]
+
+    def test_exact_prefix_and_fuzzy_matches(self):
+        self.assertEqual(self.search('steak'), ['Steak'])
+        self.assertEqual(self.search('sal'), ['Salad'])
+        self.assertEqual(self.search('stek'), ['Steak'])
+        self.assertEqual(self.search('sopu'), ['Soup'])
+
+    def test_items_matching_more_tokens_rank_first(self):
+        self.assertEqual(self.search('luigi pasta')[0], 'Pasta')
+        self.assertEqual(len(self.search('luigi')), 4)
+
+    def test_inactive_versions_are_not_indexed(self):
+        self.assertEqual(self.search('risotto'), [])
+
+    def test_catch_up_picks_up_rebuilt_menus(self):
+        index = menu_search.build_index()
+        soup = self.item('Soup')
+        soup.name = 'Minestrone'
+        soup.save()
+
+        self.assertEqual(self.search('minestrone', index), [])
+        self.assertEqual(menu_search.catch_up(index), 1)
+        self.assertEqual(self.search('minestrone', index), ['Minestrone'])
+        self.assertEqual(menu_search.catch_up(index), 0)
+
+    def test_catch_up_picks_up_renames(self):
+        index = menu_search.build_index()
+        self.restaurant.name = 'Mario'
+        self.restaurant.save()
+
+        menu_search.catch_up(index)
+        self.assertEqual(len(self.search('mario', index)), 4)
+        self.assertEqual(self.search('luigi', index), [])
+
+    def test_saved_index_loads_back(self):
+        menu_search.save_index(menu_search.build_index())
+        self.assertEqual(self.search('salad', menu_search.load_index()), ['Salad'])
+
+    @mock.patch.object(menu_search, '_index', None)
+    def test_endpoint(self):
+        url = reverse('search')
+        results = self.client.get(url, {'q': 'gluten free salad'}).json()['data']['results']
+        self.assertEqual(results[0]['name'], 'Salad')
+        self.assertEqual((results[0]['price'], results[0]['version']), ('7.50', 2))
+
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'q': 'soup', 'limit': 'x'}).status_code, 400)
+
+
+class BrowseTests(MenuTestCase):
+
+    def browse(self, **params):
+        response = self.client.get(reverse('browse-items'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def names(self, **params):
+        return [item['name'] for item in self.browse(**params)['results']]
+
+    def test_facets_count_the_active_items(self):
+        facets = self.browse()['facets']
+        self.assertEqual(facets['restaurants'], [{'id': self.restaurant.id, 'name': 'Luigi', 'count': 4}])
+        self.assertEqual({bucket['name']: bucket['count'] for bucket in facets['price_buckets'] if bucket['count']},
+                         {'5-10': 2, '10-15': 1, '20-30': 1})
+        self.assertEqual({entry['name']: entry['count'] for entry in facets['dietary_restrictions']},
+                         {'Vegan': 2, 'Gluten-Free': 2})
+        self.assertEqual(ActiveMenuFacets.objects.get(menu=self.menu).sections['Desserts']['items'], 0)
+
+    def test_facets_cover_the_section_selection(self):
+        facets = self.browse(section='Mains')['facets']
+        self.assertEqual(facets['restaurants'][0]['count'], 2)
+        self.assertEqual([entry['name'] for entry in facets['dietary_restrictions']], ['Gluten-Free'])
+        self.assertEqual(self.browse(restaurant_ids=str(self.restaurant.id + 1))['facets']['restaurants'], [])
+
+    def test_filters(self):
+        self.assertEqual(self.names(), ['Soup', 'Salad', 'Pasta', 'Steak'])
+        self.assertEqual(self.names(min_price='6', max_price='20'), ['Salad', 'Pasta'])
+        self.assertEqual(self.names(restrictions='Vegan,Gluten-Free', match='all'), ['Salad'])
+        self.assertEqual(self.names(restrictions='Vegan,Gluten-Free', match='none'), ['Pasta'])
+        self.assertEqual(self.names(restrictions='Vegan'), ['Soup', 'Salad'])
+        self.assertEqual(self.names(section='Starters'), ['Soup', 'Salad'])
+
+    def test_results_are_paginated_by_price(self):
+        data = self.browse(page_size=3)
+        self.assertEqual([item['name'] for item in data['results']], ['Soup', 'Salad', 'Pasta'])
+        self.assertEqual([item['name'] for item in self.client.get(data['next']).json()['data']['results']],
+                         ['Steak'])
+
+    def test_facets_follow_item_changes(self):
+        self.browse()
+        steak = self.item('Steak')
+        steak.price = Decimal('9.00')
+        steak.save()
+        buckets = {bucket['name']: bucket['count'] for bucket in self.browse()['facets']['price_buckets']}
+        self.assertEqual((buckets['5-10'], buckets['20-30']), (3, 0))
+
+    def test_invalid_parameters(self):
+        url = reverse('browse-items')
+        for params in ({'min_price': 'x'}, {'restaurant_ids': 'a'}, {'restrictions': 'Vegan', 'match': 'some'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class AsyncQueryTests(MenuTestCase):
+
+    def assertSameResult(self, sync_function, async_function, *args, **kwargs):
+        expected = sync_function(*args, **kwargs)
+        cache.clear()
+        self.assertEqual(async_to_sync(async_function)(*args, **kwargs), expected)
+
+    def test_async_queries_match_the_sync_ones(self):
+        restaurant_id, menu_id = self.restaurant.id, self.menu.id
+        self.assertSameResult(get_menu_items_by_version, aget_menu_items_by_version, restaurant_id, menu_id)
+        self.assertSameResult(get_menu_items_by_version, aget_menu_items_by_version, restaurant_id, menu_id, 1)
+        self.assertSameResult(get_menu_items_by_dietary_restrictions, aget_menu_items_by_dietary_restrictions,
+                              restaurant_id, menu_id, dietary_restrictions=['Vegan'], match='all')
+        # The sync query leaves section order to the prefetch, so only the sections are compared
+        self.assertCountEqual(async_to_sync(aget_active_menu_sections)(restaurant_id),
+                              get_active_menu_sections(restaurant_id))
+        self.assertSameResult(get_restaurant_price_analytics, aget_restaurant_price_analytics, n=1)
+        self.assertSameResult(get_restaurant_price_analytics, aget_restaurant_price_analytics, active_only=True)
+        self.assertSameResult(get_specific_restaurant_analytics, aget_specific_restaurant_analytics, restaurant_id)
+        self.assertSameResult(get_specific_restaurant_analytics, aget_specific_restaurant_analytics,
+                              restaurant_id, active_only=True)
+
+    def test_missing_rows_match_the_sync_ones(self):
+        with self.assertRaises(Http404):
+            async_to_sync(aget_menu_items_by_version)(self.restaurant.id + 1, self.menu.id)
+        self.assertIsNone(async_to_sync(aget_active_menu_sections)(self.restaurant.id + 1))
+
+    async def test_async_views_count_their_queries(self):
+        url = reverse('menu-items', args=[self.restaurant.id, self.menu.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        response = await self.async_client.get(url)
+        self.assertEqual(response['X-Query-Count'], '0')
+
+
+class AsyncLookupTests(TransactionTestCase):
+    """Lookup cache misses of the async queries load in a worker thread, which only sees committed rows."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(
+            LOOKUP_CACHE_SIGNAL_PATH=os.path.join(directory, 'lookup_cache.signal'),
+            LOOKUP_CACHE_LOAD_OFF_THREAD=True
+        ))
+
+    def setUp(self):
+        cache.clear()
+        lookup_cache.invalidate()
+        self.restaurant = Restaurant.objects.create(name='Luigi', address='1 Main St')
+        self.menu = Menu.objects.create(restaurant=self.restaurant, name='Dinner')
+        version = MenuVersion.objects.create(menu=self.menu, version_number=1, is_active=True)
+        section = MenuSection.objects.create(menu_version=version, name='Starters')
+        soup = MenuItem.objects.create(section=section, name='Soup', price=Decimal('5.00'))
+        MenuItem.objects.create(section=section, name='Bread', price=Decimal('2.00'))
+        MenuItemDietaryRestriction.objects.create(item=soup, restriction=DietaryRestriction.objects.create(name='Vegan'))
+
+    def test_misses_load_beside_the_orm_queries(self):
+        threads = []
+
+        def recorded(load):
+            def record(*args):
+                threads.append(threading.get_ident())
+                return load(*args)
+            return record
+
+        with mock.patch.object(lookup_cache, '_load_restaurant', recorded(lookup_cache._load_restaurant)), \
+                mock.patch.object(lookup_cache, '_load_restriction_ids', recorded(lookup_cache._load_restriction_ids)):
+            menu_data = async_to_sync(aget_menu_items_by_dietary_restrictions)(
+                self.restaurant.id, self.menu.id, 1, dietary_restrictions=['Vegan']
+            )
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.get_ident(), threads)
+        cache.clear()
+        self.assertEqual(menu_data, get_menu_items_by_dietary_restrictions(
+            self.restaurant.id, self.menu.id, 1, dietary_restrictions=['Vegan']
+        ))
+        self.assertEqual([item['name'] for item in menu_data.to_dict()['sections'][0]['items']], ['Soup'])
+
+    def test_missing_restaurant(self):
+        with self.assertRaises(Http404):
+            async_to_sync(aget_menu_items_by_version)(self.restaurant.id + 1, self.menu.id, 1)
+
+
+class MenuBatchTests(MenuTestCase):
+
+    def batch(self, entries):
+        return self.client.post(reverse('menu-batch'), {'menus': entries}, content_type='application/json')
+
+    def test_entries_match_the_menu_items_endpoint(self):
+        entries = [{'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id},
+                   {'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id, 'version_number': 1}]
+        results = self.batch(entries).json()['data']
+        self.assertEqual([result['status'] for result in results], ['success', 'success'])
+        self.assertEqual(results[0]['data'], self.menu_data())
+        self.assertEqual(results[1]['data'], self.menu_data(1))
+
+    def test_missing_menus_fail_only_their_entry(self):
+        entries = [{'restaurant_id': self.restaurant.id + 1, 'menu_id': self.menu.id},
+                   {'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id, 'version_number': 9},
+                   {'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id}]
+        results = self.batch(entries).json()['data']
+        self.assertEqual([result['status'] for result in results], ['error', 'error', 'success'])
+        self.assertEqual([result['version_number'] for result in results], [None, 9, None])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        for number in range(3, 6):
+            menu = Menu.objects.create(restaurant=self.restaurant, name=f'Menu {number}')
+            version = MenuVersion.objects.create(menu=menu, version_number=1, is_active=False)
+            MenuItem.objects.create(section=MenuSection.objects.create(menu_version=version, name='Plates'),
+                                    name='Bread', price=Decimal('2.00'))
+        entries = [{'restaurant_id': self.restaurant.id, 'menu_id': menu_id, 'version_number': 1}
+                   for menu_id in Menu.objects.values_list('id', flat=True)]
+
+        with self.assertNumQueries(2):
+            results = self.batch(entries).json()['data']
+        self.assertEqual([result['status'] for result in results], ['success'] * 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.batch(entries).json()['data'], results)
+
+    @override_settings(MENU_BATCH_MAX_SIZE=1)
+    def test_invalid_batches(self):
+        entry = {'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id}
+        for menus in ([], {'menu_id': 1}, [entry, entry], [{'menu_id': 'x'}]):
+            with self.subTest(menus=menus):
+                self.assertEqual(self.batch(menus).status_code, 400)
+
+
+class ReplicaTests(TransactionTestCase):
+    """
+    Two SQLite files stand in for replicas; copying the primary into one of them replicates it.
+
+    Reads inside a transaction stay on the primary, so these tests commit their writes.
+    The replica connections are added once the class is set up, since the test runner
+    would otherwise try to create test databases for them.
+    """
+    REPLICAS = ('replica_1', 'replica_2')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        configured = connections.configure_settings({'default': {}, **{
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directory, f'{alias}.sqlite3')}
+            for alias in cls.REPLICAS
+        }})
+        for alias in cls.REPLICAS:
+            connections.settings[alias] = configured[alias]
+        cls.databases = cls.databases | set(cls.REPLICAS)
+        cls.enterClassContext(override_settings(
+            READ_REPLICAS=list(cls.REPLICAS),
+            LOOKUP_CACHE_SIGNAL_PATH=os.path.join(directory, 'lookup_cache.signal')
+        ))
+        # Checks run explicitly instead of on the monitor thread
+        cls.enterClassContext(mock.patch.object(replicas.ReplicaMonitor, 'start'))
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in cls.REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.monitor = self.enterContext(mock.patch.object(replicas, 'monitor', replicas.ReplicaMonitor()))
+        self.restaurant = Restaurant.objects.create(name='Luigi', address='1 Main St')
+        replicas.stamp_heartbeat()
+        for alias in self.REPLICAS:
+            self.replicate(alias)
+
+    def replicate(self, alias):
+        for connection in (connections['default'], connections[alias]):
+            connection.ensure_connection()
+        connections['default'].connection.backup(connections[alias].connection)
+
+    def rename(self, name):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(name=name)
+
+    def read_name(self):
+        return Restaurant.objects.get(pk=self.restaurant.pk).name
+
+    def test_scoped_reads_go_to_a_caught_up_replica(self):
+        self.assertEqual(self.monitor.check(), {'replica_1': 0.0, 'replica_2': 0.0})
+        self.rename('Mario')
+
+        with replicas.replica_reads():
+            self.assertEqual(self.read_name(), 'Luigi')
+        self.assertEqual(self.read_name(), 'Mario')
+
+    def test_lagging_replicas_stop_serving_reads(self):
+        self.monitor.check()
+        self.replicate('replica_1')
+        ReplicationHeartbeat.objects.using('replica_2').update_or_create(
+            pk=1, defaults={'beat_at': timezone.now() - timedelta(seconds=10)}
+        )
+        with self.assertLogs('restaurant_app.replicas', 'WARNING') as logs:
+            lag = self.monitor.check()
+
+        self.assertIn('Replica replica_2 dropped', logs.output[0])
+        self.assertEqual(lag['replica_1'], 0.0)
+        self.assertGreater(lag['replica_2'], settings.REPLICA_MAX_LAG_SECONDS)
+        self.assertEqual(self.monitor.healthy, ('replica_1',))
+        self.assertEqual(self.monitor.status()['replicas']['replica_2']['healthy'], False)
+
+        self.replicate('replica_2')
+        self.monitor.check()
+        self.assertEqual(set(self.monitor.healthy), set(self.REPLICAS))
+
+    def test_replica_without_a_heartbeat_is_not_used(self):
+        self.monitor.check()
+        ReplicationHeartbeat.objects.using('replica_2').all().delete()
+        with self.assertLogs('restaurant_app.replicas', 'WARNING'):
+            self.assertEqual(self.monitor.check()['replica_2'], None)
+        self.rename('Mario')
+        self.replicate('replica_1')
+
+        for _ in range(5):
+            with replicas.replica_reads():
+                self.assertEqual(self.read_name(), 'Mario')
+
+    def test_checks_do_not_stamp_the_primary(self):
+        beat_at = ReplicationHeartbeat.objects.get().beat_at
+        self.monitor.check()
+        self.assertEqual(ReplicationHeartbeat.objects.get().beat_at, beat_at)
+
+        call_command('replica_heartbeat', '--once', stdout=io.StringIO())
+        self.assertGreater(ReplicationHeartbeat.objects.get().beat_at, beat_at)
+
+    def test_no_replica_serves_reads_without_a_recent_heartbeat(self):
+        self.monitor.check()
+        ReplicationHeartbeat.objects.update(beat_at=timezone.now() - timedelta(minutes=5))
+        with self.assertLogs('restaurant_app.replicas', 'WARNING') as logs:
+            lag = self.monitor.check()
+
+        self.assertIn('replica_heartbeat', logs.output[0])
+        self.assertEqual(lag, {'replica_1': None, 'replica_2': None})
+        self.assertEqual(self.monitor.healthy, ())
+        self.rename('Mario')
+        with replicas.replica_reads():
+            self.assertEqual(self.read_name(), 'Mario')
+
+    def test_a_write_pins_its_client_to_the_primary(self):
+        self.monitor.check()
+        url = reverse('restaurant-detail', args=[self.restaurant.pk])
+        response = self.client.patch(url, {'name': 'Mario'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('replica_pin', response.cookies)
+
+        self.assertEqual(self.client.get(url).json()['name'], 'Mario')
+        self.client.cookies.pop('replica_pin')
+        self.assertEqual(self.client.get(url).json()['name'], 'Luigi')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        self.monitor.check()
+        self.rename('Mario')
+        with transaction.atomic(), replicas.replica_reads():
+            self.assertEqual(self.read_name(), 'Mario')
+
+
+class LookupCacheTests(MenuTestCase):
+
+    def test_warm_lookups_run_no_queries(self):
+        lookup_cache.get_restaurant(self.restaurant.id)
+        lookup_cache.get_restaurant(self.restaurant.id + 1)
+        dietary_filter.resolve_restriction_ids(['Vegan'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup_cache.get_restaurant(str(self.restaurant.id)),
+                             {'id': self.restaurant.id, 'name': 'Luigi', 'address': '1 Main St'})
+            self.assertIsNone(lookup_cache.get_restaurant(self.restaurant.id + 1))
+            self.assertEqual(dietary_filter.resolve_restriction_ids(['Vegan', 'Halal']),
+                             ([self.vegan.id], ['Halal']))
+
+    def test_changes_invalidate_on_commit(self):
+        lookup_cache.get_restaurant(self.restaurant.id)
+        dietary_filter.resolve_restriction_ids(['Halal'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.filter(pk=self.restaurant.pk).first().save()
+            halal = DietaryRestriction.objects.create(name='Halal')
+
+        with self.assertNumQueries(2):
+            lookup_cache.get_restaurant(self.restaurant.id)
+            self.assertEqual(dietary_filter.resolve_restriction_ids(['Halal']), ([halal.id], []))
+
+    @override_settings(LOOKUP_CACHE_CHECK_SECONDS=0)
+    def test_other_processes_invalidate_through_the_signal_file(self):
+        lookup_cache.get_restaurant(self.restaurant.id)
+        signal = os.stat(settings.LOOKUP_CACHE_SIGNAL_PATH).st_mtime_ns
+        os.utime(settings.LOOKUP_CACHE_SIGNAL_PATH, ns=(signal + 10 ** 9, signal + 10 ** 9))
+
+        with self.assertNumQueries(1):
+            lookup_cache.get_restaurant(self.restaurant.id)
+        with self.assertNumQueries(0):
+            lookup_cache.get_restaurant(self.restaurant.id)
+
+    def test_lru_eviction_and_expiry(self):
+        lru = lookup_cache.LRUCache(maxsize=2, ttl=None)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+        self.assertEqual(lru.stats(), {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1, 'evictions': 1})
+
+        expired = lookup_cache.LRUCache(maxsize=2, ttl=0)
+        expired.set('a', 1)
+        self.assertEqual(expired.get('a', 'missing'), 'missing')
+
+    @override_settings(INTERNAL_IPS=['127.0.0.1'])
+    def test_metrics_report_the_counters(self):
+        # The counters run for the life of the process
+        before = lookup_cache.stats()['restaurants']
+        lookup_cache.get_restaurant(self.restaurant.id)
+        lookup_cache.get_restaurant(self.restaurant.id)
+        stats = self.client.get(reverse('internal-metrics')).json()['lookup_cache']['restaurants']
+        self.assertEqual((stats['size'], stats['hits'] - before['hits'], stats['misses'] - before['misses']),
+                         (1, 1, 1))
+
+
+class CompactMenuTests(MenuTestCase):
+
+    def compact(self, version_number=None):
+        return get_menu_items_by_version(self.restaurant.id, self.menu.id, version_number)
+
+    def test_json_bytes_match_json_dumps(self):
+        menu = compact_menu.CompactMenu.from_sections('Café "Luigi"', 'Dinner', 2, [
+            ('Starters', [(1, 'Crème brûlée', 'Line\nbreak', Decimal('4.05')), (2, 'Tea', None, Decimal('0.50'))]),
+            ('Empty', []),
+        ])
+        self.assertEqual(menu.to_json_bytes(), json.dumps(menu.to_dict()).encode('ascii'))
+        self.assertEqual(self.compact().to_json_bytes(), json.dumps(self.menu_data()).encode('ascii'))
+
+    def test_endpoint_body_is_unchanged(self):
+        self.assertEqual(self.menu_items().content,
+                         json.dumps({'status': 'success', 'data': self.compact().to_dict()}).encode('ascii'))
+
+    def test_items_carry_their_ids(self):
+        starters = self.menu_data()['sections'][0]
+        self.assertEqual(starters['items'][1], {'id': self.item('Salad').id, 'name': 'Salad',
+                                                'description': 'Salad of the day', 'price': '7.50'})
+
+    def test_menus_are_immutable_and_pickle(self):
+        menu = self.compact()
+        with self.assertRaises(AttributeError):
+            menu.version = 3
+        self.assertEqual(pickle.loads(pickle.dumps(menu)), menu)
+        self.assertNotEqual(menu, self.compact(1))
+
+    def test_filtered_keeps_every_section(self):
+        salad = self.item('Salad').id
+        menu = self.compact().filtered(lambda item_id: item_id == salad)
+        self.assertEqual([(section['section_name'], [item['name'] for item in section['items']])
+                          for section in menu.to_dict()['sections']],
+                         [('Starters', ['Salad']), ('Mains', []), ('Desserts', [])])
+        self.assertEqual(len(menu), 1)
+
+
+class CatalogSnapshotTests(MenuTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Every test starts without a mapped snapshot in this process
+        self.enterContext(mock.patch.multiple(catalog_snapshot, _snapshot=None, _last_refresh=None))
+
+    def add_menu(self, name):
+        menu = Menu.objects.create(restaurant=self.restaurant, name=name)
+        version = MenuVersion.objects.create(menu=menu, version_number=1, is_active=True)
+        MenuItem.objects.create(section=MenuSection.objects.create(menu_version=version, name='Plates'),
+                                name=f'{name} special', price=Decimal('9.00'))
+        return menu
+
+    def test_build_and_lookup(self):
+        menus = [self.menu] + [self.add_menu(name) for name in ('Lunch', 'Brunch', 'Late')]
+        self.assertEqual(catalog_snapshot.build_snapshot(), 4)
+        snapshot = catalog_snapshot.CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH)
+
+        for menu in menus:
+            response = self.client.get(reverse('menu-items', args=[self.restaurant.id, menu.id]))
+            self.assertEqual(snapshot.lookup(menu.id), (self.restaurant.id, response.content, response['ETag']))
+        self.assertIsNone(snapshot.lookup(menus[-1].id + 1))
+        self.assertIsNone(snapshot.lookup(0))
+
+    def test_menu_items_are_served_from_the_snapshot(self):
+        catalog_snapshot.build_snapshot()
+        expected = self.menu_items()
+        cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.menu_items()
+        self.assertEqual((response.content, response['ETag']), (expected.content, expected['ETag']))
+        self.assertEqual(self.menu_items(HTTP_IF_NONE_MATCH=expected['ETag']).status_code, 304)
+
+    def test_catch_up_marks_rebuilt_menus(self):
+        lunch = self.add_menu('Lunch')
+        catalog_snapshot.build_snapshot()
+        snapshot = catalog_snapshot.CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH)
+        soup = self.item('Soup')
+        soup.price = Decimal('5.50')
+        soup.save()
+
+        snapshot.catch_up()
+        self.assertEqual(snapshot.changed, {self.menu.id})
+        self.assertIsNotNone(snapshot.lookup(lunch.id))
+
+    def test_catch_up_marks_renamed_menus(self):
+        catalog_snapshot.build_snapshot()
+        snapshot = catalog_snapshot.CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH)
+        self.menu.name = 'Supper'
+        self.menu.save()
+
+        snapshot.catch_up()
+        self.assertEqual(snapshot.changed, {self.menu.id})
+
+    def test_catch_up_marks_deleted_and_deactivated_menus(self):
+        lunch, brunch = self.add_menu('Lunch'), self.add_menu('Brunch')
+        catalog_snapshot.build_snapshot()
+        snapshot = catalog_snapshot.CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH)
+        lunch_id = lunch.id
+        lunch.delete()
+        version = MenuVersion.objects.get(menu=brunch)
+        version.is_active = False
+        version.save()
+
+        snapshot.catch_up()
+        self.assertEqual(snapshot.changed, {lunch_id, brunch.id})
+        self.assertIsNotNone(snapshot.lookup(self.menu.id))
+
+    @override_settings(CATALOG_SNAPSHOT_REFRESH_SECONDS=0)
+    def test_deleted_menus_are_not_served(self):
+        lunch = self.add_menu('Lunch')
+        catalog_snapshot.build_snapshot()
+        self.assertIsNotNone(catalog_snapshot.lookup(lunch.id))
+        # As if another process deleted it: no on-commit hook runs in this one
+        lunch_id = lunch.id
+        lunch.delete()
+
+        self.assertIsNone(catalog_snapshot.lookup(lunch_id))
+        response = self.client.get(reverse('menu-items', args=[self.restaurant.id, lunch_id]))
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_rebuild_in_this_process_stops_serving_the_menu(self):
+        catalog_snapshot.build_snapshot()
+        self.menu_items()
+        soup = self.item('Soup')
+        soup.price = Decimal('5.50')
+        with self.captureOnCommitCallbacks(execute=True):
+            soup.save()
+
+        self.assertIsNone(catalog_snapshot.lookup(self.menu.id))
+        self.assertEqual(self.prices()['Soup'], '5.50')
+
+    @override_settings(CATALOG_SNAPSHOT_REFRESH_SECONDS=0)
+    def test_swapped_file_is_mapped_again(self):
+        catalog_snapshot.build_snapshot()
+        first = catalog_snapshot.get_snapshot()
+        lunch = self.add_menu('Lunch')
+        self.assertIsNone(catalog_snapshot.lookup(lunch.id))
+
+        catalog_snapshot.build_snapshot()
+        self.assertIsNot(catalog_snapshot.get_snapshot(), first)
+        self.assertEqual(catalog_snapshot.lookup(lunch.id)[0], self.restaurant.id)
+        self.assertEqual(first.lookup(self.menu.id), catalog_snapshot.lookup(self.menu.id))
+
+    def test_unusable_file_is_ignored(self):
+        with open(settings.CATALOG_SNAPSHOT_PATH, 'wb') as output:
+            output.write(b'not a snapshot' * 4)
+        with self.assertLogs('restaurant_app.services.catalog_snapshot', 'WARNING'):
+            self.assertIsNone(catalog_snapshot.get_snapshot())
+        self.assertEqual(self.menu_data()['version'], 2)
+
+
+class DietaryFilterTests(MenuTestCase):
+
+    def dietary_items(self, restrictions, match='any', version_number=None):
+        menu_data = get_menu_items_by_dietary_restrictions(self.restaurant.id, self.menu.id, version_number,
+                                                           restrictions, match)
+        return {item['name'] for section in menu_data.to_dict()['sections'] for item in section['items']}
+
+    def test_match_modes(self):
+        restrictions = ['Vegan', 'Gluten-Free']
+        self.assertEqual(self.dietary_items(restrictions), {'Soup', 'Salad', 'Steak'})
+        self.assertEqual(self.dietary_items(restrictions, 'all'), {'Salad'})
+        self.assertEqual(self.dietary_items(restrictions, 'none'), {'Pasta'})
+        self.assertEqual(self.dietary_items(['Vegan'], version_number=1), {'Risotto'})
+
+    def test_unknown_restriction(self):
+        self.assertEqual(self.dietary_items(['Vegan', 'Halal']), {'Soup', 'Salad'})
+        self.assertEqual(self.dietary_items(['Vegan', 'Halal'], 'all'), set())
+        self.assertEqual(self.dietary_items(['Halal'], 'none'), {'Soup', 'Salad', 'Pasta', 'Steak'})
+
+    def test_invalid_match(self):
+        with self.assertRaises(ValidationError):
+            self.dietary_items(['Vegan'], 'some')
+
+    def test_filtering_leaves_the_cached_menu_alone(self):
+        self.dietary_items(['Gluten-Free'])
+        self.assertEqual(len(self.prices()), 4)
+
+    def test_link_change_drops_the_index(self):
+        self.assertNotIn('Pasta', self.dietary_items(['Vegan']))
+        link = MenuItemDietaryRestriction.objects.create(item=self.item('Pasta'), restriction=self.vegan)
+        self.assertIn('Pasta', self.dietary_items(['Vegan']))
+        link.delete()
+        self.assertNotIn('Pasta', self.dietary_items(['Vegan']))
+
+
+class PriceStatsTests(MenuTestCase):
+    STATS_FIELDS = ('item_count', 'price_sum', 'min_price', 'max_price', 'min_item_id', 'max_item_id')
+
+    def stats(self, restaurant=None):
+        return RestaurantPriceStats.objects.filter(restaurant=restaurant or self.restaurant).values_list(
+            *self.STATS_FIELDS
+        ).first()
+
+    def assertStatsCurrent(self):
+        # The deltas applied by the item hooks must match a recompute from scratch
+        incremental = self.stats()
+        price_stats.rebuild_restaurant(self.restaurant.id)
+        self.assertEqual(incremental, self.stats())
+
+    def test_stats_follow_item_changes(self):
+        self.assertEqual(self.stats()[:4], (7, Decimal('78.00'), Decimal('4.50'), Decimal('25.00')))
+
+        pasta = self.item('Pasta')
+        pasta.price = Decimal('14.00')
+        pasta.save()
+        self.assertStatsCurrent()
+
+        steak = self.item('Steak')
+        steak.price = Decimal('9.00')
+        steak.save()
+        self.assertStatsCurrent()
+        self.assertEqual(self.stats()[3], Decimal('14.00'))
+
+        MenuItem.objects.create(section=steak.section, name='Lobster', price=Decimal('40.00'))
+        self.assertStatsCurrent()
+
+        self.item('Soup', self.v1).delete()
+        self.assertStatsCurrent()
+        self.assertEqual(self.stats()[:3], (7, Decimal('99.50'), Decimal('5.00')))
+
+    def test_item_moved_to_another_restaurant(self):
+        other = Restaurant.objects.create(name='Mario')
+        version = MenuVersion.objects.create(menu=Menu.objects.create(restaurant=other, name='Lunch'))
+        steak = self.item('Steak')
+        steak.section = MenuSection.objects.create(menu_version=version, name='Grill')
+        steak.save()
+
+        self.assertStatsCurrent()
+        self.assertEqual(self.stats(other)[:4], (1, Decimal('25.00'), Decimal('25.00'), Decimal('25.00')))
+
+    def test_rebuild_all(self):
+        incremental = self.stats()
+        RestaurantPriceStats.objects.all().delete()
+        self.assertEqual(price_stats.rebuild_all(chunk_size=2), 1)
+        self.assertEqual(self.stats(), incremental)
+
+    def test_analytics_read_the_stats(self):
+        mario = Restaurant.objects.create(name='Mario')
+        version = MenuVersion.objects.create(menu=Menu.objects.create(restaurant=mario, name='Lunch'))
+        MenuItem.objects.create(section=MenuSection.objects.create(menu_version=version, name='Plates'),
+                                name='Pizza', price=Decimal('9.00'))
+
+        with self.assertNumQueries(2):
+            analytics = get_specific_restaurant_analytics(self.restaurant.id)
+        self.assertEqual(analytics['total_items'], 7)
+        self.assertAlmostEqual(analytics['average_price'], 78 / 7)
+        self.assertEqual(analytics['price_extremes']['most_expensive'],
+                         {'name': 'Steak', 'price': 25.0, 'section': 'Mains', 'menu': 'Dinner'})
+        self.assertEqual(analytics['price_extremes']['least_expensive']['price'], 4.5)
+
+        analytics = get_restaurant_price_analytics(n=1)
+        self.assertEqual([row['restaurant_name'] for row in analytics['highest_average_restaurants']], ['Luigi'])
+        self.assertEqual([row['restaurant_name'] for row in analytics['lowest_average_restaurants']], ['Mario'])
+
+
+class ActiveAnalyticsTests(MenuTestCase):
+
+    def add_restaurant(self, name, price, is_active=True):
+        restaurant = Restaurant.objects.create(name=name)
+        version = MenuVersion.objects.create(menu=Menu.objects.create(restaurant=restaurant, name='Lunch'),
+                                             is_active=is_active)
+        MenuItem.objects.create(section=MenuSection.objects.create(menu_version=version, name='Plates'),
+                                name='Pizza', price=Decimal(price))
+        return restaurant
+
+    def test_specific_restaurant_in_one_query(self):
+        with self.assertNumQueries(1):
+            analytics = get_specific_restaurant_analytics(self.restaurant.id, active_only=True)
+
+        self.assertEqual(analytics['total_items'], 4)
+        self.assertAlmostEqual(analytics['average_price'], 12.375)
+        self.assertEqual(analytics['price_extremes'], {
+            'most_expensive': {'name': 'Steak', 'price': 25.0, 'section': 'Mains', 'menu': 'Dinner'},
+            'least_expensive': {'name': 'Soup', 'price': 5.0, 'section': 'Starters', 'menu': 'Dinner'},
+        })
+
+    def test_specific_restaurant_without_active_items(self):
+        paolo = self.add_restaurant('Paolo', '99.00', is_active=False)
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.assertIsNone(get_specific_restaurant_analytics(paolo.id, active_only=True))
+            self.assertIsNone(async_to_sync(aget_specific_restaurant_analytics)(paolo.id, active_only=True))
+        # An empty result is not an error
+        self.assertEqual(output.getvalue(), '')
+
+    def test_ranking_ignores_inactive_versions(self):
+        self.add_restaurant('Mario', '9.00')
+        self.add_restaurant('Paolo', '99.00', is_active=False)
+
+        with self.assertNumQueries(1):
+            analytics = get_restaurant_price_analytics(n=1, active_only=True)
+
+        self.assertEqual([row['restaurant_name'] for row in analytics['highest_average_restaurants']], ['Luigi'])
+        self.assertEqual([row['restaurant_name'] for row in analytics['lowest_average_restaurants']], ['Mario'])
+        mario = analytics['lowest_average_restaurants'][0]
+        self.assertEqual(mario['address'], 'Address not available')
+        self.assertEqual(mario['price_extremes']['most_expensive'], mario['price_extremes']['least_expensive'])
+
+        analytics = get_restaurant_price_analytics(n=5, active_only=True)
+        self.assertEqual(len(analytics['highest_average_restaurants']), 2)
+
+
+class MenuImportTests(MenuTestCase):
+
+    def run_import(self, rows, chunk_size=menu_import.DEFAULT_CHUNK_SIZE):
+        text = ''.join(json.dumps(row) + '\n' for row in rows)
+        importer = menu_import.MenuImporter(chunk_size=chunk_size)
+        return importer.run(menu_import.iter_rows(io.StringIO(text), 'jsonl'))
+
+    def test_import_builds_the_menus(self):
+        rows = [
+            {'restaurant_name': 'Mario', 'address': '2 Side St', 'menu_name': 'Lunch', 'version_number': 1,
+             'is_active': False, 'section_name': 'Plates', 'item_name': 'Pizza', 'price': '9'},
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'version_number': 2, 'section_name': 'Plates',
+             'item_name': 'Pizza', 'price': '10.5', 'dietary_restrictions': ['Vegan', 'Halal']},
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'version_number': 2, 'section_name': 'Plates',
+             'item_name': 'Calzone', 'price': 12},
+        ]
+        result = self.run_import(rows, chunk_size=2)
+
+        self.assertEqual(result['error_count'], 0, result['errors'])
+        self.assertEqual(result['created'], {'restaurants': 1, 'menus': 1, 'versions': 2, 'sections': 2,
+                                             'items': 3, 'dietary_restrictions': 1, 'dietary_links': 2})
+        mario = Restaurant.objects.get(name='Mario')
+        lunch = Menu.objects.get(restaurant=mario)
+        self.assertEqual(mario.address, '2 Side St')
+        self.assertEqual(list(MenuVersion.objects.filter(menu=lunch, is_active=True).values_list(
+            'version_number', flat=True
+        )), [2])
+        self.assertEqual(sorted(MenuItemDietaryRestriction.objects.filter(item__name='Pizza').values_list(
+            'restriction__name', flat=True
+        )), ['Halal', 'Vegan'])
+        # bulk_create skips the item hooks, so the importer refreshes the price stats itself
+        self.assertEqual(RestaurantPriceStats.objects.get(restaurant=mario).item_count, 3)
+
+    def test_import_into_a_cached_menu(self):
+        self.assertNotIn('Bread', self.prices())
+        result = self.run_import([{'restaurant_name': 'Luigi', 'menu_name': 'Dinner', 'version_number': 2,
+                                   'section_name': 'Starters', 'item_name': 'Bread', 'price': '2'}])
+
+        self.assertEqual(result['created']['items'], 1)
+        self.assertEqual(result['created']['versions'], 0)
+        self.assertEqual(self.prices()['Bread'], '2.00')
+
+    def test_invalid_rows_are_reported(self):
+        rows = [
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Plates', 'item_name': 'Pizza',
+             'price': '9'},
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Plates', 'price': '3'},
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Plates', 'item_name': 'Calzone',
+             'price': 'cheap'},
+            {'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Plates', 'item_name': 'Pizza',
+             'price': '10'},
+        ]
+        result = self.run_import(rows)
+
+        self.assertEqual(result['created']['items'], 1)
+        self.assertEqual(result['errors'], [
+            {'row': 2, 'error': 'item_name is required'},
+            {'row': 3, 'error': 'price must be a decimal number'},
+            {'row': 4, 'error': "Item 'Pizza' already exists in section 'Plates'"},
+        ])
+        self.assertEqual(result['error_count'], 3)
+
+    def test_failed_chunk_is_not_counted(self):
+        rows = [{'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Plates', 'item_name': name,
+                 'price': '9', 'dietary_restrictions': ['Halal']} for name in ('Pizza', 'Calzone')]
+        # The second chunk creates a section and a restriction before its items fail
+        rows.append({'restaurant_name': 'Mario', 'menu_name': 'Lunch', 'section_name': 'Drinks',
+                     'item_name': 'Lemonade', 'price': '3', 'dietary_restrictions': ['Kosher']})
+        real_bulk_create = MenuItem.objects.bulk_create
+        calls = []
+
+        def bulk_create(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            return real_bulk_create(*args, **kwargs)
+
+        with mock.patch.object(MenuItem.objects, 'bulk_create', side_effect=bulk_create):
+            result = self.run_import(rows, chunk_size=2)
+
+        self.assertEqual(result['created'], {'restaurants': 1, 'menus': 1, 'versions': 1, 'sections': 1,
+                                             'items': 2, 'dietary_restrictions': 1, 'dietary_links': 2})
+        self.assertEqual(result['errors'], [{'row': 3, 'error': 'Chunk failed: disk full'}])
+        self.assertEqual(sorted(MenuItem.objects.filter(section__menu_version__menu__name='Lunch').values_list(
+            'name', flat=True
+        )), ['Calzone', 'Pizza'])
+        self.assertFalse(DietaryRestriction.objects.filter(name='Kosher').exists())
+
+    def test_rows_without_an_item_create_the_section(self):
+        result = self.run_import([{'restaurant_name': 'Luigi', 'menu_name': 'Dinner', 'version_number': 2,
+                                   'section_name': 'Drinks'}])
+
+        self.assertEqual(result['error_count'], 0, result['errors'])
+        self.assertEqual((result['created']['sections'], result['created']['items']), (1, 0))
+        self.assertEqual(self.menu_data()['sections'][-1], {'section_name': 'Drinks', 'items': []})
+
+    def test_unparseable_lines(self):
+        importer = menu_import.MenuImporter()
+        result = importer.run(menu_import.iter_rows(io.StringIO('not json\n[1]\n'), 'jsonl'))
+        self.assertEqual([error['row'] for error in result['errors']], [1, 2])
+        self.assertEqual(result['errors'][1]['error'], 'Each line must be a JSON object')
+
+
+class MenuExportTests(MenuTestCase):
+
+    def export(self, fmt='jsonl', **filters):
+        return ''.join(menu_export.iter_export(fmt, restaurant_ids=[self.restaurant.id], **filters))
+
+    def test_export_rows(self):
+        rows = [json.loads(line) for line in self.export(active_only=True, chunk_size=3).splitlines()]
+
+        self.assertEqual([row['item_name'] for row in rows], ['Soup', 'Salad', 'Pasta', 'Steak', None])
+        self.assertEqual(rows[1], {
+            'restaurant_name': 'Luigi', 'address': '1 Main St', 'menu_name': 'Dinner', 'version_number': 2,
+            'is_active': True, 'section_name': 'Starters', 'item_name': 'Salad', 'description': 'Salad of the day',
+            'price': '7.50', 'dietary_restrictions': ['Gluten-Free', 'Vegan']
+        })
+        self.assertEqual(rows[-1], {
+            'restaurant_name': 'Luigi', 'address': '1 Main St', 'menu_name': 'Dinner', 'version_number': 2,
+            'is_active': True, 'section_name': 'Desserts', 'item_name': None, 'description': None,
+            'price': None, 'dietary_restrictions': []
+        })
+
+    def test_round_trip(self):
+        for fmt in menu_export.FORMATS:
+            with self.subTest(fmt=fmt):
+                text = self.export(fmt).replace('Luigi', f'Luigi {fmt}')
+                importer = menu_import.MenuImporter(chunk_size=3)
+                result = importer.run(menu_import.iter_rows(io.StringIO(text, newline=''), fmt))
+
+                self.assertEqual(result['error_count'], 0, result['errors'])
+                self.assertEqual(result['created']['versions'], 2)
+                self.assertEqual(result['created']['sections'], 5)
+                self.assertEqual(result['created']['items'], 7)
+                copy = Restaurant.objects.get(name=f'Luigi {fmt}')
+                self.assertEqual(''.join(menu_export.iter_export(fmt, restaurant_ids=[copy.id])), text)
+
+
+class PdfIngestionTests(MenuTestCase):
+    MENU_LINES = [
+        'Margherita Pizza ....... $12.50',
+        'Tomato, mozzarella',
+        'STARTERS',
+        'Soup of the day 6,00',
+        'Bread 3',
+        'Soup of the day 7.00',
+        'Desserts',
+        'Tiramisu 6.50',
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.enterClassContext(tempfile.TemporaryDirectory())))
+        super().setUpClass()
+
+    def enqueue(self, content, activate=False):
+        upload = SimpleUploadedFile('dinner.pdf', content, content_type='application/pdf')
+        return pdf_ingestion.enqueue(self.menu, upload, activate=activate)
+
+    def run_worker(self):
+        messages = []
+        pdf_ingestion.run_worker(workers=1, poll_interval=0.1, once=True, log=messages.append)
+        return messages
+
+    def test_parse_menu_text(self):
+        self.assertEqual(pdf_ingestion.parse_menu_text('\n'.join(self.MENU_LINES)), [
+            ('Menu', [('Margherita Pizza', 'Tomato, mozzarella', Decimal('12.50'))]),
+            ('STARTERS', [('Soup of the day', None, Decimal('6.00')), ('Bread', None, Decimal('3'))]),
+            ('Desserts', [('Tiramisu', None, Decimal('6.50'))]),
+        ])
+
+    def test_text_without_prices(self):
+        with self.assertRaises(pdf_ingestion.PdfParseError):
+            pdf_ingestion.parse_menu_text('STARTERS\nAsk your waiter')
+
+    def test_worker_writes_a_new_version(self):
+        job = self.enqueue(make_pdf(self.MENU_LINES), activate=True)
+        self.run_worker()
+
+        log = ProcessingLog.objects.get(pk=job.processing_log_id)
+        self.assertEqual(log.status, pdf_ingestion.STATUS_COMPLETED, log.error_message)
+        self.assertEqual(log.menu_version.version_number, 3)
+        self.assertEqual(self.menu_data()['version'], 3)
+        self.assertEqual(self.prices(), {'Margherita Pizza': '12.50', 'Soup of the day': '6.00', 'Bread': '3.00',
+                                         'Tiramisu': '6.50'})
+        self.assertEqual(RestaurantPriceStats.objects.get(restaurant=self.restaurant).item_count, 11)
+
+    def test_read_model_is_built_once_per_version(self):
+        self.enqueue(make_pdf(self.MENU_LINES), activate=True)
+        self.enqueue(make_pdf(self.MENU_LINES))
+        with mock.patch.object(active_menu, 'rebuild_menu', wraps=active_menu.rebuild_menu) as rebuild:
+            self.run_worker()
+
+        rebuild.assert_called_once_with(self.menu.id)
+        self.assertEqual(list(MenuVersion.objects.filter(menu=self.menu, is_active=True).values_list(
+            'version_number', flat=True
+        )), [3])
+        self.assertEqual(set(ActiveMenuItem.objects.filter(menu=self.menu).values_list('version_number', flat=True)),
+                         {3})
+
+    def test_children_are_spawned(self):
+        job = self.enqueue(make_pdf(self.MENU_LINES))
+        with mock.patch.object(pdf_ingestion, 'ProcessPoolExecutor', wraps=pdf_ingestion.ProcessPoolExecutor) as pool:
+            self.run_worker()
+
+        # Forked after claim_jobs, a child would share this process's database connection
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+        self.assertEqual(ProcessingLog.objects.get(pk=job.processing_log_id).status, pdf_ingestion.STATUS_COMPLETED)
+
+    def test_empty_pdf_fails_the_job(self):
+        job = self.enqueue(b'')
+        self.run_worker()
+
+        log = ProcessingLog.objects.get(pk=job.processing_log_id)
+        self.assertEqual(log.status, pdf_ingestion.STATUS_FAILED)
+        self.assertTrue(log.error_message.startswith('Could not read PDF'))
+        self.assertEqual(MenuVersion.objects.filter(menu=self.menu).count(), 2)
+
+    def test_abandoned_jobs_are_requeued(self):
+        job = self.enqueue(make_pdf(self.MENU_LINES))
+        self.assertEqual(pdf_ingestion.claim_jobs(5, 'worker'), [job])
+        self.assertEqual(pdf_ingestion.claim_jobs(5, 'worker'), [])
+
+        self.assertEqual(pdf_ingestion.release_stale_jobs(timedelta(minutes=30)), 0)
+        MenuIngestionJob.objects.filter(pk=job.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(pdf_ingestion.release_stale_jobs(timedelta(minutes=30)), 1)
+        self.assertEqual(ProcessingLog.objects.get(pk=job.processing_log_id).status, pdf_ingestion.STATUS_PENDING)
+
+
+class KeysetPaginationTests(MenuTestCase):
+    ORDERINGS = {'id': ('id',), 'name': ('name', 'id'), 'price': ('price', 'id')}
+
+    def page(self, link=None, **params):
+        if link:
+            params = dict(parse_qsl(urlsplit(link).query))
+        request = Request(APIRequestFactory().get('/menu-items/', params))
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(MenuItem.objects.all(), request,
+                                           SimpleNamespace(keyset_orderings=self.ORDERINGS))
+        return rows, paginator.get_next_link(), paginator.get_previous_link()
+
+    def walk(self, **params):
+        """Follows the next links to the end, then the previous links back to the start."""
+        rows, next_link, previous_link = self.page(**params)
+        self.assertIsNone(previous_link)
+        pages = [rows]
+        while next_link:
+            rows, next_link, previous_link = self.page(next_link)
+            pages.append(rows)
+        backwards = [rows]
+        while previous_link:
+            rows, _, previous_link = self.page(previous_link)
+            backwards.insert(0, rows)
+        self.assertEqual(backwards, pages)
+        return pages
+
+    def test_pages_by_id(self):
+        ids = list(MenuItem.objects.order_by('id').values_list('id', flat=True))
+        pages = self.walk(page_size=3)
+        self.assertEqual([[item.id for item in rows] for rows in pages], [ids[0:3], ids[3:6], ids[6:]])
+
+    def test_ties_on_name_are_broken_by_id(self):
+        pages = self.walk(ordering='name', page_size=2)
+        self.assertEqual([[item.name for item in rows] for rows in pages],
+                         [['Pasta', 'Pasta'], ['Risotto', 'Salad'], ['Soup', 'Soup'], ['Steak']])
+        self.assertEqual([item.id for item in pages[0]], sorted(item.id for item in pages[0]))
+
+    def test_pages_by_price(self):
+        pages = self.walk(ordering='price', page_size=4)
+        self.assertEqual([[str(item.price) for item in rows] for rows in pages],
+                         [['4.50', '5.00', '7.50', '11.00'], ['12.00', '13.00', '25.00']])
+
+    def test_page_size(self):
+        self.assertEqual(len(self.page(page_size=5000)[0]), 7)
+        self.assertEqual(len(self.page(page_size='x')[0]), 7)
+
+    def test_invalid_cursor(self):
+        _, next_link, _ = self.page(page_size=2)
+        cursor = dict(parse_qsl(urlsplit(next_link).query))['cursor']
+        for params in [{'cursor': 'garbage'}, {'cursor': cursor, 'ordering': 'name'}]:
+            with self.subTest(params=params), self.assertRaisesMessage(NotFound, 'Invalid cursor'):
+                self.page(**params)
+
+    def test_tampered_cursor(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+        for ordering, payload in [
+            ('id', {'o': 'id', 'v': [3]}),
+            ('id', {'o': 'id', 'v': [3], 'r': 2}),
+            ('id', {'o': 'id', 'v': ['abc'], 'r': 0}),
+            ('id', {'o': 'id', 'v': [None], 'r': 0}),
+            ('id', {'o': 'id', 'v': 3, 'r': 0}),
+            ('price', {'o': 'price', 'v': [{'a': 1}, 3], 'r': 0}),
+            ('price', {'o': 'price', 'v': ['cheap', 3], 'r': 1}),
+            ('name', {'o': 'name', 'v': ['Soup', [1]], 'r': 0}),
+            ('id', ['id', [3], 0]),
+        ]:
+            with self.subTest(payload=payload), self.assertRaisesMessage(NotFound, 'Invalid cursor'):
+                self.page(ordering=ordering, cursor=token(payload))
+
+    def test_tampered_cursor_is_a_404(self):
+        cursor = base64.urlsafe_b64encode(b'{"o":"id","v":[3]}').decode('ascii')
+        self.assertEqual(self.client.get(reverse('restaurant-list'), {'cursor': cursor}).status_code, 404)
+
+
+class ReadSerializerTests(MenuTestCase):
+    SERIALIZERS = [
+        ('restaurant', serializers.RestaurantSerializer, serializers.RestaurantReadSerializer),
+        ('menu', serializers.MenuSerializer, serializers.MenuReadSerializer),
+        ('menusection', serializers.MenuSectionSerializer, serializers.MenuSectionReadSerializer),
+        ('menuitem', serializers.MenuItemSerializer, serializers.MenuItemReadSerializer),
+        ('dietaryrestriction', serializers.DietaryRestrictionSerializer, serializers.DietaryRestrictionReadSerializer),
+    ]
+
+    def test_values_rows_match_the_model_serializer(self):
+        for _, model_serializer, read_serializer in self.SERIALIZERS:
+            with self.subTest(serializer=read_serializer.__name__):
+                queryset = model_serializer.Meta.model.objects.order_by('id')
+                self.assertEqual(read_serializer.serialize_rows(read_serializer.values(queryset)),
+                                 model_serializer(queryset, many=True).data)
+
+    def test_prices_match_the_model_serializer(self):
+        section = MenuSection.objects.get(menu_version=self.v2, name='Desserts')
+        for price in ('0.10', '0.07', '19.99', '1234.50', '99999999.99'):
+            MenuItem.objects.create(section=section, name=f'Cake {price}', price=Decimal(price))
+        queryset = MenuItem.objects.order_by('id')
+        rows = serializers.MenuItemReadSerializer.serialize_rows(serializers.MenuItemReadSerializer.values(queryset))
+        self.assertEqual([row['price'] for row in rows],
+                         [item['price'] for item in serializers.MenuItemSerializer(queryset, many=True).data])
+
+    def test_pages_by_price(self):
+        url = reverse('menuitem-list')
+        response = self.client.get(url, {'ordering': 'price', 'page_size': 4}).json()
+        second = self.client.get(response['next']).json()
+        self.assertEqual([item['price'] for item in response['results'] + second['results']],
+                         ['4.50', '5.00', '7.50', '11.00', '12.00', '13.00', '25.00'])
+        self.assertEqual(self.client.get(second['previous']).json()['results'], response['results'])
+
+    def test_list_and_retrieve(self):
+        for basename, model_serializer, _ in self.SERIALIZERS:
+            with self.subTest(basename=basename):
+                queryset = model_serializer.Meta.model.objects.order_by('id')
+                expected = json.loads(json.dumps(model_serializer(queryset, many=True).data))
+
+                response = self.client.get(reverse(f'{basename}-list'))
+                self.assertEqual(response.json()['results'], expected)
+                response = self.client.get(reverse(f'{basename}-detail', args=[expected[-1]['id']]))
+                self.assertEqual(response.json(), expected[-1])
+                response = self.client.get(reverse(f'{basename}-detail', args=[expected[-1]['id'] + 100]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_malformed_ids_are_not_found(self):
+        for basename, _, _ in self.SERIALIZERS:
+            with self.subTest(basename=basename):
+                self.assertEqual(self.client.get(reverse(f'{basename}-detail', args=['abc'])).status_code, 404)
+
+    def test_retrieve_checks_object_permissions(self):
+        class DenyObjects(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj['name'] != 'Luigi'
+
+        with mock.patch.object(views.RestaurantViewSet, 'permission_classes', [DenyObjects]):
+            response = self.client.get(reverse('restaurant-detail', args=[self.restaurant.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_writes_use_the_model_serializer(self):
+        response = self.client.patch(reverse('menuitem-detail', args=[self.item('Soup').id]), {'price': '5.25'},
+                                     content_type='application/json')
+        self.assertEqual(response.json()['price'], '5.25')
+        self.assertEqual(self.prices()['Soup'], '5.25')
+
+
+class RepricingTests(MenuTestCase):
+
+    def test_reprice_active_versions(self):
+        self.menu_items()
+        rule = menu_repricing.RepricingRule.from_dict({'percent': 10, 'round_to': '0.50', 'section_names': ['Mains']})
+        result = menu_repricing.reprice([rule])
+
+        self.assertEqual(result['versions'], [{'restaurant_id': self.restaurant.id, 'menu_id': self.menu.id,
+                                               'version_number': 2}])
+        self.assertEqual(self.prices(), {'Soup': '5.00', 'Salad': '7.50', 'Pasta': '13.00', 'Steak': '27.50'})
+        self.assertEqual(self.prices(1)['Pasta'], '11.00')
+
+    def test_dietary_scope_and_minimum(self):
+        rule = menu_repricing.RepricingRule.from_dict({
+            'percent': -50, 'minimum_price': '3.00', 'dietary_restrictions': ['Vegan']
+        })
+        menu_repricing.reprice([rule])
+        self.assertEqual(self.prices(), {'Soup': '3.00', 'Salad': '3.75', 'Pasta': '12.00', 'Steak': '25.00'})
+
+    def test_dry_run_changes_nothing(self):
+        rule = menu_repricing.RepricingRule.from_dict({'percent': 10})
+        result = menu_repricing.reprice([rule], dry_run=True)
+
+        self.assertTrue(result['dry_run'])
+        self.assertEqual(self.item('Steak').price, Decimal('25.00'))
+
+    def test_clone_and_publish(self):
+        rule = menu_repricing.RepricingRule.from_dict({'percent': 100})
+        menu_repricing.reprice([rule], clone=True, publish=True)
+
+        self.assertEqual(self.menu_data()['version'], 3)
+        self.assertEqual(self.prices()['Steak'], '50.00')
+        self.assertEqual(self.prices(2)['Steak'], '25.00')
+
+    def test_invalid_rules(self):
+        for data in [{}, {'percent': -100}, {'percent': 'x'}, {'percent': 5, 'round_to': 0},
+                     {'percent': 5, 'section_names': 'Mains'}]:
+            with self.subTest(data=data), self.assertRaises(ValidationError):
+                menu_repricing.RepricingRule.from_dict(data)
+
+    def test_endpoint_is_for_admins(self):
+        url = reverse('menu-reprice')
+        body = {'rules': [{'percent': 10}], 'dry_run': True}
+        self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 403)
+
+        self.admin_client()
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['data']['dry_run'])
+        self.assertEqual(self.item('Steak').price, Decimal('25.00'))
+        for body in ({'rules': []}, {'rules': [{'percent': 'x'}]}):
+            self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 400)
+
+
+class DietaryTaggingTests(MenuTestCase):
+
+    def tags(self):
+        return {
+            link.item.name: sorted(link.restriction.name for link in MenuItemDietaryRestriction.objects.filter(
+                item=link.item
+            ))
+            for link in MenuItemDietaryRestriction.objects.filter(item__section__menu_version=self.v2)
+        }
+
+    def dietary_items(self, restrictions):
+        response = self.client.get(reverse('menu-items-dietary', args=[self.restaurant.id, self.menu.id]),
+                                   {'restrictions': restrictions})
+        return [item['name'] for section in response.json()['data']['sections'] for item in section['items']]
+
+    def test_sync_tags(self):
+        self.assertEqual(self.dietary_items('Vegan'), ['Soup', 'Salad'])
+        result = dietary_tagging.sync_version_tags(self.restaurant.id, self.menu.id, 2, [
+            {'item_id': self.item('Steak').id, 'restrictions': ['Vegan']},
+            {'section': 'Starters', 'name': 'Salad', 'restrictions': ['Vegan']},
+            {'section': 'Starters', 'name': 'Bread', 'restrictions': []},
+        ])
+
+        self.assertEqual((result['items'], result['added'], result['removed']), (2, 1, 2))
+        self.assertEqual(result['errors'], [{'entry': 2, 'message': 'Item not found in this menu version'}])
+        self.assertEqual(self.tags(), {'Soup': ['Vegan'], 'Salad': ['Vegan'], 'Steak': ['Vegan']})
+        self.assertEqual(self.dietary_items('Vegan'), ['Soup', 'Salad', 'Steak'])
+        self.assertEqual(self.dietary_items('Gluten-Free'), [])
+
+    def test_prune_and_dry_run(self):
+        entries = [{'section': 'Mains', 'name': 'Pasta', 'restrictions': ['Gluten-Free']}]
+        result = dietary_tagging.sync_version_tags(self.restaurant.id, self.menu.id, 2, entries,
+                                                   prune=True, dry_run=True)
+        self.assertEqual((result['added'], result['removed']), (1, 4))
+        self.assertEqual(len(self.tags()), 3)
+
+        dietary_tagging.sync_version_tags(self.restaurant.id, self.menu.id, 2, entries, prune=True)
+        self.assertEqual(self.tags(), {'Pasta': ['Gluten-Free']})
+        self.assertEqual(self.dietary_items('Gluten-Free'), ['Pasta'])
+
+    def test_removed_links_refresh_the_menu_once(self):
+        with mock.patch.object(active_menu, 'refresh_item', wraps=active_menu.refresh_item) as refresh_item, \
+                mock.patch.object(active_menu, 'rebuild_menu', wraps=active_menu.rebuild_menu) as rebuild_menu:
+            dietary_tagging.sync_version_tags(self.restaurant.id, self.menu.id, 2, [
+                {'section': 'Mains', 'name': 'Pasta', 'restrictions': []}
+            ], prune=True)
+
+        refresh_item.assert_not_called()
+        rebuild_menu.assert_called_once_with(self.menu.id)
+        self.assertEqual(self.tags(), {})
+        self.assertEqual(self.dietary_items('Vegan'), [])
+
+    def test_unknown_restriction(self):
+        with self.assertRaisesMessage(ValidationError, 'Unknown dietary restrictions: Halal'):
+            dietary_tagging.sync_version_tags(self.restaurant.id, self.menu.id, 2, [
+                {'section': 'Mains', 'name': 'Pasta', 'restrictions': ['Halal']}
+            ])
+
+    def test_version_of_another_restaurant(self):
+        other = Restaurant.objects.create(name='Mario')
+        with self.assertRaises(MenuVersion.DoesNotExist):
+            dietary_tagging.sync_version_tags(other.id, self.menu.id, 2, [{'item_id': 1, 'restrictions': []}])
+
+    def test_endpoint(self):
+        url = reverse('menu-version-dietary-tags', args=[self.restaurant.id, self.menu.id, 2])
+        body = {'items': [{'section': 'Mains', 'name': 'Pasta', 'restrictions': ['Vegan']}]}
+        self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 403)
+
+        self.admin_client()
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.json()['data']['added'], 1)
+        self.assertEqual(self.dietary_items('Vegan'), ['Soup', 'Salad', 'Pasta'])
+
+        missing = reverse('menu-version-dietary-tags', args=[self.restaurant.id, self.menu.id, 9])
+        self.assertEqual(self.client.post(missing, body, content_type='application/json').status_code, 404)
+        self.assertEqual(self.client.post(url, {'items': []}, content_type='application/json').status_code, 400)
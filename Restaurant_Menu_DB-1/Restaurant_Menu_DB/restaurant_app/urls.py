@@ -1,7 +1,44 @@
+from django.urls import path
 from rest_framework import routers
 from . import views
 
 router = routers.DefaultRouter()
 router.register(r'restaurants', views.RestaurantViewSet)
+router.register(r'menus', views.MenuViewSet)
+router.register(r'menu-sections', views.MenuSectionViewSet)
+router.register(r'menu-items', views.MenuItemViewSet)
+router.register(r'dietary-restrictions', views.DietaryRestrictionViewSet)
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('restaurants/<int:restaurant_id>/sections/', views.restaurant_sections_view,
+         name='restaurant-sections'),
+    path('restaurants/<int:restaurant_id>/active-sections/', views.active_sections_view,
+         name='active-sections'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/versions/', views.get_menu_version_view,
+         name='menu-versions'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/versions/diff/', views.menu_version_diff_view,
+         name='menu-version-diff'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/versions/<int:version_number>/publish/',
+         views.publish_version_view, name='menu-version-publish'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/versions/<int:version_number>/dietary-tags/',
+         views.dietary_tags_view, name='menu-version-dietary-tags'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/versions/clone/', views.clone_version_view,
+         name='menu-version-clone'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/items/', views.menu_items_view,
+         name='menu-items'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/dietary-items/', views.menu_items_dietary_view,
+         name='menu-items-dietary'),
+    path('batch/menus/', views.menu_batch_view, name='menu-batch'),
+    path('analytics/restaurants/', views.restaurant_analytics_view, name='restaurant-analytics'),
+    path('analytics/restaurants/<int:restaurant_id>/', views.specific_restaurant_analytics_view,
+         name='specific-restaurant-analytics'),
+    path('import/menus/', views.bulk_import_view, name='bulk-import'),
+    path('export/menus/', views.bulk_export_view, name='bulk-export'),
+    path('reprice/menus/', views.reprice_view, name='menu-reprice'),
+    path('restaurants/<int:restaurant_id>/menus/<int:menu_id>/pdf/', views.menu_pdf_upload_view,
+         name='menu-pdf-upload'),
+    path('processing-logs/<int:log_id>/', views.processing_log_view, name='processing-log'),
+    path('search/', views.search_view, name='search'),
+    path('browse/items/', views.MenuItemBrowseView.as_view(), name='browse-items'),
+    path('internal/metrics/', views.metrics_view, name='internal-metrics'),
+]
@@ -1,91 +1,172 @@
-from django.http import JsonResponse
-from .services.menu_queries import get_menu_items_by_version, get_menu_items_by_dietary_restrictions, get_restaurant_sections, get_active_menu_sections, get_menu_versions, get_restaurant_price_analytics, get_specific_restaurant_analytics
-from rest_framework import viewsets
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse, Http404
+from django.utils.http import parse_etags
+from restaurant_project.menu_queries import get_restaurant_sections, get_menu_versions, get_menu_version_diff, get_menus_batch
+from restaurant_project.menu_queries import aget_menu_items_by_version, aget_menu_items_by_dietary_restrictions, aget_active_menu_sections, aget_restaurant_price_analytics, aget_specific_restaurant_analytics
+from rest_framework import generics, viewsets
+from rest_framework.decorators import api_view, authentication_classes, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+import io
 from django.views.decorators.http import require_http_methods
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from .models import Restaurant, Menu, MenuSection, MenuItem, DietaryRestriction, MenuVersion
+from decimal import Decimal, InvalidOperation
+from .models import Restaurant, Menu, MenuSection, MenuItem, DietaryRestriction, MenuVersion, ProcessingLog
+from .services import menu_cache
+from .instrumentation import registry, timed_serialization
+from .replicas import replica_reads
+from .pagination import KeysetPagination
+from .services import menu_export, menu_import, pdf_ingestion, menu_publishing, menu_search, menu_facets, menu_repricing, dietary_tagging, lookup_cache, compact_menu, catalog_snapshot
 from .serializers import (
     RestaurantSerializer,
     MenuSerializer,
     MenuSectionSerializer,
     MenuItemSerializer,
-    DietaryRestrictionSerializer
+    DietaryRestrictionSerializer,
+    RestaurantReadSerializer,
+    MenuReadSerializer,
+    MenuSectionReadSerializer,
+    MenuItemReadSerializer,
+    DietaryRestrictionReadSerializer
 )
 
+# Mixin for the ViewSets below
+class FastReadMixin:
+    """
+    Serves list and retrieve from QuerySet.values() rows through `read_serializer_class`.
+    
+    Writes keep going through `serializer_class`. Set read_serializer_class to None
+    to fall back to the regular ModelSerializer path.
+    """
+    read_serializer_class = None
+
+    def get_read_queryset(self):
+        return self.read_serializer_class.values(self.filter_queryset(self.get_queryset()))
+
+    def list(self, request, *args, **kwargs):
+        if self.read_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_read_queryset()
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        with timed_serialization():
+            data = self.read_serializer_class.serialize_rows(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.read_serializer_class is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        # Same as get_object, on the values() row: malformed IDs are a 404 and
+        # object permissions see the row
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            self.get_read_queryset(), **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(self.read_serializer_class.serialize_row(row))
+
+class ReplicaReadMixin:
+    """
+    Lets the ORM reads of GET and HEAD requests go to a read replica.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
 # ViewSet for Restaurant
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on Restaurant objects.
     
     This ViewSet provides the following actions:
-    - List: GET /restaurants/
+    - List: GET /restaurants/ (keyset paginated; ?ordering=id|name, ?page_size=, ?cursor=)
     - Create: POST /restaurants/
     - Retrieve: GET /restaurants/{id}/
     - Update: PUT/PATCH /restaurants/{id}/
     - Delete: DELETE /restaurants/{id}/
     """
     queryset = Restaurant.objects.all()
+    keyset_orderings = {'id': ('id',), 'name': ('name', 'id')}
     serializer_class = RestaurantSerializer
+    read_serializer_class = RestaurantReadSerializer
 
 # ViewSet for Menu
-class MenuViewSet(viewsets.ModelViewSet):
+class MenuViewSet(ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on Menu objects.
     
     This ViewSet provides the following actions:
-    - List: GET /menus/
+    - List: GET /menus/ (keyset paginated on id)
     - Create: POST /menus/
     - Retrieve: GET /menus/{id}/
     - Update: PUT/PATCH /menus/{id}/
     - Delete: DELETE /menus/{id}/
     """
     queryset = Menu.objects.all()
+    keyset_orderings = {'id': ('id',)}
     serializer_class = MenuSerializer
+    read_serializer_class = MenuReadSerializer
 
 # ViewSet for MenuSection
-class MenuSectionViewSet(viewsets.ModelViewSet):
+class MenuSectionViewSet(ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on MenuSection objects.
     
     This ViewSet provides the following actions:
-    - List: GET /menu-sections/
+    - List: GET /menu-sections/ (keyset paginated on id)
     - Create: POST /menu-sections/
     - Retrieve: GET /menu-sections/{id}/
     - Update: PUT/PATCH /menu-sections/{id}/
     - Delete: DELETE /menu-sections/{id}/
     """
     queryset = MenuSection.objects.all()
+    keyset_orderings = {'id': ('id',)}
     serializer_class = MenuSectionSerializer
+    read_serializer_class = MenuSectionReadSerializer
 
 # ViewSet for MenuItem
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on MenuItem objects.
     
     This ViewSet provides the following actions:
-    - List: GET /menu-items/
+    - List: GET /menu-items/ (keyset paginated; ?ordering=id|name|price)
     - Create: POST /menu-items/
     - Retrieve: GET /menu-items/{id}/
     - Update: PUT/PATCH /menu-items/{id}/
     - Delete: DELETE /menu-items/{id}/
     """
     queryset = MenuItem.objects.all()
+    keyset_orderings = {'id': ('id',), 'name': ('name', 'id'), 'price': ('price', 'id')}
     serializer_class = MenuItemSerializer
+    read_serializer_class = MenuItemReadSerializer
 
 # ViewSet for DietaryRestriction
-class DietaryRestrictionViewSet(viewsets.ModelViewSet):
+class DietaryRestrictionViewSet(ReplicaReadMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on DietaryRestriction objects.
     
     This ViewSet provides the following actions:
-    - List: GET /dietary-restrictions/
+    - List: GET /dietary-restrictions/ (keyset paginated; ?ordering=id|name)
     - Create: POST /dietary-restrictions/
     - Retrieve: GET /dietary-restrictions/{id}/
     - Update: PUT/PATCH /dietary-restrictions/{id}/
     - Delete: DELETE /dietary-restrictions/{id}/
     """
     queryset = DietaryRestriction.objects.all()
+    keyset_orderings = {'id': ('id',), 'name': ('name',)}
     serializer_class = DietaryRestrictionSerializer
+    read_serializer_class = DietaryRestrictionReadSerializer
 
 def restaurant_sections_view(request, restaurant_id):
     """
@@ -119,7 +200,7 @@ def restaurant_sections_view(request, restaurant_id):
         ]
     })
 
-def active_sections_view(request, restaurant_id):
+async def active_sections_view(request, restaurant_id):
     """
     View to display only active sections for a restaurant.
     
@@ -132,7 +213,7 @@ def active_sections_view(request, restaurant_id):
     Returns:
     django.http.JsonResponse: A JSON response containing the active menu sections for the specified restaurant.
     """
-    active_sections = get_active_menu_sections(restaurant_id)
+    active_sections = await aget_active_menu_sections(restaurant_id)
     if active_sections is None:
         return JsonResponse({'error': 'Restaurant not found'}, status=404)
 
@@ -172,29 +253,88 @@ def get_menu_version_view(request, restaurant_id, menu_id):
     return JsonResponse({'versions': menu_versions})
 
 @require_http_methods(["GET"])
-def menu_items_view(request, restaurant_id, menu_id):
+def menu_version_diff_view(request, restaurant_id, menu_id):
+    """
+    Compares two versions of a menu.
+    
+    URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/versions/diff/
+    Required query params:
+    - from: Version number to diff from
+    - to: Version number to diff to
+    """
+    try:
+        from_version = int(request.GET.get('from', ''))
+        to_version = int(request.GET.get('to', ''))
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'from and to must be version numbers'
+        }, status=400)
+
+    try:
+        diff = get_menu_version_diff(restaurant_id, menu_id, from_version, to_version)
+    except Http404:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Menu or version not found'
+        }, status=404)
+
+    with timed_serialization():
+        return JsonResponse({
+            'status': 'success',
+            'data': diff
+        })
+
+@require_http_methods(["GET"])
+async def menu_items_view(request, restaurant_id, menu_id):
     """
     Retrieves menu items organized by sections. Optionally filters by version.
     
     URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/items/
     Optional query params:
     - version_number: Specific version to retrieve (defaults to active version)
+
+    Response data: restaurant_name, menu_name, version and sections, each with a
+    section_name and its items as {id, name, description, price}. The item id is
+    the MenuItem primary key, as accepted by item_id in the dietary tags endpoint;
+    items carry it since filtering by dietary restriction moved to item IDs.
+
+    The encoded response body is cached per (menu, version) and served with a
+    strong ETag; a matching If-None-Match is answered with 304 Not Modified.
+    Active menus are served from the memory-mapped catalog snapshot first.
     """
     try:
         version_number = request.GET.get('version_number')
         if version_number:
             version_number = int(version_number)
-        
-        menu_data = get_menu_items_by_version(
-            restaurant_id=restaurant_id,
-            menu_id=menu_id,
-            version_number=version_number
-        )
-        
-        return JsonResponse({
-            'status': 'success',
-            'data': menu_data
-        })
+
+        rendered = None
+        if not version_number:
+            rendered = await catalog_snapshot.alookup(menu_id)
+        if rendered is None or rendered[0] != restaurant_id:
+            rendered = await menu_cache.aget_rendered(menu_id, version_number)
+        if rendered is None or rendered[0] != restaurant_id:
+            menu_data = await aget_menu_items_by_version(
+                restaurant_id=restaurant_id,
+                menu_id=menu_id,
+                version_number=version_number
+            )
+            rendered = await menu_cache.aset_rendered(
+                menu_id, version_number, restaurant_id, compact_menu.response_body(menu_data)
+            )
+        _, body, etag = rendered
+
+        # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+        client_etags = [
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        ]
+        if etag in client_etags or '*' in client_etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
     
     except ValidationError as e:
         return JsonResponse({
@@ -208,7 +348,7 @@ def menu_items_view(request, restaurant_id, menu_id):
         }, status=500)
 
 @require_http_methods(["GET"])
-def menu_items_dietary_view(request, restaurant_id, menu_id):
+async def menu_items_dietary_view(request, restaurant_id, menu_id):
     """
     Retrieves menu items filtered by dietary restrictions.
     
@@ -217,6 +357,9 @@ def menu_items_dietary_view(request, restaurant_id, menu_id):
     - restrictions: Comma-separated list of dietary restriction names
     Optional query params:
     - version_number: Specific version to retrieve
+    - match: 'any' (default), 'all' or 'none' of the given restrictions
+
+    Response data is shaped like the menu items endpoint, with only the matching items.
     """
     try:
         restrictions_param = request.GET.get('restrictions', '')
@@ -226,17 +369,15 @@ def menu_items_dietary_view(request, restaurant_id, menu_id):
         if version_number:
             version_number = int(version_number)
         
-        menu_data = get_menu_items_by_dietary_restrictions(
+        menu_data = await aget_menu_items_by_dietary_restrictions(
             restaurant_id=restaurant_id,
             menu_id=menu_id,
             version_number=version_number,
-            dietary_restrictions=dietary_restrictions
+            dietary_restrictions=dietary_restrictions,
+            match=request.GET.get('match', 'any')
         )
         
-        return JsonResponse({
-            'status': 'success',
-            'data': menu_data
-        })
+        return HttpResponse(compact_menu.response_body(menu_data), content_type='application/json')
     
     except ValidationError as e:
         return JsonResponse({
@@ -250,12 +391,13 @@ def menu_items_dietary_view(request, restaurant_id, menu_id):
         }, status=500)
 
 @require_http_methods(["GET"])
-def restaurant_analytics_view(request):
+async def restaurant_analytics_view(request):
     """
     View for retrieving price analytics across all restaurants.
     
     Optional query params:
     - n: Number of restaurants to return in each group (default 3)
+    - active_only: If true, only items of active menu versions are analyzed
     """
     try:
         n = int(request.GET.get('n', 3))
@@ -265,7 +407,8 @@ def restaurant_analytics_view(request):
                 'message': 'n must be a positive integer'
             }, status=400)
 
-        analytics = get_restaurant_price_analytics(n=n)
+        active_only = request.GET.get('active_only', '').lower() in ('1', 'true', 'yes')
+        analytics = await aget_restaurant_price_analytics(n=n, active_only=active_only)
         
         if analytics is None:
             return JsonResponse({
@@ -273,10 +416,11 @@ def restaurant_analytics_view(request):
                 'message': 'Failed to retrieve analytics'
             }, status=500)
 
-        return JsonResponse({
-            'status': 'success',
-            'data': analytics
-        })
+        with timed_serialization():
+            return JsonResponse({
+                'status': 'success',
+                'data': analytics
+            })
         
     except ValueError:
         return JsonResponse({
@@ -290,16 +434,21 @@ def restaurant_analytics_view(request):
         }, status=500)
 
 @require_http_methods(["GET"])
-def specific_restaurant_analytics_view(request, restaurant_id):
+async def specific_restaurant_analytics_view(request, restaurant_id):
     """
     View for retrieving detailed price analytics for a specific restaurant.
+    
+    Optional query params:
+    - active_only: If true, only items of active menu versions are analyzed
     """
     try:
-        analytics = get_specific_restaurant_analytics(restaurant_id)
-        return JsonResponse({
-            'status': 'success',
-            'data': analytics
-        })
+        active_only = request.GET.get('active_only', '').lower() in ('1', 'true', 'yes')
+        analytics = await aget_specific_restaurant_analytics(restaurant_id, active_only=active_only)
+        with timed_serialization():
+            return JsonResponse({
+                'status': 'success',
+                'data': analytics
+            })
     except Restaurant.DoesNotExist:
         return JsonResponse({
             'status': 'error',
@@ -311,3 +460,503 @@ def specific_restaurant_analytics_view(request, restaurant_id):
             'message': str(e)
         }, status=500)
 
+@api_view(['POST'])
+@authentication_classes([])
+def menu_batch_view(request):
+    """
+    Retrieves many menus in one request, each shaped like the menu items endpoint.
+    
+    URL: /api/batch/menus/
+    Body:
+    - menus: List of {"restaurant_id", "menu_id", "version_number" (optional)} objects,
+      at most MENU_BATCH_MAX_SIZE of them
+    
+    Every entry gets its own status, so a missing menu does not fail the others.
+    Menus are public like the menu items endpoint, so the request is not
+    authenticated and a session cookie costs no session or user lookup.
+    """
+    entries = request.data.get('menus') if hasattr(request.data, 'get') else None
+    max_size = getattr(settings, 'MENU_BATCH_MAX_SIZE', 100)
+    if not isinstance(entries, list) or not entries:
+        return Response({
+            'status': 'error',
+            'message': 'menus must be a non-empty list'
+        }, status=400)
+    if len(entries) > max_size:
+        return Response({
+            'status': 'error',
+            'message': f'At most {max_size} menus can be requested at once'
+        }, status=400)
+
+    requested = []
+    for position, entry in enumerate(entries):
+        try:
+            version_number = entry.get('version_number')
+            requested.append((
+                int(entry['restaurant_id']),
+                int(entry['menu_id']),
+                int(version_number) if version_number not in (None, '') else None
+            ))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response({
+                'status': 'error',
+                'message': f'menus[{position}] needs integer restaurant_id and menu_id and an optional integer version_number'
+            }, status=400)
+
+    return Response({
+        'status': 'success',
+        'data': get_menus_batch(requested)
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def bulk_import_view(request):
+    """
+    Bulk imports menus from an uploaded JSON lines or CSV file.
+    
+    URL: /api/import/menus/
+    Form data:
+    - file: The file to import (see services.menu_import.iter_rows for the row layout)
+    Optional query params:
+    - file_format: 'jsonl' or 'csv' (defaults to the uploaded file's extension)
+    - chunk_size: Rows written per transaction
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'status': 'error',
+            'message': 'A file upload is required'
+        }, status=400)
+
+    fmt = request.query_params.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+    if fmt not in menu_import.FORMATS:
+        return Response({
+            'status': 'error',
+            'message': f"file_format must be one of {', '.join(menu_import.FORMATS)}"
+        }, status=400)
+
+    try:
+        chunk_size = int(request.query_params.get('chunk_size', menu_import.DEFAULT_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'chunk_size must be a positive integer'
+        }, status=400)
+
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+    result = menu_import.MenuImporter(chunk_size=chunk_size).run(menu_import.iter_rows(stream, fmt))
+
+    return Response({
+        'status': 'success',
+        'data': result
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def bulk_export_view(request):
+    """
+    Streams restaurants with their full menu trees, one row per menu item and per empty section.
+    
+    URL: /api/export/menus/
+    Optional query params:
+    - file_format: 'jsonl' (default) or 'csv'
+    - restaurant_ids: Comma-separated restaurant IDs to export
+    - active_only: If true, only active menu versions are exported
+    """
+    fmt = request.query_params.get('file_format', 'jsonl')
+    if fmt not in menu_export.FORMATS:
+        return Response({
+            'status': 'error',
+            'message': f"file_format must be one of {', '.join(menu_export.FORMATS)}"
+        }, status=400)
+
+    try:
+        restaurant_ids = [
+            int(pk) for pk in request.query_params.get('restaurant_ids', '').split(',') if pk.strip()
+        ]
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'restaurant_ids must be a comma-separated list of integers'
+        }, status=400)
+
+    active_only = request.query_params.get('active_only', '').lower() in ('1', 'true', 'yes')
+
+    response = StreamingHttpResponse(
+        menu_export.iter_export(fmt, restaurant_ids=restaurant_ids, active_only=active_only),
+        content_type=menu_export.CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="menus.{fmt}"'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def menu_pdf_upload_view(request, restaurant_id, menu_id):
+    """
+    Queues an uploaded menu PDF for ingestion as a new version of the menu.
+    
+    The PDF is parsed by the run_ingestion_worker command, never on the request
+    thread; poll the returned processing log for the outcome.
+    
+    URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/pdf/
+    Form data:
+    - file: The menu PDF
+    - activate: If true, the new version becomes the active one
+    """
+    menu = get_object_or_404(Menu, id=menu_id, restaurant_id=restaurant_id)
+
+    upload = request.FILES.get('file')
+    if upload is None or not upload.name.lower().endswith('.pdf'):
+        return Response({
+            'status': 'error',
+            'message': 'A PDF file upload is required'
+        }, status=400)
+
+    job = pdf_ingestion.enqueue(
+        menu,
+        upload,
+        activate=str(request.data.get('activate', '')).lower() in ('1', 'true', 'yes'),
+        created_by=request.user.get_username() or 'System'
+    )
+
+    return Response({
+        'status': 'success',
+        'data': {
+            'processing_log_id': job.processing_log_id,
+            'file_name': job.processing_log.file_name,
+            'processing_status': job.processing_log.status
+        }
+    }, status=202)
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def publish_version_view(request, restaurant_id, menu_id, version_number):
+    """
+    Makes a version the active one of its menu.
+    
+    URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/versions/<version_number>/publish/
+    """
+    get_object_or_404(Menu, id=menu_id, restaurant_id=restaurant_id)
+
+    try:
+        version = menu_publishing.publish_version(menu_id, version_number)
+    except MenuVersion.DoesNotExist:
+        return Response({
+            'status': 'error',
+            'message': 'Menu version not found'
+        }, status=404)
+
+    return Response({
+        'status': 'success',
+        'data': {
+            'version': version.version_number,
+            'is_active': version.is_active
+        }
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def clone_version_view(request, restaurant_id, menu_id):
+    """
+    Copies a version with its sections, items and dietary links into a new version of the menu.
+    
+    URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/versions/clone/
+    Optional body fields:
+    - source_version: Version number to copy (defaults to the active version)
+    - activate: If true, the new version becomes the active one
+    - notes: Notes stored on the new version
+    """
+    get_object_or_404(Menu, id=menu_id, restaurant_id=restaurant_id)
+
+    try:
+        source_version = request.data.get('source_version')
+        source_version = int(source_version) if source_version not in (None, '') else None
+    except (TypeError, ValueError):
+        return Response({
+            'status': 'error',
+            'message': 'source_version must be an integer'
+        }, status=400)
+
+    try:
+        version, copied = menu_publishing.clone_version(
+            menu_id,
+            source_version_number=source_version,
+            activate=str(request.data.get('activate', '')).lower() in ('1', 'true', 'yes'),
+            created_by=request.user.get_username() or 'System',
+            notes=request.data.get('notes')
+        )
+    except MenuVersion.DoesNotExist:
+        return Response({
+            'status': 'error',
+            'message': 'Source version not found'
+        }, status=404)
+
+    return Response({
+        'status': 'success',
+        'data': {
+            'version': version.version_number,
+            'is_active': version.is_active,
+            'copied': copied
+        }
+    }, status=201)
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def reprice_view(request):
+    """
+    Applies percentage price changes to the items of active menu versions.
+    
+    URL: /api/reprice/menus/
+    Body fields:
+    - rules: List of rules, applied in order, each with
+      - percent: Price change in percent, e.g. 4.5 or -10 (required)
+      - round_to: Round new prices to a multiple of this (default 0.01)
+      - minimum_price: Lower bound for new prices (default 0)
+      - restaurant_ids, section_names, dietary_restrictions: Optional scopes
+    - clone: If true, reprice copies of the active versions instead
+    - publish: With clone, activate the repriced copies
+    - dry_run: If true, report the changes without keeping them
+    """
+    rules = request.data.get('rules')
+    if not isinstance(rules, list) or not rules:
+        return Response({
+            'status': 'error',
+            'message': 'rules must be a non-empty list'
+        }, status=400)
+
+    def flag(name):
+        return str(request.data.get(name, '')).lower() in ('1', 'true', 'yes')
+
+    try:
+        result = menu_repricing.reprice(
+            [menu_repricing.RepricingRule.from_dict(rule) for rule in rules],
+            clone=flag('clone'),
+            publish=flag('publish'),
+            dry_run=flag('dry_run'),
+            created_by=request.user.get_username() or 'System'
+        )
+    except ValidationError as e:
+        return Response({
+            'status': 'error',
+            'message': e.messages[0]
+        }, status=400)
+
+    return Response({
+        'status': 'success',
+        'data': result
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def dietary_tags_view(request, restaurant_id, menu_id, version_number):
+    """
+    Sets the dietary restrictions of many items of a menu version in one request.
+
+    URL: /api/restaurants/<restaurant_id>/menus/<menu_id>/versions/<version_number>/dietary-tags/
+    Body fields:
+    - items: List of entries, each with
+      - restrictions: Restriction names the item should carry; others are removed
+      - item_id, or section and name: The item to tag
+    - prune: If true, items of the version missing from the list lose all restrictions
+    - dry_run: If true, report the changes without making them
+    """
+    entries = request.data.get('items')
+    if not isinstance(entries, list) or not entries:
+        return Response({
+            'status': 'error',
+            'message': 'items must be a non-empty list'
+        }, status=400)
+
+    def flag(name):
+        return str(request.data.get(name, '')).lower() in ('1', 'true', 'yes')
+
+    try:
+        result = dietary_tagging.sync_version_tags(
+            restaurant_id, menu_id, version_number, entries,
+            prune=flag('prune'),
+            dry_run=flag('dry_run')
+        )
+    except MenuVersion.DoesNotExist:
+        return Response({
+            'status': 'error',
+            'message': 'Menu version not found'
+        }, status=404)
+    except ValidationError as e:
+        return Response({
+            'status': 'error',
+            'message': e.messages[0]
+        }, status=400)
+
+    return Response({
+        'status': 'success',
+        'data': result
+    })
+
+@require_http_methods(["GET"])
+def processing_log_view(request, log_id):
+    """
+    Reports the status of a PDF ingestion job.
+    
+    URL: /api/processing-logs/<log_id>/
+    """
+    log = ProcessingLog.objects.filter(id=log_id).values(
+        'id', 'file_name', 'status', 'started_at', 'completed_at', 'error_message',
+        'menu_version__version_number'
+    ).first()
+    if log is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Processing log not found'
+        }, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'data': {
+            'id': log['id'],
+            'file_name': log['file_name'],
+            'processing_status': log['status'],
+            'started_at': log['started_at'],
+            'completed_at': log['completed_at'],
+            'error_message': log['error_message'],
+            'version': log['menu_version__version_number']
+        }
+    })
+
+class MenuItemBrowseView(APIView):
+    """
+    Browses items of active menus by price range, dietary restrictions, restaurant and section,
+    with facet counts.
+    
+    URL: /api/browse/items/
+    Optional query params:
+    - min_price, max_price: Inclusive price range
+    - restrictions: Comma-separated dietary restriction names
+    - match: 'any' (default), 'all' or 'none' of the given restrictions
+    - restaurant_ids: Comma-separated restaurant IDs
+    - section: Section name
+    - cursor, page_size: Keyset pagination, ordered by price
+    
+    Facets (items per restaurant, price bucket and dietary restriction) come
+    from precomputed per-menu aggregates of the active versions and cover the
+    restaurant and section selection.
+    """
+    pagination_class = KeysetPagination
+    keyset_orderings = {'price': ('price', 'id')}
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            min_price = Decimal(params['min_price']) if params.get('min_price') else None
+            max_price = Decimal(params['max_price']) if params.get('max_price') else None
+        except InvalidOperation:
+            return Response({
+                'status': 'error',
+                'message': 'min_price and max_price must be numbers'
+            }, status=400)
+
+        try:
+            restaurant_ids = [int(pk) for pk in params.get('restaurant_ids', '').split(',') if pk.strip()]
+        except ValueError:
+            return Response({
+                'status': 'error',
+                'message': 'restaurant_ids must be a comma-separated list of integers'
+            }, status=400)
+
+        restrictions = [name.strip() for name in params.get('restrictions', '').split(',') if name.strip()]
+        section_name = params.get('section') or None
+
+        try:
+            items = menu_facets.browse_items(
+                min_price=min_price,
+                max_price=max_price,
+                restrictions=restrictions,
+                match=params.get('match', 'any'),
+                restaurant_ids=restaurant_ids,
+                section_name=section_name
+            )
+        except ValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': e.messages[0]
+            }, status=400)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(items, request, view=self)
+        facets = menu_facets.get_facets(restaurant_ids=restaurant_ids, section_name=section_name)
+
+        with timed_serialization():
+            results = [dict(row, price=str(row['price'])) for row in page]
+
+        return Response({
+            'status': 'success',
+            'data': {
+                'results': results,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'facets': facets
+            }
+        })
+
+@require_http_methods(["GET"])
+def search_view(request):
+    """
+    Full-text search over the items of active menus, tolerant of prefixes and typos.
+    
+    URL: /api/search/
+    Required query params:
+    - q: Search text, matched against item, section, menu and restaurant names and descriptions
+    Optional query params:
+    - limit: Maximum number of results (default 20, at most 100)
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'q is required'
+        }, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'limit must be an integer'
+        }, status=400)
+
+    results = menu_search.search_menu_items(query, limit=limit)
+
+    with timed_serialization():
+        return JsonResponse({
+            'status': 'success',
+            'data': {
+                'query': query,
+                'results': results
+            }
+        })
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """
+    Internal endpoint exposing this process's per-endpoint request histograms
+    and the hit/miss counters of its lookup cache.
+    
+    Only answers requests from INTERNAL_IPS. Each worker process keeps its own
+    histograms, so scrape every worker.
+    
+    URL: /api/internal/metrics/
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Not found'
+        }, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'data': registry.snapshot(),
+        'lookup_cache': lookup_cache.stats()
+    })
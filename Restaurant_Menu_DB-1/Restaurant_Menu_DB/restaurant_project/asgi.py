@@ -3,6 +3,9 @@ ASGI config for restaurant_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn so the async menu and analytics views share one event
+loop per worker, e.g. ``uvicorn restaurant_project.asgi:application --workers 4``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -1,9 +1,17 @@
-from django.shortcuts import get_object_or_404
-from django.db.models import Prefetch, Avg, Max, Min, F, Count
-from restaurant_app.models import Restaurant, Menu, MenuVersion, MenuSection, MenuItem, DietaryRestriction, MenuItemDietaryRestriction, ProcessingLog
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.http import Http404
+from django.db.models import Q, Prefetch, F, ExpressionWrapper, DecimalField
+from restaurant_app.models import Restaurant, Menu, MenuVersion, MenuSection, MenuItem, DietaryRestriction, MenuItemDietaryRestriction, ProcessingLog, RestaurantPriceStats
 from django.db.models.functions import Coalesce
+from django.db import connections, router
 from decimal import Decimal
+from restaurant_app.services import menu_cache, dietary_filter, active_menu, lookup_cache
+from restaurant_app.services.compact_menu import CompactMenu
+from restaurant_app.replicas import read_from_replica
 
+@read_from_replica
 def get_restaurant_sections(restaurant_id):
     """
     Retrieves all menu sections for a specific restaurant, including version information.
@@ -49,6 +57,7 @@ def get_restaurant_sections(restaurant_id):
     except Restaurant.DoesNotExist:
         return None
 
+@read_from_replica
 def get_active_menu_sections(restaurant_id):
     """
     Retrieves only the sections from active menu versions for a specific restaurant.
@@ -87,7 +96,27 @@ def get_active_menu_sections(restaurant_id):
         return active_sections
     except Restaurant.DoesNotExist:
         return None
+
+@read_from_replica
+async def aget_active_menu_sections(restaurant_id):
+    """
+    Async version of get_active_menu_sections.
+    
+    Reads the sections with one join instead of walking the menu -> version ->
+    section prefetch chain; the restaurant is only looked up when there are none.
+    """
+    active_sections = await _alist(MenuSection.objects.filter(
+        menu_version__menu__restaurant_id=restaurant_id,
+        menu_version__is_active=True
+    ).order_by('menu_version__menu_id', 'menu_version_id', 'id'))
+    if not active_sections and not await Restaurant.objects.filter(id=restaurant_id).aexists():
+        return None
+    return active_sections
+
+async def _alist(queryset):
+    return [row async for row in queryset]
     
+@read_from_replica
 def get_menu_versions(restaurant_id, menu_id):
     """
     Retrieves all MenuVersion objects for the specified Restaurant and Menu.
@@ -125,6 +154,7 @@ def get_menu_versions(restaurant_id, menu_id):
         # If the requested Restaurant or Menu does not exist, return None
         return None
     
+@read_from_replica
 def get_menu_items_by_version(restaurant_id, menu_id, version_number=None):
     """
     Retrieves menu items organized by sections for a specific restaurant, menu, and optionally a version.
@@ -136,11 +166,32 @@ def get_menu_items_by_version(restaurant_id, menu_id, version_number=None):
         version_number (int, optional): Specific version number. Defaults to None (active version).
     
     Returns:
-        dict: Hierarchical structure of menu sections and items
+        CompactMenu: The menu's sections and items; to_dict() gives the nested
+        structure served by the menu endpoints and to_json_bytes() its encoding
+
+    Built payloads are cached per (menu, version) and invalidated by the
+    MenuVersion/MenuSection/MenuItem signal handlers, so a warm read runs no SQL.
+    On a miss the active version is read from the denormalized ActiveMenuItem
+    read model in one query; specific versions use the normalized tables.
     """
-    # Get the restaurant and menu
-    restaurant = get_object_or_404(Restaurant, id=restaurant_id)
-    menu = get_object_or_404(Menu, id=menu_id, restaurant=restaurant)
+    snapshot = menu_cache.get_snapshot(menu_id, version_number)
+    if snapshot is not None:
+        cached_restaurant_id, menu_data = snapshot
+        if cached_restaurant_id != int(restaurant_id):
+            raise Http404('No Menu matches the given query.')
+        return menu_data
+
+    if not version_number:
+        menu_data = active_menu.read_menu(restaurant_id, menu_id)
+        if menu_data is not None:
+            menu_cache.set_snapshot(menu_id, menu_data.version, int(restaurant_id), menu_data, is_active=True)
+            return menu_data
+
+    # Get the restaurant (from the in-process lookup cache) and menu
+    restaurant = lookup_cache.get_restaurant(restaurant_id)
+    if restaurant is None:
+        raise Http404('No Restaurant matches the given query.')
+    menu = get_object_or_404(Menu, id=menu_id, restaurant_id=restaurant_id)
     
     # Get the appropriate version
     if version_number:
@@ -152,47 +203,97 @@ def get_menu_items_by_version(restaurant_id, menu_id, version_number=None):
                                        menu=menu, 
                                        is_active=True)
     
-    # Get sections with related items
-    sections = MenuSection.objects.filter(
-        menu_version=menu_version
-    ).prefetch_related('items')
+    # Get sections with related items, in creation order like the read model
+    sections = _version_sections(menu_version)
     
     # Organize the data
-    menu_data = {
-        'restaurant_name': restaurant.name,
-        'menu_name': menu.name,
-        'version': menu_version.version_number,
-        'sections': []
-    }
+    menu_data = _menu_payload(restaurant, menu, menu_version, sections)
+
+    menu_cache.set_snapshot(
+        menu.id,
+        menu_version.version_number,
+        restaurant['id'],
+        menu_data,
+        is_active=menu_version.is_active
+    )
     
-    for section in sections:
-        section_data = {
-            'section_name': section.name,
-            'items': [
-                {
-                    'name': item.name,
-                    'description': item.description,
-                    'price': str(item.price)
-                } for item in section.items.all()
-            ]
-        }
-        menu_data['sections'].append(section_data)
+    return menu_data
+
+@read_from_replica
+async def aget_menu_items_by_version(restaurant_id, menu_id, version_number=None):
+    """
+    Async version of get_menu_items_by_version.
     
+    On the normalized path the restaurant comes from the lookup cache while the
+    menu query runs; a cache miss is loaded off the ORM thread, so the two overlap.
+    """
+    snapshot = await menu_cache.aget_snapshot(menu_id, version_number)
+    if snapshot is not None:
+        cached_restaurant_id, menu_data = snapshot
+        if cached_restaurant_id != int(restaurant_id):
+            raise Http404('No Menu matches the given query.')
+        return menu_data
+
+    if not version_number:
+        menu_data = await active_menu.aread_menu(restaurant_id, menu_id)
+        if menu_data is not None:
+            await menu_cache.aset_snapshot(menu_id, menu_data.version, int(restaurant_id), menu_data, is_active=True)
+            return menu_data
+
+    restaurant, menu = await asyncio.gather(
+        lookup_cache.aget_restaurant(restaurant_id),
+        aget_object_or_404(Menu, id=menu_id, restaurant_id=restaurant_id)
+    )
+    if restaurant is None:
+        raise Http404('No Restaurant matches the given query.')
+    version_filter = {'version_number': version_number} if version_number else {'is_active': True}
+    menu_version = await aget_object_or_404(MenuVersion, menu=menu, **version_filter)
+    sections = await _alist(_version_sections(menu_version))
+    menu_data = _menu_payload(restaurant, menu, menu_version, sections)
+
+    await menu_cache.aset_snapshot(
+        menu.id,
+        menu_version.version_number,
+        restaurant['id'],
+        menu_data,
+        is_active=menu_version.is_active
+    )
     return menu_data
 
+def _version_sections(menu_version):
+    return MenuSection.objects.filter(
+        menu_version=menu_version
+    ).order_by('id').prefetch_related(Prefetch('items', queryset=MenuItem.objects.order_by('id')))
+
+def _menu_payload(restaurant, menu, menu_version, sections):
+    return CompactMenu.from_sections(
+        restaurant['name'],
+        menu.name,
+        menu_version.version_number,
+        (
+            (section.name, ((item.id, item.name, item.description, item.price) for item in section.items.all()))
+            for section in sections
+        )
+    )
+
+@read_from_replica
 def get_menu_items_by_dietary_restrictions(restaurant_id, menu_id, version_number=None, 
-                                         dietary_restrictions=None):
+                                         dietary_restrictions=None, match=dietary_filter.MATCH_ANY):
     """
     Retrieves menu items filtered by dietary restrictions.
     
+    Items are matched by ID against the version's precomputed dietary index
+    (restriction -> set of item IDs), so filtering is a set lookup per item.
+    
     Args:
         restaurant_id (int): Restaurant ID
         menu_id (int): Menu ID
         version_number (int, optional): Specific version number
         dietary_restrictions (list): List of dietary restriction names
+        match (str): 'any' (default), 'all' or 'none' of the given restrictions
     
     Returns:
-        dict: Filtered menu items organized by sections
+        CompactMenu: The menu with only the matching items, in every section
     """
     # Get the base menu structure
     menu_data = get_menu_items_by_version(restaurant_id, menu_id, version_number)
@@ -201,29 +302,435 @@ def get_menu_items_by_dietary_restrictions(restaurant_id, menu_id, version_numbe
     if not dietary_restrictions:
         return menu_data
     
-    # Filter items by dietary restrictions
-    menu_version = get_object_or_404(
-        MenuVersion,
-        menu_id=menu_id,
-        version_number=version_number if version_number else F('is_active')
+    restriction_ids, missing_names = dietary_filter.resolve_restriction_ids(dietary_restrictions)
+    index = dietary_filter.get_version_index(menu_id, menu_data.version)
+    keep = dietary_filter.build_item_filter(index, restriction_ids, match, missing_names)
+    
+    return menu_data.filtered(keep)
+
+@read_from_replica
+async def aget_menu_items_by_dietary_restrictions(restaurant_id, menu_id, version_number=None,
+                                                  dietary_restrictions=None, match=dietary_filter.MATCH_ANY):
+    """
+    Async version of get_menu_items_by_dietary_restrictions.
+    
+    The restriction names are resolved through the lookup cache while the menu
+    is read, like the restaurant in aget_menu_items_by_version.
+    """
+    if not dietary_restrictions:
+        return await aget_menu_items_by_version(restaurant_id, menu_id, version_number)
+
+    menu_data, (restriction_ids, missing_names) = await asyncio.gather(
+        aget_menu_items_by_version(restaurant_id, menu_id, version_number),
+        dietary_filter.aresolve_restriction_ids(dietary_restrictions)
     )
+    index = await dietary_filter.aget_version_index(menu_id, menu_data.version)
+    keep = dietary_filter.build_item_filter(index, restriction_ids, match, missing_names)
     
-    filtered_items = MenuItem.objects.filter(
-        section__menu_version=menu_version,
-        menuitemdietaryrestriction__restriction__name__in=dietary_restrictions
-    ).distinct()
-    
-    # Update menu_data to include only filtered items
-    for section in menu_data['sections']:
-        section['items'] = [
-            item for item in section['items']
-            if any(filtered_item.name == item['name'] 
-                  for filtered_item in filtered_items)
-        ]
+    return menu_data.filtered(keep)
+
+@read_from_replica
+def get_menus_batch(entries):
+    """
+    Retrieves many menus, each like get_menu_items_by_version, with a constant number of queries.
     
-    return menu_data
+    Cached payloads are fetched with one cache round trip. Remaining active
+    menus are read from the ActiveMenuItem read model in one query; whatever is
+    left (specific versions, menus not in the read model) is resolved with one
+    query for the versions and their sections and one for the items, grouped in
+    memory. The restaurant of every entry is checked within those same queries.
+    
+    Args:
+        entries (list): (restaurant_id, menu_id, version_number or None) tuples
+    
+    Returns:
+        list: One result per entry, in order: {'restaurant_id', 'menu_id', 'version_number',
+        'status'} plus 'data' (a CompactMenu) on success or 'message' on failure
+    """
+    requests = {(menu_id, version_number or None) for _, menu_id, version_number in entries}
+    found = menu_cache.get_snapshots(requests)
+    built = []
+
+    active_missing = {menu_id for menu_id, version_number in requests
+                      if version_number is None and (menu_id, None) not in found}
+    if active_missing:
+        for menu_id, (restaurant_id, menu_data) in active_menu.read_menus(active_missing).items():
+            found[(menu_id, None)] = (restaurant_id, menu_data)
+            built.append((menu_id, menu_data.version, restaurant_id, menu_data, True))
+
+    missing = {(restaurant_id, menu_id, version_number or None) for restaurant_id, menu_id, version_number in entries
+               if (menu_id, version_number or None) not in found}
+    if missing:
+        for key, snapshot, is_active in _build_menus(missing):
+            found[key] = snapshot
+            built.append((key[0], snapshot[1].version, snapshot[0], snapshot[1], is_active))
+
+    menu_cache.set_snapshots(built)
+
+    results = []
+    for restaurant_id, menu_id, version_number in entries:
+        result = {'restaurant_id': restaurant_id, 'menu_id': menu_id, 'version_number': version_number}
+        snapshot = found.get((menu_id, version_number or None))
+        if snapshot is None or snapshot[0] != int(restaurant_id):
+            result.update({'status': 'error', 'message': 'Menu or version not found'})
+        else:
+            result.update({'status': 'success', 'data': snapshot[1]})
+        results.append(result)
+    return results
+
+def _build_menus(requests):
+    """
+    Builds menu payloads from the normalized tables with two queries.
+    
+    Versions are matched together with their restaurant, so a menu of another
+    restaurant is simply not found, and come with their sections through a left
+    join that keeps versions without any.
+    
+    Yields:
+        tuple: ((menu_id, version_number or None), (restaurant_id, menu_data), is_active)
+    """
+    conditions = Q()
+    for restaurant_id, menu_id, version_number in requests:
+        version_filter = {'version_number': version_number} if version_number else {'is_active': True}
+        conditions |= Q(menu_id=menu_id, menu__restaurant_id=restaurant_id, **version_filter)
+
+    versions = {}
+    version_sections = {}
+    section_items = {}
+    for version in MenuVersion.objects.filter(conditions).order_by('id', 'sections__id').values(
+        'id', 'menu_id', 'version_number', 'is_active', 'menu__name', 'menu__restaurant_id', 'menu__restaurant__name',
+        'sections__id', 'sections__name'
+    ):
+        section_id = version.pop('sections__id')
+        section_name = version.pop('sections__name')
+        if version['id'] not in versions:
+            versions[version['id']] = version
+            version_sections[version['id']] = []
+        if section_id is not None:
+            section_items[section_id] = []
+            version_sections[version['id']].append((section_name, section_items[section_id]))
+    if not versions:
+        return
+
+    for section_id, item_id, name, description, price in MenuItem.objects.filter(
+        section__menu_version_id__in=versions
+    ).order_by('id').values_list('section_id', 'id', 'name', 'description', 'price'):
+        section_items[section_id].append((item_id, name, description, price))
+
+    for version_id, version in versions.items():
+        menu_data = CompactMenu.from_sections(
+            version['menu__restaurant__name'], version['menu__name'], version['version_number'],
+            version_sections[version_id]
+        )
+        snapshot = (version['menu__restaurant_id'], menu_data)
+        # One version row can answer both a request for its number and one for the active version
+        if (version['menu__restaurant_id'], version['menu_id'], version['version_number']) in requests:
+            yield (version['menu_id'], version['version_number']), snapshot, version['is_active']
+        if version['is_active'] and (version['menu__restaurant_id'], version['menu_id'], None) in requests:
+            yield (version['menu_id'], None), snapshot, True
+
+def _version_contents(version_ids):
+    """
+    Loads the sections, items and dietary tags of several versions with three queries.
+
+    Returns:
+        dict: {version_id: {section_name: {item_name: (price, description, frozenset of restriction names)}}}
+    """
+    contents = {version_id: {} for version_id in version_ids}
+    for version_id, section_name in MenuSection.objects.filter(
+        menu_version_id__in=version_ids
+    ).values_list('menu_version_id', 'name'):
+        contents[version_id][section_name] = {}
+
+    tags = {}
+    for item_id, restriction_name in MenuItemDietaryRestriction.objects.filter(
+        item__section__menu_version_id__in=version_ids
+    ).values_list('item_id', 'restriction__name'):
+        tags.setdefault(item_id, set()).add(restriction_name)
+
+    for item_id, version_id, section_name, name, description, price in MenuItem.objects.filter(
+        section__menu_version_id__in=version_ids
+    ).order_by('section__name', 'name').values_list(
+        'id', 'section__menu_version_id', 'section__name', 'name', 'description', 'price'
+    ):
+        contents[version_id][section_name][name] = (str(price), description, frozenset(tags.get(item_id, ())))
+    return contents
+
+
+def _pair_renamed_sections(old, new, removed, added):
+    # A removed and an added section sharing at least half of their item names are a rename
+    candidates = []
+    for old_name in removed:
+        for new_name in added:
+            old_items, new_items = old[old_name].keys(), new[new_name].keys()
+            union = old_items | new_items
+            if not union:
+                continue
+            score = len(old_items & new_items) / len(union)
+            if score >= 0.5:
+                candidates.append((-score, old_name, new_name))
+
+    pairs = {}
+    used = set()
+    for _, old_name, new_name in sorted(candidates):
+        if old_name not in pairs and new_name not in used:
+            pairs[old_name] = new_name
+            used.add(new_name)
+    return pairs
+
+
+def _item_entry(section_name, name, entry):
+    price, description, _ = entry
+    return {'section': section_name, 'name': name, 'description': description, 'price': price}
+
+
+def _diff_sections(old_section, new_section, old_items, new_items, diff):
+    for name in sorted(old_items.keys() & new_items.keys()):
+        _diff_item(new_section, name, old_items[name], new_items[name], diff)
+
+    removed = sorted(old_items.keys() - new_items.keys())
+    added = sorted(new_items.keys() - old_items.keys())
+
+    # Hash join the leftovers on (price, description): a match is a renamed item
+    unmatched = {}
+    for name in removed:
+        price, description, _ = old_items[name]
+        unmatched.setdefault((price, description), []).append(name)
+    for name in added:
+        price, description, _ = new_items[name]
+        candidates = unmatched.get((price, description))
+        if candidates:
+            old_name = candidates.pop(0)
+            diff['items']['renamed'].append({'section': new_section, 'from': old_name, 'to': name})
+            _diff_item(new_section, name, old_items[old_name], new_items[name], diff)
+        else:
+            diff['items']['added'].append(_item_entry(new_section, name, new_items[name]))
+    for names in unmatched.values():
+        for name in names:
+            diff['items']['removed'].append(_item_entry(old_section, name, old_items[name]))
+
+
+def _diff_item(section_name, name, old_entry, new_entry, diff):
+    old_price, _, old_tags = old_entry
+    new_price, _, new_tags = new_entry
+    if old_price != new_price:
+        diff['price_changes'].append({
+            'section': section_name,
+            'name': name,
+            'old_price': old_price,
+            'new_price': new_price
+        })
+    if old_tags != new_tags:
+        diff['dietary_changes'].append({
+            'section': section_name,
+            'name': name,
+            'added': sorted(new_tags - old_tags),
+            'removed': sorted(old_tags - new_tags)
+        })
+
+
+@read_from_replica
+def get_menu_version_diff(restaurant_id, menu_id, from_version, to_version):
+    """
+    Computes a structured diff between two versions of a menu.
+
+    Both versions are loaded together with a fixed number of queries and joined
+    in memory on (section name, item name). Sections that lost or gained names
+    but share most of their items are reported as renamed, as are items whose
+    name changed but whose price and description did not. Results are cached
+    until either version changes.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        menu_id (int): Menu ID
+        from_version (int): Version number to diff from
+        to_version (int): Version number to diff to
+
+    Returns:
+        dict: Added, removed and renamed sections and items, price changes and dietary tag changes
+    """
+    cached = menu_cache.get_diff(menu_id, from_version, to_version)
+    if cached is not None:
+        cached_restaurant_id, diff = cached
+        if cached_restaurant_id != int(restaurant_id):
+            raise Http404('No Menu matches the given query.')
+        return diff
 
-def get_restaurant_price_analytics(n=3):
+    menu = get_object_or_404(Menu.objects.select_related('restaurant'), id=menu_id, restaurant_id=restaurant_id)
+    version_ids = dict(MenuVersion.objects.filter(
+        menu=menu,
+        version_number__in=[from_version, to_version]
+    ).values_list('version_number', 'id'))
+    if from_version not in version_ids or to_version not in version_ids:
+        raise Http404('No MenuVersion matches the given query.')
+
+    contents = _version_contents(list(version_ids.values()))
+    old = contents[version_ids[from_version]]
+    new = contents[version_ids[to_version]]
+
+    diff = {
+        'restaurant_name': menu.restaurant.name,
+        'menu_name': menu.name,
+        'from_version': from_version,
+        'to_version': to_version,
+        'sections': {'added': [], 'removed': [], 'renamed': []},
+        'items': {'added': [], 'removed': [], 'renamed': []},
+        'price_changes': [],
+        'dietary_changes': []
+    }
+
+    removed = sorted(old.keys() - new.keys())
+    added = sorted(new.keys() - old.keys())
+    renamed = _pair_renamed_sections(old, new, removed, added)
+
+    pairs = [(name, name) for name in sorted(old.keys() & new.keys())] + sorted(renamed.items())
+    for old_section, new_section in pairs:
+        if old_section != new_section:
+            diff['sections']['renamed'].append({'from': old_section, 'to': new_section})
+        _diff_sections(old_section, new_section, old[old_section], new[new_section], diff)
+
+    for name in removed:
+        if name not in renamed:
+            diff['sections']['removed'].append(name)
+            diff['items']['removed'].extend(_item_entry(name, item, entry) for item, entry in old[name].items())
+    for name in added:
+        if name not in renamed.values():
+            diff['sections']['added'].append(name)
+            diff['items']['added'].extend(_item_entry(name, item, entry) for item, entry in new[name].items())
+
+    for key in ('added', 'removed'):
+        diff['items'][key].sort(key=lambda entry: (entry['section'], entry['name']))
+
+    menu_cache.set_diff(menu_id, from_version, to_version, (menu.restaurant_id, diff))
+    return diff
+
+def _price_extreme_items(item_ids):
+    """
+    Fetches name, price, section and menu for a set of items in one query.
+    """
+    return _extreme_items_by_id(_extreme_item_rows(item_ids))
+
+async def _aprice_extreme_items(item_ids):
+    return _extreme_items_by_id(await _alist(_extreme_item_rows(item_ids)))
+
+def _extreme_item_rows(item_ids):
+    return MenuItem.objects.filter(id__in=item_ids).values(
+        'id', 'name', 'price', 'section__name', 'section__menu_version__menu__name'
+    )
+
+def _extreme_items_by_id(rows):
+    return {
+        row['id']: {
+            'name': row['name'],
+            'price': float(row['price']),
+            'section': row['section__name'],
+            'menu': row['section__menu_version__menu__name']
+        }
+        for row in rows
+    }
+
+def _active_price_extremes(n=None, restaurant_id=None):
+    """
+    Computes price analytics over active menu versions only, in a single query.
+    
+    Window functions partition the active items by restaurant to get the average,
+    the item count and ROW_NUMBER over price in both directions; a second window
+    ranks the restaurants by average price. Only the rows of the extreme items of
+    the requested restaurants come back, so the query count does not depend on n.
+    
+    Args:
+        n (int, optional): Size of the top and bottom groups
+        restaurant_id (int, optional): Restrict the analysis to one restaurant
+    
+    Returns:
+        list: One dict per restaurant with its ranks, averages and extreme items
+    """
+    tables = {
+        'restaurant': Restaurant._meta.db_table,
+        'menu': Menu._meta.db_table,
+        'version': MenuVersion._meta.db_table,
+        'section': MenuSection._meta.db_table,
+        'item': MenuItem._meta.db_table,
+    }
+    restaurant_filter = 'AND m.restaurant_id = %s' if restaurant_id is not None else ''
+    rank_filter = 'AND (rr.top_rank <= %s OR rr.bottom_rank <= %s)' if n is not None else ''
+    sql = f"""
+        WITH active_items AS (
+            SELECT m.restaurant_id, i.id AS item_id, i.name, i.price,
+                   s.name AS section_name, m.name AS menu_name,
+                   AVG(i.price) OVER (PARTITION BY m.restaurant_id) AS avg_price,
+                   COUNT(*) OVER (PARTITION BY m.restaurant_id) AS total_items,
+                   ROW_NUMBER() OVER (PARTITION BY m.restaurant_id ORDER BY i.price DESC, i.id) AS rn_desc,
+                   ROW_NUMBER() OVER (PARTITION BY m.restaurant_id ORDER BY i.price ASC, i.id) AS rn_asc
+            FROM {tables['item']} i
+            JOIN {tables['section']} s ON s.id = i.section_id
+            JOIN {tables['version']} v ON v.id = s.menu_version_id
+            JOIN {tables['menu']} m ON m.id = v.menu_id
+            WHERE v.is_active = %s {restaurant_filter}
+        ),
+        ranked_restaurants AS (
+            SELECT restaurant_id,
+                   ROW_NUMBER() OVER (ORDER BY avg_price DESC, restaurant_id) AS top_rank,
+                   ROW_NUMBER() OVER (ORDER BY avg_price ASC, restaurant_id) AS bottom_rank
+            FROM active_items
+            WHERE rn_desc = 1
+        )
+        SELECT ai.restaurant_id, r.name, r.address, ai.avg_price, ai.total_items,
+               rr.top_rank, rr.bottom_rank, ai.rn_desc, ai.rn_asc,
+               ai.name, ai.price, ai.section_name, ai.menu_name
+        FROM active_items ai
+        JOIN ranked_restaurants rr ON rr.restaurant_id = ai.restaurant_id
+        JOIN {tables['restaurant']} r ON r.id = ai.restaurant_id
+        WHERE (ai.rn_desc = 1 OR ai.rn_asc = 1) {rank_filter}
+    """
+    params = [True]
+    if restaurant_id is not None:
+        params.append(restaurant_id)
+    if n is not None:
+        params.extend([n, n])
+
+    with connections[router.db_for_read(MenuItem)].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    restaurants = {}
+    for (rest_id, name, address, avg_price, total_items, top_rank, bottom_rank, rn_desc, rn_asc,
+         item_name, price, section_name, menu_name) in rows:
+        entry = restaurants.setdefault(rest_id, {
+            'restaurant_name': name,
+            'address': address,
+            'average_price': float(avg_price),
+            'total_items': total_items,
+            'top_rank': top_rank,
+            'bottom_rank': bottom_rank,
+            'price_extremes': {}
+        })
+        item = {
+            'name': item_name,
+            'price': float(price),
+            'section': section_name,
+            'menu': menu_name
+        }
+        # A single-item menu is both its most and least expensive dish
+        if rn_desc == 1:
+            entry['price_extremes']['most_expensive'] = item
+        if rn_asc == 1:
+            entry['price_extremes']['least_expensive'] = item
+    return list(restaurants.values())
+
+def _active_restaurant_summary(entry, include_address=True):
+    summary = {
+        'restaurant_name': entry['restaurant_name'],
+        'average_price': entry['average_price'],
+        'total_items': entry['total_items'],
+    }
+    if include_address:
+        summary['address'] = entry['address'] or 'Address not available'
+    summary['price_extremes'] = entry['price_extremes']
+    return summary
+
+@read_from_replica
+def get_restaurant_price_analytics(n=3, active_only=False):
     """
     Analyzes restaurant prices and returns both highest and lowest average price restaurants.
     
@@ -232,103 +739,122 @@ def get_restaurant_price_analytics(n=3):
     2. Most and least expensive dishes for each restaurant
     3. Total number of items on their menu
     
+    Reads from the materialized RestaurantPriceStats table, so the cost is a
+    constant number of queries over O(n) rows regardless of catalog size.
+    With active_only, only items of active menu versions are considered and
+    everything is answered by one window-function query.
+    
     Args:
         n (int): Number of restaurants to return for each group (default 3)
+        active_only (bool): Restrict the analysis to active menu versions
         
     Returns:
         dict: Complete analysis including both expensive and affordable restaurants
     """
     try:
-        # First get all restaurants with their average prices
-        restaurants_with_stats = Restaurant.objects.annotate(
-            total_items=Count('menu__menuversion__sections__items', distinct=True),
-            avg_price=Coalesce(
-                Avg('menu__menuversion__sections__items__price'),
-                Decimal('0.00')
-            )
-        ).filter(
-            total_items__gt=0  # Only include restaurants that have menu items
-        )
+        if active_only:
+            return _ranked_active_analytics(_active_price_extremes(n=n), n)
+
+        stats_with_average = _stats_with_average()
         
         # Get top N most expensive restaurants
-        most_expensive = restaurants_with_stats.order_by('-avg_price')[:n]
+        most_expensive = list(stats_with_average.order_by('-avg_price')[:n])
         
         # Get top N least expensive restaurants
-        least_expensive = restaurants_with_stats.order_by('avg_price')[:n]
+        least_expensive = list(stats_with_average.order_by('avg_price')[:n])
         
-        def get_restaurant_details(restaurant_queryset, category_name):
-            """
-            Helper function to process restaurant details and their price extremes.
-            """
-            detailed_results = []
-            
-            for restaurant in restaurant_queryset:
-                # Get all items for this restaurant
-                restaurant_items = MenuItem.objects.filter(
-                    section__menu_version__menu__restaurant=restaurant
-                ).select_related(
-                    'section',
-                    'section__menu_version',
-                    'section__menu_version__menu'
-                )
-                
-                # Calculate price extremes for this restaurant
-                price_extremes = restaurant_items.aggregate(
-                    max_price=Max('price'),
-                    min_price=Min('price')
-                )
-                
-                # Get the specific items with extreme prices
-                most_expensive_item = restaurant_items.filter(
-                    price=price_extremes['max_price']
-                ).first()
-                
-                least_expensive_item = restaurant_items.filter(
-                    price=price_extremes['min_price']
-                ).first()
-                
-                # Compile restaurant data
-                restaurant_data = {
-                    'restaurant_name': restaurant.name,
-                    'average_price': float(restaurant.avg_price),
-                    'total_items': restaurant.total_items,
-                    'address': restaurant.address or 'Address not available',
-                    'price_extremes': {
-                        'most_expensive': {
-                            'name': most_expensive_item.name,
-                            'price': float(most_expensive_item.price),
-                            'section': most_expensive_item.section.name,
-                            'menu': most_expensive_item.section.menu_version.menu.name
-                        },
-                        'least_expensive': {
-                            'name': least_expensive_item.name,
-                            'price': float(least_expensive_item.price),
-                            'section': least_expensive_item.section.name,
-                            'menu': least_expensive_item.section.menu_version.menu.name
-                        }
-                    }
-                }
-                detailed_results.append(restaurant_data)
-            
-            return {
-                f"{category_name}_restaurants": detailed_results
-            }
+        extreme_items = _price_extreme_items(_stats_extreme_ids(most_expensive + least_expensive))
         
         # Process both groups of restaurants
-        high_price_data = get_restaurant_details(most_expensive, "highest_average")
-        low_price_data = get_restaurant_details(least_expensive, "lowest_average")
-        
-        # Combine the results
         return {
-            **high_price_data,
-            **low_price_data,
+            'highest_average_restaurants': _stats_details(most_expensive, extreme_items),
+            'lowest_average_restaurants': _stats_details(least_expensive, extreme_items),
         }
 
     except Exception as e:
         print(f"Error in get_restaurant_price_analytics: {str(e)}")
         return None
 
-def get_specific_restaurant_analytics(restaurant_id):
+@read_from_replica
+async def aget_restaurant_price_analytics(n=3, active_only=False):
+    """
+    Async version of get_restaurant_price_analytics.
+    
+    The active_only window-function query is raw SQL and runs in a worker thread.
+    """
+    try:
+        if active_only:
+            return _ranked_active_analytics(await sync_to_async(_active_price_extremes)(n=n), n)
+
+        stats_with_average = _stats_with_average()
+        most_expensive = await _alist(stats_with_average.order_by('-avg_price')[:n])
+        least_expensive = await _alist(stats_with_average.order_by('avg_price')[:n])
+        
+        extreme_items = await _aprice_extreme_items(_stats_extreme_ids(most_expensive + least_expensive))
+        
+        return {
+            'highest_average_restaurants': _stats_details(most_expensive, extreme_items),
+            'lowest_average_restaurants': _stats_details(least_expensive, extreme_items),
+        }
+
+    except Exception as e:
+        print(f"Error in aget_restaurant_price_analytics: {str(e)}")
+        return None
+
+def _ranked_active_analytics(ranked, n):
+    return {
+        'highest_average_restaurants': [
+            _active_restaurant_summary(entry)
+            for entry in sorted(ranked, key=lambda e: e['top_rank']) if entry['top_rank'] <= n
+        ],
+        'lowest_average_restaurants': [
+            _active_restaurant_summary(entry)
+            for entry in sorted(ranked, key=lambda e: e['bottom_rank']) if entry['bottom_rank'] <= n
+        ],
+    }
+
+def _stats_with_average():
+    return RestaurantPriceStats.objects.filter(
+        item_count__gt=0  # Only include restaurants that have menu items
+    ).select_related('restaurant').annotate(
+        avg_price=ExpressionWrapper(
+            F('price_sum') / F('item_count'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+    )
+
+def _stats_extreme_ids(stats_rows):
+    return {
+        item_id
+        for stats in stats_rows
+        for item_id in (stats.min_item_id, stats.max_item_id)
+    }
+
+def _stats_details(stats_rows, extreme_items, include_address=True):
+    """
+    Builds the analytics entry of each restaurant from its price stats and extreme items.
+    """
+    detailed_results = []
+    
+    for stats in stats_rows:
+        restaurant = stats.restaurant
+        restaurant_data = {
+            'restaurant_name': restaurant.name,
+            'average_price': float(stats.price_sum / stats.item_count),
+            'total_items': stats.item_count,
+        }
+        if include_address:
+            restaurant_data['address'] = restaurant.address or 'Address not available'
+        restaurant_data['price_extremes'] = {
+            'most_expensive': extreme_items[stats.max_item_id],
+            'least_expensive': extreme_items[stats.min_item_id]
+        }
+        detailed_results.append(restaurant_data)
+    
+    return detailed_results
+
+@read_from_replica
+def get_specific_restaurant_analytics(restaurant_id, active_only=False):
     """
     Gets detailed price analytics for a specific restaurant.
     
@@ -336,57 +862,51 @@ def get_specific_restaurant_analytics(restaurant_id):
     1. Overall average price
     2. Total number of items
     3. Most and least expensive dishes with their details
+    
+    With active_only, only items of active menu versions are considered.
     """
     try:
-        restaurant = Restaurant.objects.annotate(
-            total_items=Count('menu__menuversion__sections__items', distinct=True),
-            avg_price=Coalesce(
-                Avg('menu__menuversion__sections__items__price'),
-                Decimal('0.00')
-            )
-        ).get(id=restaurant_id)
+        if active_only:
+            entries = _active_price_extremes(restaurant_id=restaurant_id)
+            # No items in an active version
+            if not entries:
+                return None
+            return _active_restaurant_summary(entries[0], include_address=False)
 
-        items = MenuItem.objects.filter(
-            section__menu_version__menu__restaurant_id=restaurant_id
-        ).select_related(
-            'section',
-            'section__menu_version',
-            'section__menu_version__menu'
+        stats = RestaurantPriceStats.objects.select_related('restaurant').get(
+            restaurant_id=restaurant_id,
+            item_count__gt=0
         )
 
-        price_extremes = items.aggregate(
-            max_price=Max('price'),
-            min_price=Min('price')
-        )
+        extreme_items = _price_extreme_items([stats.min_item_id, stats.max_item_id])
 
-        most_expensive = items.filter(
-            price=price_extremes['max_price']
-        ).first()
+        return _stats_details([stats], extreme_items, include_address=False)[0]
 
-        least_expensive = items.filter(
-            price=price_extremes['min_price']
-        ).first()
+    except Exception as e:
+        print(f"Error in get_specific_restaurant_analytics: {str(e)}")
+        return None
 
-        return {
-            'restaurant_name': restaurant.name,
-            'average_price': float(restaurant.avg_price),
-            'total_items': restaurant.total_items,
-            'price_extremes': {
-                'most_expensive': {
-                    'name': most_expensive.name,
-                    'price': float(most_expensive.price),
-                    'section': most_expensive.section.name,
-                    'menu': most_expensive.section.menu_version.menu.name
-                },
-                'least_expensive': {
-                    'name': least_expensive.name,
-                    'price': float(least_expensive.price),
-                    'section': least_expensive.section.name,
-                    'menu': least_expensive.section.menu_version.menu.name
-                }
-            }
-        }
+@read_from_replica
+async def aget_specific_restaurant_analytics(restaurant_id, active_only=False):
+    """
+    Async version of get_specific_restaurant_analytics.
+    """
+    try:
+        if active_only:
+            entries = await sync_to_async(_active_price_extremes)(restaurant_id=restaurant_id)
+            if not entries:
+                return None
+            return _active_restaurant_summary(entries[0], include_address=False)
+
+        stats = await RestaurantPriceStats.objects.select_related('restaurant').aget(
+            restaurant_id=restaurant_id,
+            item_count__gt=0
+        )
+
+        extreme_items = await _aprice_extreme_items([stats.min_item_id, stats.max_item_id])
+
+        return _stats_details([stats], extreme_items, include_address=False)[0]
 
     except Exception as e:
-        print(f"Error in get_specific_restaurant_analytics: {str(e)}")
+        print(f"Error in aget_specific_restaurant_analytics: {str(e)}")
         return None
\ No newline at end of file
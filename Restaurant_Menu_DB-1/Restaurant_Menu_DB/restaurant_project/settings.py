@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurant_app.middleware.RequestInstrumentationMiddleware',
+    'restaurant_app.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +93,133 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite switches to a local SQLite file, e.g. for running the benchmarks
+# (manage.py migrate, manage.py generate_menu_data, manage.py run_benchmarks)
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Read replicas (restaurant_app.replicas). DB_REPLICA_HOSTS is a comma-separated
+# list of MySQL replica hosts sharing the primary's settings; with DB_ENGINE=sqlite,
+# SQLITE_REPLICA_PATHS lists SQLite files standing in for replicas.
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    replica_databases = [
+        {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        for path in os.environ.get('SQLITE_REPLICA_PATHS', '').split(',') if path
+    ]
+else:
+    replica_databases = [
+        {**DATABASES['default'], 'HOST': host}
+        for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host
+    ]
+READ_REPLICAS = []
+for number, database in enumerate(replica_databases, 1):
+    DATABASES[f'replica_{number}'] = {**database, 'TEST': {'MIRROR': 'default'}}
+    READ_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['restaurant_app.replicas.ReplicaRouter']
+# Seconds a client that wrote keeps reading from the primary; keep it above
+# REPLICA_MAX_LAG_SECONDS + REPLICA_CHECK_SECONDS
+REPLICA_STICKY_SECONDS = 5
+# Replicas trailing the primary by more than this stop serving reads (None disables the check)
+REPLICA_MAX_LAG_SECONDS = 2
+# How often each process measures replica lag
+REPLICA_CHECK_SECONDS = 1
+# How often manage.py replica_heartbeat stamps the primary. Run exactly one of it;
+# without a recent heartbeat no replica serves reads
+REPLICA_HEARTBEAT_SECONDS = 1
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (e.g. Redis or Memcached) when running several workers so
+# that snapshot invalidation reaches every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurant-menu',
+    }
+}
+
+# Seconds a built menu snapshot stays cached; None keeps it until invalidated
+MENU_SNAPSHOT_TIMEOUT = None
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'restaurant_app.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_RENDERER_CLASSES': [
+        'restaurant_app.renderers.InstrumentedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+
+# Request instrumentation
+# Maximum SQL queries per request, keyed by URL name for GET and HEAD requests and
+# by 'METHOD url-name' for any other method. Exceeding a budget logs a warning, or
+# raises QueryBudgetExceeded when QUERY_BUDGETS_ENFORCE is set (CI).
+
+QUERY_BUDGETS = {
+    'menu-items': 5,
+    'menu-items-dietary': 7,
+    'POST menu-batch': 3,
+    'restaurant-analytics': 3,
+    'specific-restaurant-analytics': 2,
+    'restaurant-list': 1,
+    'restaurant-detail': 1,
+    'menu-list': 1,
+    'menu-detail': 1,
+    'menusection-list': 1,
+    'menusection-detail': 1,
+    'menuitem-list': 1,
+    'menuitem-detail': 1,
+    'dietaryrestriction-list': 1,
+    'dietaryrestriction-detail': 1,
+}
+QUERY_BUDGETS_ENFORCE = os.environ.get('QUERY_BUDGETS_ENFORCE') == '1'
+
+# Menu item search index (restaurant_app.services.menu_search), written by
+# manage.py build_search_index and loaded on first search
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index.pickle'
+# How often a process pulls menus rebuilt by other processes into its index
+SEARCH_INDEX_REFRESH_SECONDS = 5
+
+# Memory-mapped snapshot of every active menu's items response
+# (restaurant_app.services.catalog_snapshot), written by manage.py build_catalog_snapshot.
+# Workers map it on first use and check for a swapped file and changed menus
+# at most every CATALOG_SNAPSHOT_REFRESH_SECONDS.
+CATALOG_SNAPSHOT_PATH = BASE_DIR / 'catalog_snapshot.bin'
+CATALOG_SNAPSHOT_REFRESH_SECONDS = 5
+
+# In-process cache of dietary restrictions and restaurant metadata
+# (restaurant_app.services.lookup_cache). A change touches LOOKUP_CACHE_SIGNAL_PATH,
+# which every process checks at most every LOOKUP_CACHE_CHECK_SECONDS; keep it on
+# storage all workers share. Entries also expire after LOOKUP_CACHE_TTL seconds.
+LOOKUP_CACHE_SIGNAL_PATH = BASE_DIR / 'lookup_cache.signal'
+LOOKUP_CACHE_CHECK_SECONDS = 1
+LOOKUP_CACHE_TTL = 300
+# Maximum number of restaurants kept per process
+LOOKUP_CACHE_RESTAURANTS = 10000
+# Async views load cache misses in a worker thread with a connection of its own,
+# alongside their ORM queries. That connection only sees committed rows, so turn
+# this off where async lookups run inside an open transaction (e.g. TestCase)
+LOOKUP_CACHE_LOAD_OFF_THREAD = True
+
+# Maximum number of menus one /api/batch/menus/ request may ask for
+MENU_BATCH_MAX_SIZE = 100
+
+# Clients allowed to read /api/internal/metrics/
+INTERNAL_IPS = ['127.0.0.1']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,6 +257,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (menu PDFs queued for ingestion)
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 